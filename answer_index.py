@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import zlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ---------------------------------
+# Paraphrase-tolerant answer index
+# ---------------------------------
+# Questions are embedded as hashed character n-gram counts (sublinear tf) and
+# compared by plain cosine similarity, so scores don't drift as the index grows.
+# A hit must also pass a key-term check: after dropping filler and generic form
+# words ("years", "experience", ...), one question's key terms must contain the
+# other's. That keeps "years of Python" away from "years of PHP" however close
+# the wording. Rows live in an append-only float32 file that is opened with
+# np.memmap; metadata (question, signature, profile, answer) lives in a
+# parallel JSONL file. Only rows sharing the lookup's signature (profile + kind
+# + choice set) are considered, and rows of other profiles are dropped on load.
+# calibrate_similarity.py picks the threshold from data/paraphrase_pairs.tsv.
+
+DEFAULT_DIM = 1024
+NGRAM_SIZES = (3, 4, 5)
+
+_FILLER = {
+    "a", "an", "the", "do", "does", "did", "you", "your", "have", "has", "of", "in", "on",
+    "with", "to", "for", "is", "are", "what", "which", "how", "many", "much", "please",
+    "and", "or", "i", "me", "my", "we", "this", "that", "if", "any", "enter", "required",
+}
+
+
+# Generic application-form vocabulary that doesn't change what is being asked
+_TEMPLATE = {
+    "years", "year", "yrs", "experience", "experienced", "work", "worked", "working", "level",
+    "rate", "proficiency", "proficient", "completed", "complete", "following", "would", "can",
+    "able", "willing", "comfortable", "us", "job", "role", "position", "company", "our", "from",
+    "per", "now", "future", "will", "about", "currently", "kindly", "mention",
+}
+_SUFFIXES = ("ing", "ed", "ion", "es", "s", "e")
+
+
+def _normalize(text: str) -> str:
+    words = re.findall(r"[a-z0-9+#]+", (text or "").lower())
+    return " ".join(w for w in words if w not in _FILLER)
+
+
+def vectorize(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Hashed character n-gram term frequencies (1 + log tf), float32."""
+    vec = np.zeros(dim, dtype=np.float32)
+    padded = f" {_normalize(text)} "
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            vec[zlib.crc32(padded[i:i + n].encode("utf-8")) % dim] += 1.0
+    nz = vec > 0
+    vec[nz] = 1.0 + np.log(vec[nz])
+    return vec
+
+
+def _stem(word: str) -> str:
+    for suf in _SUFFIXES:
+        if len(word) > len(suf) + 2 and word.endswith(suf):
+            return word[:-len(suf)]
+    return word
+
+
+def key_terms(text: str) -> set:
+    return {_stem(w) for w in _normalize(text).split() if w not in _TEMPLATE}
+
+
+def terms_compatible(a: str, b: str) -> bool:
+    """True when one question's key terms contain the other's (and they share at least one)."""
+    ka, kb = key_terms(a), key_terms(b)
+    if not ka and not kb:
+        return True
+    return bool(ka & kb) and (ka <= kb or kb <= ka)
+
+
+def similarity(a: str, b: str, dim: int = DEFAULT_DIM) -> float:
+    """Cosine similarity of two questions, 0.0 when the key-term check fails."""
+    if not terms_compatible(a, b):
+        return 0.0
+    va, vb = vectorize(a, dim), vectorize(b, dim)
+    na, nb = np.linalg.norm(va), np.linalg.norm(vb)
+    return float(va @ vb / (na * nb)) if na and nb else 0.0
+
+
+class AnswerIndex:
+    """Incrementally updated, memory-mapped similarity index of answered questions."""
+
+    def __init__(self, base_path: str, dim: int = DEFAULT_DIM, profile: Optional[str] = None):
+        self.dim = dim
+        self.profile = profile
+        self.rows_path = base_path + ".f32"
+        self.meta_path = base_path + ".jsonl"
+        self._lock = threading.Lock()
+        self._meta: List[dict] = []
+        self._by_sig: Dict[str, List[int]] = {}
+        self._rows: Optional[np.ndarray] = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._meta)
+
+    def _load(self) -> None:
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._meta.append(json.loads(line))
+                    except Exception:
+                        break  # torn tail from an interrupted write
+        n_rows = 0
+        if os.path.exists(self.rows_path):
+            n_rows = os.path.getsize(self.rows_path) // (self.dim * 4)
+        n = min(n_rows, len(self._meta))
+        if n != n_rows or n != len(self._meta):
+            self._repair(n)
+        if self.profile is not None and any(m.get("profile") != self.profile for m in self._meta):
+            n = self._drop_stale(n)
+        for i, m in enumerate(self._meta):
+            self._by_sig.setdefault(m.get("sig", ""), []).append(i)
+        self._remap(n)
+
+    def _drop_stale(self, n: int) -> int:
+        """Rewrite both files with only the current profile's rows (they can never match again)."""
+        keep = [i for i, m in enumerate(self._meta) if m.get("profile") == self.profile]
+        rows = np.fromfile(self.rows_path, dtype=np.float32, count=n * self.dim).reshape(n, self.dim)[keep]
+        tmp = self.rows_path + ".tmp"
+        rows.tofile(tmp)
+        os.replace(tmp, self.rows_path)
+        self._meta = [self._meta[i] for i in keep]
+        self._repair(len(keep))
+        return len(keep)
+
+    def _repair(self, n: int) -> None:
+        """Truncate both files to the n entries they agree on (after an interrupted append)."""
+        self._meta = self._meta[:n]
+        if os.path.exists(self.rows_path):
+            os.truncate(self.rows_path, n * self.dim * 4)
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            for rec in self._meta:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def _remap(self, n: int) -> None:
+        self._rows = None
+        if n > 0:
+            self._rows = np.memmap(self.rows_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def lookup(self, question: str, signature: str, threshold: float) -> Optional[Tuple[str, float]]:
+        """Return (answer, similarity) of the closest stored question with the same signature
+        that scores at least threshold and passes the key-term check."""
+        with self._lock:
+            if self._rows is None:
+                return None
+            ids = self._by_sig.get(signature)
+            if not ids:
+                return None
+            candidates = np.asarray(ids, dtype=np.int64)
+            q = vectorize(question, self.dim).astype(np.float64)
+            q_norm = np.linalg.norm(q)
+            if q_norm == 0:
+                return None
+            mat = np.asarray(self._rows[candidates], dtype=np.float64)
+            norms = np.linalg.norm(mat, axis=1)
+            norms[norms == 0] = 1.0
+            sims = (mat @ q) / (norms * q_norm)
+            for best in np.argsort(-sims)[:8]:
+                if sims[best] < threshold:
+                    break
+                meta = self._meta[int(candidates[best])]
+                if terms_compatible(question, meta.get("question", "")):
+                    return meta["answer"], float(sims[best])
+            return None
+
+    def add_many(self, entries: List[Tuple[str, str, str]]) -> None:
+        """Append (question, signature, answer) entries to both files and remap."""
+        if not entries:
+            return
+        with self._lock:
+            vecs = np.stack([vectorize(q, self.dim) for q, _, _ in entries])
+            with open(self.rows_path, "ab") as f:
+                f.write(vecs.astype(np.float32).tobytes())
+            with open(self.meta_path, "a", encoding="utf-8") as f:
+                for q, sig, ans in entries:
+                    rec = {"question": q, "sig": sig, "profile": self.profile, "answer": ans}
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    self._by_sig.setdefault(sig, []).append(len(self._meta))
+                    self._meta.append(rec)
+            self._remap(len(self._meta))
@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Dict, List
+
+# ---------------------------------
+# Aggregate Easy Apply traces (apply_trace.jsonl) across runs
+# ---------------------------------
+# Reads the transition and job records written by linkedin_auto_apply and prints
+# the outcome taxonomy, a per-state latency breakdown and LLM vs DOM time. Example:
+#   python apply_trace_report.py apply_trace.jsonl --since 2026-10-01
+
+
+def percentile(vals: List[float], q: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))]
+
+
+def load(path: str, since: float = 0.0):
+    transitions: List[dict] = []
+    jobs: List[dict] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            if rec.get("ts", 0) < since:
+                continue
+            if rec.get("type") == "job":
+                jobs.append(rec)
+            elif rec.get("type") == "transition":
+                transitions.append(rec)
+    return transitions, jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize Easy Apply state machine traces")
+    parser.add_argument("path", nargs="?", default=os.getenv("APPLY_TRACE_FILE", "apply_trace.jsonl"))
+    parser.add_argument("--since", default="", help="only records from this date on (YYYY-MM-DD)")
+    args = parser.parse_args()
+    if not os.path.isfile(args.path):
+        print(f"Trace file not found: {args.path}")
+        sys.exit(1)
+    since = 0.0
+    if args.since:
+        since = time.mktime(time.strptime(args.since, "%Y-%m-%d"))
+    transitions, jobs = load(args.path, since)
+
+    outcomes: Dict[str, int] = {}
+    for j in jobs:
+        outcomes[j.get("outcome") or "unknown"] = outcomes.get(j.get("outcome") or "unknown", 0) + 1
+    print(f"Jobs: {len(jobs)}")
+    for name, n in sorted(outcomes.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<20}{n:>6}{100.0 * n / len(jobs):>7.1f}%")
+
+    by_state: Dict[str, List[float]] = {}
+    for t in transitions:
+        by_state.setdefault(t.get("state") or "?", []).append(float(t.get("total_s") or 0.0))
+    print(f"\n{'state':<14}{'count':>7}{'sum s':>10}{'p50 s':>9}{'p95 s':>9}")
+    for state, vals in sorted(by_state.items(), key=lambda kv: -sum(kv[1])):
+        print(f"{state:<14}{len(vals):>7}{sum(vals):>10.2f}{percentile(vals, 0.5):>9.3f}{percentile(vals, 0.95):>9.3f}")
+
+    if jobs:
+        total = sum(float(j.get("total_s") or 0.0) for j in jobs)
+        llm = sum(float(j.get("llm_s") or 0.0) for j in jobs)
+        dom = sum(float(j.get("dom_s") or 0.0) for j in jobs)
+        print(f"\nPer job: {total / len(jobs):.2f}s total, {llm / len(jobs):.2f}s LLM, {dom / len(jobs):.2f}s DOM")
+        errors = [j for j in jobs if j.get("error")]
+        if errors:
+            print(f"\nLast errors ({min(5, len(errors))} of {len(errors)}):")
+            for j in errors[-5:]:
+                print(f"  {j.get('job_id')}: {j.get('error')}")
+
+
+if __name__ == "__main__":
+    main()
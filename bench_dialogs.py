@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, List
+
+# ---------------------------------
+# Offline benchmark for dialog filling (recorded fixtures + mock LLM)
+# ---------------------------------
+# Serves a fixture corpus with dialog_fixture_server, answers questions with
+# mock_llm_server and drives headless Chrome through fill_missing_dialog_fields
+# (every step opened directly) and easy_apply_on_job (whole jobs). Reports
+# steps/s, WebDriver commands and LLM requests. Example:
+#   python bench_dialogs.py --repeat 3 --mode both
+
+# Must be set before linkedin_auto_apply / llm_provider are imported
+os.environ["LLM_CACHE"] = "0"
+os.environ["LLM_SIMILARITY"] = "0"
+os.environ["LLM_WARMUP"] = "0"
+os.environ.setdefault("LLM_METRICS_FILE", "")
+os.environ.setdefault("CHROME_HEADLESS", "1")
+os.environ.setdefault("BROWSER_ATTACH", "0")  # own headless browser, not the daemon
+os.environ.setdefault("DIALOG_RECORD_DIR", "")
+
+
+class CommandCounter:
+    """Counts WebDriver commands by wrapping driver.execute (elements call it too)."""
+
+    def __init__(self, driver):
+        self.total = 0
+        self.by_name: Dict[str, int] = {}
+        self._execute = driver.execute
+        driver.execute = self._counted
+
+    def _counted(self, driver_command, params=None):
+        self.total += 1
+        self.by_name[driver_command] = self.by_name.get(driver_command, 0) + 1
+        return self._execute(driver_command, params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dialog filling against recorded fixtures")
+    parser.add_argument("--corpus", default="", help="fixture directory (default: fixtures/easy_apply)")
+    parser.add_argument("--mode", choices=["fill", "apply", "both"], default="both")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--step-delay", type=int, default=150, help="ms before the replayer shows the next step")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock LLM latency in seconds")
+    parser.add_argument("--plans", action="store_true", help="keep the fill-plan cache enabled")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="bench_dialogs_")
+    os.environ["APPLY_TRACE_FILE"] = os.path.join(work, "apply_trace.jsonl")
+    os.environ["FILL_PLAN_PATH"] = os.path.join(work, "fill_plans.sqlite3")
+    os.environ["APPLIED_LEDGER_PATH"] = os.path.join(work, "applied_jobs.sqlite3")
+    if not args.plans:
+        os.environ["FILL_PLAN_CACHE"] = "0"
+
+    import dialog_fixture_server
+    from mock_llm_server import start_server as start_llm
+    corpus = args.corpus or dialog_fixture_server.DEFAULT_CORPUS
+    jobs = dialog_fixture_server.load_corpus(corpus)
+    if not jobs:
+        print(f"No recorded jobs in {corpus}")
+        return
+    fixtures = dialog_fixture_server.start_server(corpus, step_delay=args.step_delay)
+    base = f"http://127.0.0.1:{fixtures.server_address[1]}"
+    llm_server = start_llm(latency=args.latency, jitter=args.latency / 3)
+
+    import llm_provider
+    llm_provider.OPENROUTER_API_KEY = ""  # route to the mock endpoint
+    llm_provider.OPENAI_BASE_URL = f"http://127.0.0.1:{llm_server.server_address[1]}/v1"
+    llm_provider.OPENAI_API_KEY = "mock"
+    llm_provider.OPENAI_MODEL = "mock-model"
+
+    import linkedin_auto_apply as la
+    from llm_telemetry import snapshot
+    la.DATASET_FILE = os.path.join(work, "data_set.json")  # no dataset hits, nothing written to the repo
+    la._dataset_cache = None
+    counter = CommandCounter(la.driver)
+
+    def llm_http_calls() -> int:
+        return sum(s["calls"] for s in snapshot()["series"])
+
+    results: List[dict] = []
+    try:
+        if args.mode in ("fill", "both"):
+            steps = cmds = llm_req = 0
+            llm_http0 = llm_http_calls()
+            busy = 0.0
+            for _ in range(args.repeat):
+                for job_id, pages in jobs.items():
+                    for i in range(len(pages)):
+                        la.driver.get(f"{base}/jobs/view/{job_id}/?step={i}")
+                        la._reset_dialog_state()
+                        c0, r0 = counter.total, la.LLM_STATS["requests"]
+                        t0 = time.perf_counter()
+                        la.fill_missing_dialog_fields()
+                        busy += time.perf_counter() - t0
+                        cmds += counter.total - c0
+                        llm_req += la.LLM_STATS["requests"] - r0
+                        steps += 1
+            results.append({"mode": "fill_missing_dialog_fields", "jobs": len(jobs) * args.repeat, "steps": steps,
+                            "wall": busy, "cmds": cmds, "llm_requests": llm_req,
+                            "llm_http": llm_http_calls() - llm_http0, "outcomes": {}})
+
+        if args.mode in ("apply", "both"):
+            outcomes: Dict[str, int] = {}
+            c0, r0, h0 = counter.total, la.LLM_STATS["requests"], llm_http_calls()
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                for job_id in jobs:
+                    outcome = la.easy_apply_on_job(f"{base}/jobs/view/{job_id}/")
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            wall = time.perf_counter() - t0
+            steps = 0
+            with open(la.APPLY_TRACE_FILE, "r", encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    if rec.get("type") == "transition" and rec.get("state") == la.FILL:
+                        steps += 1
+            results.append({"mode": "easy_apply_on_job", "jobs": len(jobs) * args.repeat, "steps": steps,
+                            "wall": wall, "cmds": counter.total - c0,
+                            "llm_requests": la.LLM_STATS["requests"] - r0,
+                            "llm_http": llm_http_calls() - h0, "outcomes": outcomes})
+    finally:
+        try:
+            la.driver.quit()
+        except Exception:
+            pass
+        fixtures.shutdown()
+        llm_server.shutdown()
+
+    print(f"Corpus: {corpus}  jobs={len(jobs)}  repeat={args.repeat}  step_delay={args.step_delay}ms  "
+          f"llm_latency={args.latency}s")
+    print(f"{'mode':<28}{'steps':>6}{'wall s':>9}{'steps/s':>9}{'cmds':>7}{'cmd/step':>9}{'llm req':>8}{'llm http':>9}")
+    for r in results:
+        print(f"{r['mode']:<28}{r['steps']:>6}{r['wall']:>9.2f}{r['steps'] / r['wall'] if r['wall'] else 0:>9.2f}"
+              f"{r['cmds']:>7}{r['cmds'] / max(1, r['steps']):>9.1f}{r['llm_requests']:>8}{r['llm_http']:>9}")
+        if r["outcomes"]:
+            print("    outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(r["outcomes"].items())))
+    top = sorted(counter.by_name.items(), key=lambda kv: -kv[1])[:8]
+    print("WebDriver commands: " + ", ".join(f"{k}={v}" for k, v in top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+# ---------------------------------
+# Offline benchmark for llm_provider (single vs batch vs sharded)
+# ---------------------------------
+# Runs against mock_llm_server (started in-process unless --base-url is given),
+# with the answer cache and similarity index disabled so every question costs
+# a model round trip. Example:
+#   python bench_llm.py --questions 60 --batch-sizes 1,5,15 --concurrency 1,4
+
+# Must be set before llm_provider is imported
+os.environ["LLM_CACHE"] = "0"
+os.environ["LLM_SIMILARITY"] = "0"
+os.environ["LLM_WARMUP"] = "0"
+os.environ.setdefault("LLM_METRICS_FILE", "")
+
+QUESTIONS = [
+    ("How many years of experience do you have with React?", "number", None),
+    ("How many years of Node.js experience do you have?", "number", None),
+    ("What is your notice period in days?", "number", None),
+    ("Are you willing to relocate?", "radio", ["Yes", "No"]),
+    ("Are you comfortable working remotely?", "radio", ["Yes", "No"]),
+    ("What is your current CTC?", "text", None),
+    ("Highest level of education", "select", ["Bachelor's Degree", "Master's Degree", "Doctorate"]),
+    ("LinkedIn profile URL", "url", None),
+    ("Do you require visa sponsorship?", "radio", ["Yes", "No"]),
+    ("Why do you want to change jobs?", "textarea", None),
+]
+
+
+def make_items(n: int) -> List[Dict]:
+    items = []
+    for i in range(n):
+        q, kind, choices = QUESTIONS[i % len(QUESTIONS)]
+        items.append({"question": f"{q} ({i})", "kind": kind, "choices": choices or []})
+    return items
+
+
+def percentile(vals: List[float], q: float) -> float:
+    if not vals:
+        return 0.0
+    s = sorted(vals)
+    return s[min(len(s) - 1, max(0, int(round(q * (len(s) - 1)))))]
+
+
+def run(label: str, calls: List[Callable[[], object]], n_questions: int, concurrency: int) -> Dict:
+    latencies: List[float] = []
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, calls))
+    wall = time.perf_counter() - t0
+    return {
+        "label": label,
+        "concurrency": concurrency,
+        "calls": len(calls),
+        "wall": wall,
+        "qps": n_questions / wall if wall else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark llm_provider against a mock endpoint")
+    parser.add_argument("--base-url", default="", help="existing OpenAI-compatible endpoint; default starts the mock")
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--batch-sizes", default="1,5,10,20")
+    parser.add_argument("--concurrency", default="1,4,8")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--per-item", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        from mock_llm_server import start_server
+        server = start_server(latency=args.latency, jitter=args.latency / 3, per_item=args.per_item,
+                              failure_rate=args.failure_rate, malformed_rate=args.malformed_rate)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    import llm_provider
+    llm_provider.OPENROUTER_API_KEY = ""  # route to the OpenAI-compatible endpoint
+    llm_provider.OPENAI_BASE_URL = base_url
+    llm_provider.OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or "mock"
+    llm_provider.OPENAI_MODEL = os.getenv("OPENAI_MODEL", "mock-model")
+
+    items = make_items(args.questions)
+    batch_sizes = [int(x) for x in args.batch_sizes.split(",") if x.strip()]
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    print(f"Endpoint: {base_url}  questions={len(items)}")
+
+    results = []
+    for conc in levels:
+        calls = [lambda it=it: llm_provider.llm_answer(it["question"], it["kind"], it["choices"] or None)
+                 for it in items]
+        results.append(run("llm_answer", calls, len(items), conc))
+        for size in batch_sizes:
+            chunks = [items[i:i + size] for i in range(0, len(items), size)]
+            calls = [lambda ch=ch: llm_provider.llm_answer_batch(ch) for ch in chunks]
+            results.append(run(f"llm_answer_batch[{size}]", calls, len(items), conc))
+            calls = [lambda ch=ch: asyncio.run(llm_provider.allm_answer_batch(ch)) for ch in chunks]
+            results.append(run(f"allm_answer_batch[{size}]", calls, len(items), conc))
+
+    print(f"{'mode':<26}{'conc':>5}{'calls':>7}{'wall s':>9}{'q/s':>9}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}")
+    for r in results:
+        print(f"{r['label']:<26}{r['concurrency']:>5}{r['calls']:>7}{r['wall']:>9.2f}{r['qps']:>9.1f}"
+              f"{r['p50']:>8.3f}{r['p95']:>8.3f}{r['p99']:>8.3f}")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
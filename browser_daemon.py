@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import subprocess
+import urllib.request
+from typing import List, Optional
+
+# ---------------------------------
+# Long-lived Chrome with remote debugging
+# ---------------------------------
+# Start once and keep it running:
+#   python browser_daemon.py            (port 9222, profile in ./chrome-daemon-profile)
+# The scrapers then attach through debuggerAddress instead of cold-launching
+# Chrome, and the persistent profile keeps the login between runs. When nothing
+# listens on CHROME_DEBUGGER_ADDRESS they launch their own browser as before.
+# BROWSER_ATTACH=0 always launches a fresh browser.
+DEBUGGER_ADDRESS = os.getenv("CHROME_DEBUGGER_ADDRESS", "127.0.0.1:9222")
+BROWSER_ATTACH = os.getenv("BROWSER_ATTACH", "1") != "0"
+PROFILE_DIR = os.getenv("CHROME_DAEMON_PROFILE", os.path.join(os.getcwd(), "chrome-daemon-profile"))
+
+_CHROME_CANDIDATES = [
+    "google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+]
+
+
+def daemon_alive(address: str = DEBUGGER_ADDRESS, timeout: float = 0.5) -> Optional[dict]:
+    """Browser version info from the DevTools endpoint, or None if nothing answers."""
+    try:
+        with urllib.request.urlopen(f"http://{address}/json/version", timeout=timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+    except Exception:
+        return None
+
+
+def get_driver(service, options, address: str = DEBUGGER_ADDRESS):
+    """Attach to the daemon browser when it is up, otherwise launch Chrome with `options`.
+    Launch-only switches can't be applied to a running browser, so an attached
+    session only carries the debugger address and the page-load strategy."""
+    from selenium import webdriver
+
+    if BROWSER_ATTACH and daemon_alive(address):
+        try:
+            attach = webdriver.ChromeOptions()
+            attach.add_experimental_option("debuggerAddress", address)
+            attach.page_load_strategy = getattr(options, "page_load_strategy", "normal")
+            drv = webdriver.Chrome(service=service, options=attach)
+            drv._attached_to_daemon = True
+            print(f"Attached to running Chrome at {address}")
+            return drv
+        except Exception as e:
+            print(f"Attach to {address} failed, launching a new browser: {e}")
+    return webdriver.Chrome(service=service, options=options)
+
+
+def release_driver(drv) -> None:
+    """End the WebDriver session; a daemon browser is left running for the next run."""
+    if drv is None:
+        return
+    try:
+        if getattr(drv, "_attached_to_daemon", False):
+            drv.service.stop()  # only the chromedriver process; Chrome keeps the tabs/session
+        else:
+            drv.quit()
+    except Exception:
+        pass
+
+
+def find_chrome() -> Optional[str]:
+    env = os.getenv("CHROME_BINARY")
+    if env:
+        return env
+    for cand in _CHROME_CANDIDATES:
+        path = shutil.which(cand) or (cand if os.path.isfile(cand) else None)
+        if path:
+            return path
+    return None
+
+
+def chrome_command(binary: str, port: int, profile_dir: str, headless: bool) -> List[str]:
+    cmd = [
+        binary,
+        f"--remote-debugging-port={port}",
+        "--remote-debugging-address=127.0.0.1",
+        f"--user-data-dir={profile_dir}",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "--disable-blink-features=AutomationControlled",
+        "--start-maximized",
+        "--window-size=1920,1080",
+        "--lang=en-US",
+    ]
+    if headless:
+        cmd.append("--headless=new")
+    return cmd
+
+
+def supervise(cmd: List[str], address: str, check_interval: float = 5.0, max_failed_checks: int = 3) -> None:
+    """Run Chrome and restart it whenever it exits or stops answering DevTools."""
+    backoff = 1.0
+    proc: Optional[subprocess.Popen] = None
+
+    def stop(*_):
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except Exception:
+                proc.kill()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    while True:
+        started = time.time()
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print(f"Chrome started (pid {proc.pid}), DevTools at http://{address}")
+        failed = 0
+        while proc.poll() is None:
+            time.sleep(check_interval)
+            if daemon_alive(address, timeout=2.0):
+                failed = 0
+                continue
+            failed += 1
+            if failed >= max_failed_checks and time.time() - started > check_interval * max_failed_checks:
+                print("Chrome stopped answering DevTools; restarting it.")
+                proc.kill()
+                proc.wait()
+                break
+        # Quick repeated crashes back off up to a minute
+        backoff = 1.0 if time.time() - started > 60 else min(60.0, backoff * 2)
+        print(f"Chrome exited with code {proc.returncode}; restarting in {backoff:.0f}s")
+        time.sleep(backoff)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep one Chrome with remote debugging running for the scrapers")
+    parser.add_argument("--port", type=int, default=int(DEBUGGER_ADDRESS.rsplit(":", 1)[-1]))
+    parser.add_argument("--profile-dir", default=PROFILE_DIR)
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--chrome", default="", help="Chrome binary (default: CHROME_BINARY or PATH lookup)")
+    args = parser.parse_args()
+
+    address = f"127.0.0.1:{args.port}"
+    if daemon_alive(address):
+        print(f"A browser already answers on {address}; nothing to do.")
+        return
+    binary = args.chrome or find_chrome()
+    if not binary:
+        print("Chrome binary not found; set CHROME_BINARY or pass --chrome.")
+        sys.exit(1)
+    os.makedirs(args.profile_dir, exist_ok=True)
+    supervise(chrome_command(binary, args.port, args.profile_dir, args.headless), address)
+
+
+if __name__ == "__main__":
+    main()
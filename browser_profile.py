@@ -0,0 +1,49 @@
+import os
+from typing import List
+
+# ---------------------------------
+# Shared "lite" browser profile for the Selenium scrapers
+# ---------------------------------
+# Blocks images, fonts, media and analytics/beacon requests through CDP
+# Network.setBlockedURLs and uses the eager page-load strategy (navigation
+# returns at DOMContentLoaded, so callers must wait on the elements they read).
+# BROWSER_LITE=0 turns all of it off, e.g. to debug a page visually.
+BROWSER_LITE = os.getenv("BROWSER_LITE", "1") != "0"
+BROWSER_EAGER = os.getenv("BROWSER_EAGER", "1") != "0"
+
+BLOCKED_URL_PATTERNS: List[str] = [
+    # images
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.ico", "*.bmp",
+    # (static.licdn.com/aero-v1/sc/h/ also serves CSS/JS, so its images are only caught by extension)
+    "*media.licdn.com/dms/image*", "*img.naukimg.com*",
+    # fonts
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    # media
+    "*.mp4", "*.webm", "*.mp3", "*.m4a", "*.ogg", "*.m3u8",
+    # analytics / beacons
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*px.ads.linkedin.com*", "*linkedin.com/li/track*", "*linkedin.com/sensorCollect*", "*snap.licdn.com*",
+    "*bat.bing.com*", "*connect.facebook.net*", "*facebook.com/tr*", "*hotjar.com*", "*clarity.ms*",
+    "*newrelic.com*", "*nr-data.net*", "*sentry.io*", "*omtrdc.net*", "*demdex.net*",
+]
+# Extra comma separated patterns, e.g. BROWSER_BLOCK_EXTRA="*.svg,*ads.example.com*"
+BLOCKED_URL_PATTERNS += [p.strip() for p in os.getenv("BROWSER_BLOCK_EXTRA", "").split(",") if p.strip()]
+
+
+def apply_options(options, eager: bool = True) -> None:
+    """Set launch-time options (before webdriver.Chrome is created)."""
+    if BROWSER_LITE and BROWSER_EAGER and eager:
+        options.page_load_strategy = "eager"
+
+
+def apply_driver(driver) -> bool:
+    """Install the request block list on a running driver; returns True when active."""
+    if not BROWSER_LITE:
+        return False
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return True
+    except Exception as e:
+        print(f"Resource blocking unavailable: {e}")
+        return False
@@ -0,0 +1,64 @@
+import os
+import argparse
+from typing import List, Tuple
+
+from answer_index import similarity
+
+# ---------------------------------
+# Threshold calibration for the answer similarity index
+# ---------------------------------
+# Scores labelled question pairs (1 = same question, 0 = needs a different
+# answer) with answer_index.similarity and prints precision/recall per
+# threshold plus a recommended LLM_SIMILARITY_THRESHOLD. Example:
+#   python calibrate_similarity.py --pairs data/paraphrase_pairs.tsv
+DEFAULT_PAIRS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "paraphrase_pairs.tsv")
+MARGIN = 0.03  # stay a little below the highest threshold that keeps every true match
+
+
+def load_pairs(path: str) -> List[Tuple[int, str, str]]:
+    pairs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            label, a, b = line.rstrip("\n").split("\t")[:3]
+            pairs.append((int(label), a, b))
+    return pairs
+
+
+def calibrate(pairs: List[Tuple[int, str, str]]) -> Tuple[float, List[dict]]:
+    """(recommended threshold, per-threshold rows) maximizing F1, then the highest such threshold."""
+    scored = [(label, similarity(a, b)) for label, a, b in pairs]
+    rows = []
+    for step in range(20, 96):
+        th = step / 100
+        tp = sum(1 for l, s in scored if l == 1 and s >= th)
+        fp = sum(1 for l, s in scored if l == 0 and s >= th)
+        fn = sum(1 for l, s in scored if l == 1 and s < th)
+        f1 = 2 * tp / (2 * tp + fp + fn) if tp else 0.0
+        rows.append({"threshold": th, "tp": tp, "fp": fp, "fn": fn, "f1": f1})
+    best_f1 = max(r["f1"] for r in rows)
+    top = max(r["threshold"] for r in rows if r["f1"] == best_f1)
+    return round(max(0.0, top - MARGIN), 2), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate LLM_SIMILARITY_THRESHOLD on labelled question pairs")
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS)
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.pairs)
+    recommended, rows = calibrate(pairs)
+    print(f"{len(pairs)} pairs ({sum(1 for p in pairs if p[0] == 1)} matches)")
+    print(f"{'threshold':>9}{'tp':>5}{'fp':>5}{'fn':>5}{'f1':>7}")
+    for r in rows[::5]:
+        print(f"{r['threshold']:>9.2f}{r['tp']:>5}{r['fp']:>5}{r['fn']:>5}{r['f1']:>7.3f}")
+    print(f"Recommended LLM_SIMILARITY_THRESHOLD={recommended}")
+    for label, a, b in pairs:
+        s = similarity(a, b)
+        if (s >= recommended) != (label == 1):
+            print(f"  {'missed' if label else 'false match'} ({s:.3f}): {a!r} / {b!r}")
+
+
+if __name__ == "__main__":
+    main()
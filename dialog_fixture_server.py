@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import urlparse, parse_qs
+
+# ---------------------------------
+# Local replayer for recorded Easy Apply dialogs
+# ---------------------------------
+# Serves a corpus written by linkedin_auto_apply (DIALOG_RECORD_DIR) or the
+# bundled fixtures/easy_apply samples:
+#   <corpus>/<job id>/step_0.html, step_1.html, ... (dialog outerHTML)
+# GET /jobs/view/<job id>/ returns a page with an Easy Apply button
+# (#jobs-apply-button-id) that opens step 0. A small harness reproduces the
+# dialog behaviour the bot relies on:
+# - Next/Review/Submit check required fields.
+# - Empty required fields get [data-test-form-element-error-messages].
+# - A valid click advances to the next recorded step after step_delay ms.
+# - Submit or Dismiss removes the dialog.
+# ?step=<n> opens the dialog directly at step n.
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "easy_apply")
+DEFAULTS = {
+    "step_delay": int(os.getenv("FIXTURE_STEP_DELAY_MS", "150")),  # ms between a valid click and the next step
+}
+
+_CSS = """
+body { font-family: sans-serif; margin: 2em; }
+div[role="dialog"] { position: fixed; top: 5%; left: 20%; width: 60%; max-height: 90%; overflow: auto;
+                     background: #fff; border: 1px solid #999; padding: 1em; }
+[data-test-form-element-error-messages] { color: #b00; font-size: 0.9em; }
+label, legend { display: block; margin-top: 0.8em; }
+"""
+
+_HARNESS_JS = r"""
+(() => {
+  const steps = JSON.parse(document.getElementById('la-steps').textContent);
+  const delay = JSON.parse(document.getElementById('la-config').textContent).step_delay;
+  const STEP_BUTTONS = ['Continue to next step', 'Review your application', 'Submit application'];
+  let cur = -1, dialog = null;
+  const show = i => {
+    const tpl = document.createElement('template');
+    tpl.innerHTML = steps[i].trim();
+    const d = tpl.content.firstElementChild;
+    d.querySelectorAll('[data-test-form-element-error-messages]').forEach(e => { e.textContent = ''; });
+    if (dialog) dialog.replaceWith(d); else document.body.appendChild(d);
+    dialog = d;
+    cur = i;
+  };
+  const close = () => { if (dialog) dialog.remove(); dialog = null; };
+  const container = el => el.closest('[data-test-form-element], [data-test-single-line-text-form-component], '
+    + '[data-test-form-builder-radio-button-form-component], [data-test-dropdown-select-component], fieldset')
+    || el.parentElement;
+  const setError = (el, msg) => {
+    const box = container(el);
+    let e = box.querySelector('[data-test-form-element-error-messages]');
+    if (!e) {
+      e = document.createElement('div');
+      e.setAttribute('data-test-form-element-error-messages', '');
+      box.appendChild(e);
+    }
+    e.textContent = msg;
+  };
+  const isRequired = el => el.required || el.getAttribute('aria-required') === 'true'
+    || !!(el.closest('fieldset[aria-required="true"]'));
+  const validate = () => {
+    dialog.querySelectorAll('[data-test-form-element-error-messages]').forEach(e => { e.textContent = ''; });
+    let ok = true;
+    const groups = new Set();
+    for (const el of dialog.querySelectorAll('input, select, textarea')) {
+      const type = (el.getAttribute('type') || '').toLowerCase();
+      if (['hidden', 'submit', 'button', 'file'].includes(type) || !isRequired(el)) continue;
+      if (type === 'radio' || type === 'checkbox') {
+        const root = el.closest('fieldset') || el.parentElement;
+        if (groups.has(root)) continue;
+        groups.add(root);
+        if (![...root.querySelectorAll('input[type="' + type + '"]')].some(m => m.checked)) {
+          setError(el, 'Please make a selection');
+          ok = false;
+        }
+        continue;
+      }
+      const v = (el.value || '').trim();
+      if (!v || (el.tagName === 'SELECT' && /^select an option$/i.test(v))) {
+        setError(el, 'Please enter a valid answer');
+        ok = false;
+      } else if (el.getAttribute('data-la-numeric') !== null && !(parseFloat(v) > 0)) {
+        setError(el, 'Enter a decimal number larger than 0.0');
+        ok = false;
+      }
+    }
+    return ok;
+  };
+  document.addEventListener('click', ev => {
+    const b = ev.target.closest('button');
+    if (!b) return;
+    if (b.id === 'jobs-apply-button-id') { show(0); return; }
+    const label = b.getAttribute('aria-label');
+    if (label === 'Dismiss') { close(); return; }
+    if (!STEP_BUTTONS.includes(label) || !dialog) return;
+    ev.preventDefault();
+    if (!validate()) return;
+    setTimeout(() => {
+      if (label === 'Submit application' || cur + 1 >= steps.length) close();
+      else show(cur + 1);
+    }, delay);
+  }, true);
+  const start = new URLSearchParams(location.search).get('step');
+  if (start !== null) show(Math.max(0, Math.min(steps.length - 1, parseInt(start, 10) || 0)));
+})();
+"""
+
+
+def load_corpus(corpus: str) -> Dict[str, List[str]]:
+    """{job id: [step html, ...]} for every job folder in the corpus."""
+    jobs: Dict[str, List[str]] = {}
+    if not os.path.isdir(corpus):
+        return jobs
+    for name in sorted(os.listdir(corpus)):
+        folder = os.path.join(corpus, name)
+        if not os.path.isdir(folder):
+            continue
+        files = [f for f in os.listdir(folder) if re.fullmatch(r"step_\d+\.html", f)]
+        files.sort(key=lambda f: int(re.search(r"\d+", f).group(0)))
+        steps = []
+        for f in files:
+            with open(os.path.join(folder, f), "r", encoding="utf-8") as fh:
+                steps.append(fh.read())
+        if steps:
+            jobs[name] = steps
+    return jobs
+
+
+def render_job(job_id: str, steps: List[str], config: dict) -> str:
+    # "</" inside the JSON would end the script element early
+    steps_json = json.dumps(steps).replace("</", "<\\/")
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        f"<title>Job {job_id}</title><style>{_CSS}</style></head><body>"
+        f"<h1>Job {job_id}</h1>"
+        "<button id=\"jobs-apply-button-id\" type=\"button\">Easy Apply</button>"
+        f"<script type=\"application/json\" id=\"la-steps\">{steps_json}</script>"
+        f"<script type=\"application/json\" id=\"la-config\">{json.dumps(config)}</script>"
+        f"<script>{_HARNESS_JS}</script>"
+        "</body></html>"
+    )
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    jobs: Dict[str, List[str]] = {}
+    config = dict(DEFAULTS)
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: str, content_type: str = "text/html; charset=utf-8"):
+        raw = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(raw)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ("/", "/index.html"):
+            links = "".join(f'<li><a href="/jobs/view/{j}/">{j}</a> ({len(s)} steps)</li>'
+                            for j, s in self.jobs.items())
+            self._send(200, f"<!DOCTYPE html><html><body><ul>{links}</ul></body></html>")
+            return
+        if url.path == "/jobs.json":
+            self._send(200, json.dumps({j: len(s) for j, s in self.jobs.items()}), "application/json")
+            return
+        m = re.fullmatch(r"/jobs/view/([^/]+)/?", url.path)
+        if m and m.group(1) in self.jobs:
+            config = dict(self.config)
+            qs = parse_qs(url.query)
+            if "delay" in qs:
+                config["step_delay"] = int(qs["delay"][0])
+            self._send(200, render_job(m.group(1), self.jobs[m.group(1)], config))
+            return
+        self._send(404, "not found", "text/plain")
+
+
+def start_server(corpus: str = DEFAULT_CORPUS, host: str = "127.0.0.1", port: int = 0,
+                 **overrides) -> ThreadingHTTPServer:
+    """Serve a corpus on a daemon thread; port 0 picks a free one."""
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,),
+                   {"jobs": load_corpus(corpus), "config": {**DEFAULTS, **overrides}})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="dialog-fixtures", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Easy Apply dialogs for offline runs")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--step-delay", type=int, default=DEFAULTS["step_delay"])
+    args = parser.parse_args()
+    jobs = load_corpus(args.corpus)
+    handler = type("ConfiguredFixtureHandler", (FixtureHandler,),
+                   {"jobs": jobs, "config": {**DEFAULTS, "step_delay": args.step_delay}})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Serving {len(jobs)} recorded jobs on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
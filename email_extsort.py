@@ -0,0 +1,179 @@
+import os
+import shutil
+import hashlib
+import tempfile
+import time
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from findSameEmails import canonical_email
+
+# ---------------------------------
+# Out-of-core dedup / diff for email lists larger than RAM
+# ---------------------------------
+# Pass 1 reads the inputs once and hashes each canonical key to 64 bits
+# (blake2b). Every chunk_size addresses, the (key, position) pairs are sorted,
+# reduced to the first position per key and saved as a .npy run. The runs are
+# merged k-way through np.memmap blocks, which yields the first position of
+# every unique key; those positions are sorted externally the same way and
+# pass 2 re-reads the inputs, writing the lines whose position comes up.
+# Memory is about chunk_size * 16 bytes whatever the input size. A position is
+# (file index << 40) | line number. Distinct addresses collide with
+# probability ~ n^2 / 2^65 (about 3e-4 for 100M unique addresses).
+DEFAULT_CHUNK_SIZE = int(os.getenv("EXTSORT_CHUNK_SIZE", str(4_000_000)))  # addresses per run
+
+RUN_DTYPE = np.dtype([("key", "<u8"), ("pos", "<u8")])
+_LINE_BITS = 40
+
+
+def key64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _first_per_key(arr: np.ndarray) -> np.ndarray:
+    """Sort (key, pos) records and keep the smallest position of each key; a key that is also
+    in an exclude list (position 0) keeps that record plus its first input position."""
+    arr = arr[np.lexsort((arr["pos"], arr["key"]))]
+    if len(arr):
+        keep = np.empty(len(arr), dtype=bool)
+        keep[0] = True
+        np.not_equal(arr["key"][1:], arr["key"][:-1], out=keep[1:])
+        keep[1:] |= (arr["pos"][:-1] == 0) & (arr["pos"][1:] != 0)
+        arr = arr[keep]
+    return arr
+
+
+def _save_run(work_dir: str, runs: List[str], arr: np.ndarray, prefix: str = "keys") -> None:
+    path = os.path.join(work_dir, f"{prefix}_{len(runs):05d}.npy")
+    np.save(path, arr)
+    runs.append(path)
+
+
+def _merge_runs(paths: List[str], block: int, field: Optional[str] = None) -> Iterator[np.ndarray]:
+    """Blocks of the k-way merge of sorted runs, in order of `field` (or the value itself).
+    Each yielded batch holds every record up to a cutoff value, unsorted within the batch;
+    records equal to the cutoff are never split across batches."""
+    runs = [np.load(p, mmap_mode="r") for p in paths]
+    offs = [0] * len(runs)
+    while True:
+        live = [i for i in range(len(runs)) if offs[i] < len(runs[i])]
+        if not live:
+            return
+        blocks = {i: runs[i][offs[i]:offs[i] + block] for i in live}
+        vals = {i: (b[field] if field else b) for i, b in blocks.items()}
+        cutoff = min(v[-1] for v in vals.values())
+        parts = []
+        for i in live:
+            n = int(np.searchsorted(vals[i], cutoff, side="right"))
+            end = offs[i] + n
+            if n == len(blocks[i]):
+                # the cutoff value may continue past this block; take the rest of it too
+                run = runs[i][field] if field else runs[i]
+                while end < len(run) and run[end] == cutoff:
+                    end += 1
+            parts.append(np.array(runs[i][offs[i]:end]))
+            offs[i] = end
+        yield np.concatenate(parts)
+
+
+def _iter_lines(input_paths: List[str]) -> Iterator[tuple]:
+    for file_no, path in enumerate(input_paths):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line_no, line in enumerate(f, start=1):
+                yield (file_no << _LINE_BITS) | line_no, line
+
+
+def dedup_external(input_paths: List[str], output_path: str, exclude_paths: Optional[List[str]] = None,
+                   provider_rules: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   work_dir: Optional[str] = None) -> Dict[str, float]:
+    """Unique canonical addresses of input_paths (first-seen order) that are not in exclude_paths,
+    written to output_path with bounded memory."""
+    t0 = time.perf_counter()
+    tmp = tempfile.mkdtemp(prefix="email_extsort_", dir=work_dir)
+    stats = {"lines": 0, "unique": 0, "duplicates": 0, "invalid": 0, "excluded": 0, "runs": 0}
+    try:
+        # Pass 1: hashed keys -> sorted runs; excluded lists use position 0, below any input line
+        runs: List[str] = []
+        keys, poss = array("Q"), array("Q")
+
+        def flush():
+            if keys:
+                arr = np.empty(len(keys), dtype=RUN_DTYPE)
+                arr["key"] = np.frombuffer(keys, dtype="<u8")
+                arr["pos"] = np.frombuffer(poss, dtype="<u8")
+                _save_run(tmp, runs, _first_per_key(arr))
+                del keys[:], poss[:]
+
+        lines = invalid = 0
+        sources = [(None, p) for p in (exclude_paths or [])] + list(enumerate(input_paths))
+        for file_no, path in sources:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for line_no, line in enumerate(f, start=1):
+                    parsed = canonical_email(line, provider_rules)
+                    if parsed is None:
+                        if file_no is not None and line.strip():
+                            lines += 1
+                            invalid += 1
+                        continue
+                    if file_no is None:
+                        poss.append(0)
+                    else:
+                        lines += 1
+                        poss.append((file_no << _LINE_BITS) | line_no)
+                    keys.append(key64(parsed[1]))
+                    if len(keys) >= chunk_size:
+                        flush()
+        flush()
+        stats.update(lines=lines, invalid=invalid, runs=len(runs))
+
+        # k-way merge by key -> first position per key, spilled as position-sorted runs
+        block = max(1024, chunk_size // (len(runs) + 1))
+        pos_runs: List[str] = []
+        pending: List[np.ndarray] = []
+        pending_n = 0
+        for batch in _merge_runs(runs, block, field="key"):
+            batch = batch[np.lexsort((batch["pos"], batch["key"]))]
+            starts = np.ones(len(batch), dtype=bool)
+            np.not_equal(batch["key"][1:], batch["key"][:-1], out=starts[1:])
+            ends = np.roll(starts, -1)
+            first, last = batch["pos"][starts], batch["pos"][ends]
+            # a key whose first position is 0 is in an exclude list; count it if the inputs have it too
+            stats["excluded"] += int(np.count_nonzero((first == 0) & (last != 0)))
+            first = first[first != 0]
+            pending.append(first)
+            pending_n += len(first)
+            if pending_n >= chunk_size:
+                _save_run(tmp, pos_runs, np.sort(np.concatenate(pending)), "pos")
+                pending, pending_n = [], 0
+        if pending_n:
+            _save_run(tmp, pos_runs, np.sort(np.concatenate(pending)), "pos")
+        for p in runs:
+            os.remove(p)
+
+        # Pass 2: re-read the inputs and write the lines at the merged, ascending positions
+        wanted = (np.sort(b) for b in _merge_runs(pos_runs, max(1024, chunk_size // (len(pos_runs) + 1))))
+        current = next(wanted, None)
+        current = current.tolist() if current is not None else None
+        idx = 0
+        unique = 0
+        with open(output_path, "w", encoding="utf-8", buffering=1 << 20) as out:
+            for pos, line in _iter_lines(input_paths):
+                if current is None:
+                    break
+                if pos != current[idx]:
+                    continue
+                out.write(canonical_email(line, provider_rules)[0] + "\n")
+                unique += 1
+                idx += 1
+                if idx == len(current):
+                    current, idx = next(wanted, None), 0
+                    current = current.tolist() if current is not None else None
+        # the first input occurrence of an excluded address counts as excluded, later ones as duplicates
+        stats["unique"] = unique
+        stats["duplicates"] = lines - invalid - unique - stats["excluded"]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
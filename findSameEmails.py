@@ -2,45 +2,285 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import json
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from public_suffix import PSL_PATH, registrable_domain
 
 # Path to the file containing email addresses
 file_path = 'emails.txt'
 
-# Read emails from the file
-def read_emails(file_path):
-    with open(file_path, 'r') as file:
-        emails = file.readlines()
-    return [email.strip() for email in emails]
+# ----------------------------
+# Canonical addresses
+# ----------------------------
+# The domain is trimmed, case-folded and IDNA (punycode) encoded; the local part
+# is written as first seen but compared case-insensitively. With provider rules
+# the dedup key also folds addresses that reach the same mailbox, e.g.
+# John.Doe+jobs@googlemail.com -> johndoe@gmail.com.
+GMAIL_DOMAINS = {"gmail.com", "googlemail.com"}
+PLUS_TAG_DOMAINS = {
+    "outlook.com", "hotmail.com", "live.com", "msn.com",
+    "icloud.com", "me.com", "mac.com", "fastmail.com", "protonmail.com", "proton.me",
+}
+_domain_cache: Dict[str, Optional[str]] = {}
+_MISSING = object()
+# LDH labels (letters, digits, inner hyphens; punycode "xn--" labels fit too)
+_LABEL_RE = re.compile(r'[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\Z')
+# Characters that never appear unquoted in a local part (brackets, separators, a second @)
+_BAD_LOCAL_RE = re.compile(r'[\s@<>,;:()\[\]\\"]')
+
+
+def canonical_domain(domain: str) -> Optional[str]:
+    """Lower-case ASCII (punycode) form of a domain, None if it can't be a mail domain."""
+    d = domain.strip().rstrip('.').casefold()
+    if not d.isascii():
+        try:
+            d = d.encode('idna').decode('ascii')
+        except UnicodeError:
+            d = ''
+    labels = d.split('.')
+    ok = (len(d) <= 253 and len(labels) >= 2 and not labels[-1].isdigit()
+          and all(_LABEL_RE.match(label) for label in labels))
+    out = d if ok else None
+    if len(_domain_cache) < 100_000:
+        _domain_cache[domain] = out
+    return out
+
+
+def canonical_email(raw: str, provider_rules: bool = False) -> Optional[Tuple[str, str]]:
+    """(address, dedup key) for one line, or None if it isn't an address.
+    address = trimmed local part + canonical domain (what gets written out);
+    key = address with the local part case-folded, then folded by provider rules."""
+    s = raw.strip()
+    if s[:1] in 'mM' and s[:7].lower() == 'mailto:':
+        s = s[7:]
+    local, _, domain = s.rpartition('@')
+    if not local or len(local) > 64 or _BAD_LOCAL_RE.search(local):
+        return None
+    d = _domain_cache.get(domain, _MISSING)
+    if d is _MISSING:
+        d = canonical_domain(domain)
+    if d is None:
+        return None
+    key_local = local.lower()
+    if provider_rules:
+        if d in GMAIL_DOMAINS:
+            return f"{local}@{d}", f"{key_local.split('+', 1)[0].replace('.', '')}@gmail.com"
+        if d in PLUS_TAG_DOMAINS:
+            key_local = key_local.split('+', 1)[0]
+    return f"{local}@{d}", f"{key_local}@{d}"
+
+
+# ----------------------------
+# Streaming dedup
+# ----------------------------
+# Read emails from the file, lazily (one stripped, non-empty line at a time)
+def read_emails(file_path) -> Iterator[str]:
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            email = line.strip()
+            if email:
+                yield email
+
 
-# Function to filter duplicates without using set()
-def filter_duplicates(emails):
+# Unique addresses in first-seen order; repeated ones are printed
+def filter_duplicates(emails, provider_rules: bool = False) -> List[str]:
+    seen = set()
     unique_emails = []
     for email in emails:
-        if email not in unique_emails:
-            unique_emails.append(email)
-        else: 
+        parsed = canonical_email(email, provider_rules)
+        if parsed is None:
+            continue
+        address, key = parsed
+        if key in seen:
             print(email)
+            continue
+        seen.add(key)
+        unique_emails.append(address)
     return unique_emails
 
+
+_LINE_MASK = (1 << 40) - 1  # first-seen positions pack (file index, line number) into one int
+
+
+def dedup_stream(input_paths: List[str], output_path: str, report_path: Optional[str] = None,
+                 provider_rules: bool = False, exclude_paths: Optional[List[str]] = None) -> Dict[str, float]:
+    """One pass over the inputs: unique canonical addresses to output_path (first-seen order) and,
+    optionally, a TSV report of duplicate, excluded and invalid lines (kind, file, line, raw, key, first seen).
+    Addresses found in exclude_paths (e.g. already mailed lists) are left out of the output."""
+    t0 = time.perf_counter()
+    first_seen: Dict[str, int] = {}
+    for path in exclude_paths or []:
+        for email in read_emails(path):
+            parsed = canonical_email(email, provider_rules)
+            if parsed is not None:
+                first_seen[parsed[1]] = -1
+    lines = unique = duplicates = invalid = excluded = 0
+    canon = canonical_email
+    report = open(report_path, 'w', encoding='utf-8', buffering=1 << 20) if report_path else None
+    try:
+        with open(output_path, 'w', encoding='utf-8', buffering=1 << 20) as out:
+            write = out.write
+            if report:
+                report.write("kind\tfile\tline\traw\tkey\tfirst_seen\n")
+            for file_no, path in enumerate(input_paths):
+                with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                    for line_no, line in enumerate(f, start=1):
+                        parsed = canon(line, provider_rules)
+                        if parsed is None:
+                            if line.strip():
+                                lines += 1
+                                invalid += 1
+                                if report:
+                                    report.write(f"invalid\t{path}\t{line_no}\t{line.strip()}\t\t\n")
+                            continue
+                        lines += 1
+                        address, key = parsed
+                        pos = (file_no << 40) | line_no
+                        first = first_seen.setdefault(key, pos)
+                        if first == -1:
+                            excluded += 1
+                            first_seen[key] = pos  # later repeats report as duplicates of this line
+                            if report:
+                                report.write(f"excluded\t{path}\t{line_no}\t{line.strip()}\t{key}\t\n")
+                            continue
+                        if first != pos:
+                            duplicates += 1
+                            if report:
+                                first_at = f"{input_paths[first >> 40]}:{first & _LINE_MASK}"
+                                report.write(f"duplicate\t{path}\t{line_no}\t{line.strip()}\t{key}\t{first_at}\n")
+                            continue
+                        unique += 1
+                        write(address + "\n")
+    finally:
+        if report:
+            report.close()
+    stats = {"lines": lines, "unique": unique, "duplicates": duplicates, "invalid": invalid, "excluded": excluded}
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+# ----------------------------
+# Domain index
+# ----------------------------
+# Addresses are grouped by registrable domain (public suffix + one label, so
+# foo.co.uk and foo.com stay apart), with the raw domain as a fallback for hosts
+# that are themselves a public suffix.
+INDEX_BUFFER_MB = float(os.getenv("INDEX_BUFFER_MB", "32"))  # records held before a flush to the domain files
+
+
+def email_domain_key(email: str) -> Optional[Tuple[str, str, str]]:
+    """(registrable domain, local part, address) or None for a malformed address."""
+    parsed = canonical_email(email)
+    if parsed is None:
+        return None
+    address = parsed[0]
+    local, _, domain = address.rpartition('@')
+    return registrable_domain(domain) or domain, local, address
+
+
+# Small lists only: the whole index is built in memory (see index_emails_by_domain)
 def organize_emails_by_domain(emails):
     domain_dict = {}
     for email in emails:
-        broken_email = email.split('@')
-        # Split email to get username and domain
-        username, domain = broken_email[0], broken_email[1].split('.')[0] 
-        
-        # Create an entry if domain is not yet in the dictionary
-        if domain not in domain_dict:
-            domain_dict[domain] = []
-        
-        # Append user info to the domain entry
-        domain_dict[domain].append({
+        parsed = email_domain_key(email)
+        if parsed is None:
+            print(f"Skipping malformed address: {email!r}")
+            continue
+        domain, username, address = parsed
+        domain_dict.setdefault(domain, []).append({
             "name": username,
-            "email": email
+            "email": address
         })
-    
     return domain_dict
 
+
+_SAFE_NAME_RE = re.compile(r'[a-z0-9][a-z0-9.-]{0,252}\Z')
+
+
+def _index_shard_path(out_dir: str, domain: str) -> str:
+    """out_dir/<xx>/<domain>.jsonl; names that aren't plain LDH domains are replaced by their hash,
+    and the result must stay inside out_dir."""
+    digest = hashlib.blake2b(domain.encode('utf-8'), digest_size=16).hexdigest()
+    name = domain if _SAFE_NAME_RE.match(domain) and '..' not in domain else f"_{digest}"
+    root = os.path.realpath(out_dir)
+    path = os.path.realpath(os.path.join(root, digest[:2], f"{name}.jsonl"))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"index path for {domain!r} escapes {out_dir}")
+    return path
+
+
+def index_emails_by_domain(input_paths: List[str], out_dir: str, append: bool = False) -> Dict[str, float]:
+    """Stream addresses into one JSONL file per registrable domain under 256 hash shard directories
+    (out_dir/<xx>/<domain>.jsonl, records {"name", "email"}); malformed lines go to
+    out_dir/_quarantine.jsonl. Records are buffered up to INDEX_BUFFER_MB and then appended
+    domain by domain, so memory doesn't grow with the input. Without append, files of an
+    earlier index in out_dir are replaced."""
+    t0 = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    if not append:
+        for entry in os.listdir(out_dir):
+            shard_dir = os.path.join(out_dir, entry)
+            if len(entry) == 2 and os.path.isdir(shard_dir):
+                for name in os.listdir(shard_dir):
+                    if name.endswith('.jsonl'):
+                        os.remove(os.path.join(shard_dir, name))
+        for name in ('_quarantine.jsonl', 'index.json'):
+            if os.path.exists(os.path.join(out_dir, name)):
+                os.remove(os.path.join(out_dir, name))
+
+    pending: Dict[str, List[str]] = {}
+    pending_bytes = 0
+    limit = int(INDEX_BUFFER_MB * (1 << 20))
+    stats = {"lines": 0, "indexed": 0, "quarantined": 0, "domain_files": 0}
+    encode = json.JSONEncoder(ensure_ascii=True).encode
+
+    def flush():
+        # One append per buffered domain keeps file opens proportional to domains, not lines
+        for domain, records in pending.items():
+            path = _index_shard_path(out_dir, domain)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                stats["domain_files"] += 1
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(''.join(records))
+        pending.clear()
+
+    with open(os.path.join(out_dir, '_quarantine.jsonl'), 'a', encoding='utf-8') as quarantine:
+        for path in input_paths:
+            with open(path, 'r', encoding='utf-8', errors='replace') as src:
+                for line_no, line in enumerate(src, start=1):
+                    raw = line.strip()
+                    if not raw:
+                        continue
+                    stats["lines"] += 1
+                    parsed = email_domain_key(raw)
+                    if parsed is None:
+                        stats["quarantined"] += 1
+                        reason = "missing @" if '@' not in raw else "invalid address"
+                        quarantine.write(encode({"file": path, "line": line_no, "raw": raw, "reason": reason}) + "\n")
+                        continue
+                    domain, username, address = parsed
+                    record = encode({"name": username, "email": address}) + "\n"
+                    records = pending.get(domain)
+                    if records is None:
+                        records = pending[domain] = []
+                    records.append(record)
+                    pending_bytes += len(record) + 64
+                    stats["indexed"] += 1
+                    if pending_bytes >= limit:
+                        flush()
+                        pending_bytes = 0
+        flush()
+    stats["seconds"] = time.perf_counter() - t0
+    with open(os.path.join(out_dir, 'index.json'), 'w', encoding='utf-8') as f:
+        json.dump({"inputs": input_paths, "psl": PSL_PATH, **stats}, f)
+    return stats
+
 # Function to save data to a JSON file
 def save_to_json(data, filename="filtered_emails.json"):
     with open(filename, 'w') as file:
@@ -74,16 +314,46 @@ def send_email(receiver_email):
         print(f"Failed to send email to {receiver_email}: {e}")
 
 def main():
-    emails = read_emails(file_path)
-    unique_emails = filter_duplicates(emails)
+    parser = argparse.ArgumentParser(description="Deduplicate email lists and mail the unique addresses")
+    parser.add_argument("inputs", nargs="*", default=[file_path], help=f"input files, one address per line (default: {file_path})")
+    parser.add_argument("--output", default="", help="write unique addresses here and exit without sending")
+    parser.add_argument("--report", default="", help="TSV report of duplicate and invalid lines (with --output)")
+    parser.add_argument("--exclude", nargs="*", default=[], help="leave out addresses found in these lists (with --output)")
+    parser.add_argument("--provider-rules", action="store_true",
+                        help="fold gmail dots and +tags (and +tags on other big providers) when deduplicating")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="external sort on 64-bit hashed keys with bounded memory (needs numpy, no --report)")
+    parser.add_argument("--chunk-size", type=int, default=0, help="addresses per sorted run with --out-of-core")
+    parser.add_argument("--work-dir", default=None, help="directory for the sorted runs with --out-of-core")
+    parser.add_argument("--index-dir", default="", help="write a per-domain JSONL index of the inputs here and exit")
+    parser.add_argument("--append", action="store_true", help="add to an existing --index-dir instead of replacing it")
+    args = parser.parse_args()
+
+    if args.index_dir:
+        stats = index_emails_by_domain(args.inputs, args.index_dir, args.append)
+        print(f"{stats['lines']} lines: {stats['indexed']} indexed into {stats['domain_files']} new domain files, "
+              f"{stats['quarantined']} quarantined in {stats['seconds']:.2f}s -> {args.index_dir}", file=sys.stderr)
+        return
+
+    if args.output:
+        if args.out_of_core:
+            from email_extsort import dedup_external, DEFAULT_CHUNK_SIZE  # needs numpy
+            stats = dedup_external(args.inputs, args.output, args.exclude, args.provider_rules,
+                                   args.chunk_size or DEFAULT_CHUNK_SIZE, args.work_dir)
+        else:
+            stats = dedup_stream(args.inputs, args.output, args.report or None, args.provider_rules, args.exclude)
+        print(f"{stats['lines']} lines: {stats['unique']} unique, {stats['duplicates']} duplicates, "
+              f"{stats['excluded']} excluded, {stats['invalid']} invalid in {stats['seconds']:.2f}s "
+              f"-> {args.output}", file=sys.stderr)
+        return
+
+    emails = (e for path in args.inputs for e in read_emails(path))
+    unique_emails = filter_duplicates(emails, args.provider_rules)
     for email in unique_emails:
         send_email(email)
 
-    # # Organize emails by domain
-    # organized_emails = organize_emails_by_domain(unique_emails)
-
-    # # Save to JSON file
-    # save_to_json(organized_emails)
+    # # Organize emails by domain (streaming, one JSONL file per domain)
+    # index_emails_by_domain(args.inputs, "emails_by_domain")
 
 if __name__ == "__main__":
     main()
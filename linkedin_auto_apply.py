@@ -1,8 +1,12 @@
 import os
+import math
 import time
+import asyncio
 import json
 import re
-from typing import List, Set, Dict, Optional
+import sqlite3
+import hashlib
+from typing import List, Set, Dict, Optional, Iterator, Tuple
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -11,8 +15,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
 from emailcred import link_pass, link_user
-from llm_provider import llm_answer, llm_answer_batch
-from selenium.webdriver.common.keys import Keys
+from llm_provider import llm_answer_batch, allm_answer_batch, llm_answer_batch_stream, warm_up_llm, Fallback, _PROFILE_HASH
+from llm_telemetry import count as count_event
+import browser_profile
+import browser_daemon
+import session_restore
 
 # ---------------------------------
 # Config
@@ -21,6 +28,12 @@ JOBS_SEARCH_URL = (
     "https://www.linkedin.com/jobs/search-results/?keywords=reactjs%2C%20nodejs%20Easy%20Apply%2C%20javascript%2C%20full%20stack%20developer%2C%20remote"
 )
 COOKIES_FILE = "cookies_0.json"
+# Answer dialog questions through sharded concurrent LLM calls (LLM_SHARDED=0 for one big prompt)
+USE_SHARDED_LLM = os.getenv("LLM_SHARDED", "1") != "0"
+# Stream batch answers and fill fields as each one completes (overrides sharding)
+USE_STREAMING_LLM = os.getenv("LLM_STREAM", "0") == "1"
+# Upper bound (seconds) for one dialog transition wait; see wait_dialog_transition
+DIALOG_WAIT_TIMEOUT = float(os.getenv("DIALOG_WAIT_TIMEOUT", "8"))
 
 
 # ---------------------------------
@@ -30,12 +43,24 @@ service = Service()
 options = webdriver.ChromeOptions()
 options.add_argument("--start-maximized")
 options.add_argument("--disable-blink-features=AutomationControlled")
-driver = webdriver.Chrome(service=service, options=options)
+if os.getenv("CHROME_HEADLESS", "0") == "1":
+    options.add_argument("--headless=new")
+browser_profile.apply_options(options)
+# Attaches to a running browser_daemon when available, launches Chrome otherwise
+driver = browser_daemon.get_driver(service, options)
+browser_profile.apply_driver(driver)
 wait = WebDriverWait(driver, 15)
+# Dialog transition waits run as async scripts
+driver.set_script_timeout(math.ceil(DIALOG_WAIT_TIMEOUT) + 5)
 
 # Tracks answers tried for the current open dialog to avoid reusing failing inputs
 # Structure: { question_key: set(["value1", "value2"]) }
 CURRENT_DIALOG_TRIED: Dict[str, Set[str]] = {}
+# Last value filled per question in the current dialog; written back to the dataset on submit
+CURRENT_DIALOG_ANSWERS: Dict[str, str] = {}
+# Fallback defaults filled in the current dialog ({question_key: value}); kept out of fill plans
+CURRENT_DIALOG_FALLBACKS: Dict[str, str] = {}
+DIALOG_XPATH = '//div[@role="dialog"]'
 
 
 # ---------------------------------
@@ -47,23 +72,27 @@ def cookies_path() -> str:
 
 
 def load_cookies_if_any() -> bool:
+    """Restore the saved session in one CDP call. False when there is no file or its
+    li_at cookie has expired; /feed/ is only probed when the expiry check is inconclusive."""
     try:
         path = cookies_path()
         if os.path.isfile(path) and os.path.getsize(path) > 0:
             with open(path, "r", encoding="utf-8") as f:
                 cookies = json.load(f)
-            driver.get("https://www.linkedin.com/")
-            for c in cookies:
+            state = session_restore.restore_session(
+                driver, cookies, origin="https://www.linkedin.com/",
+                auth_names=session_restore.LINKEDIN_AUTH_COOKIES,
+            )
+            if state == session_restore.EXPIRED:
+                print("Saved LinkedIn session has expired; logging in again.")
+                return False
+            if state == session_restore.UNKNOWN:
+                driver.get("https://www.linkedin.com/feed/")
+                # basic readiness
                 try:
-                    driver.add_cookie(c)
+                    wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
                 except Exception:
                     pass
-            driver.get("https://www.linkedin.com/feed/")
-            # basic readiness
-            try:
-                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            except Exception:
-                pass
             return True
     except Exception:
         pass
@@ -91,11 +120,28 @@ def save_cookies():
 
 
 def ensure_logged_in_once():
+    # A daemon browser usually still holds the session from the previous run
+    if getattr(driver, "_attached_to_daemon", False):
+        try:
+            live = driver.execute_cdp_cmd("Network.getCookies", {"urls": ["https://www.linkedin.com/"]})["cookies"]
+        except Exception:
+            live = []
+        state = session_restore.local_session_state(live, session_restore.LINKEDIN_AUTH_COOKIES)
+        if state == session_restore.VALID:
+            return
+        if state == session_restore.UNKNOWN:
+            driver.get("https://www.linkedin.com/feed/")
+            if is_logged_in():
+                return
     # Try cookie session
-    driver.delete_all_cookies()
+    session_restore.clear_cookies(driver, session_restore.LINKEDIN_SITE)
     if load_cookies_if_any():
         if is_logged_in():
             return
+    login_with_credentials()
+
+
+def login_with_credentials():
     # Manual login once, then save cookies
     driver.get("https://www.linkedin.com/login")
     print("Please complete LinkedIn login in the opened browser window.")
@@ -115,31 +161,194 @@ def ensure_logged_in_once():
         save_cookies()
 
 
+# ---------------------------------
+# Applied-jobs ledger
+# ---------------------------------
+# One row per canonical job id with the latest outcome. Jobs with a final outcome
+# are skipped before any navigation; queued/in_progress rows left by a crashed
+# run are processed first on the next start.
+LEDGER_PATH = os.getenv("APPLIED_LEDGER_PATH", os.path.join(os.getcwd(), "applied_jobs.sqlite3"))
+LEDGER_MAX_ATTEMPTS = int(os.getenv("LEDGER_MAX_ATTEMPTS", "2"))  # for transient failures
+LEDGER_FINAL = ("applied", "skipped", "no-easy-apply", "failed-after-retries")
+# easy_apply_on_job outcome -> ledger outcome; anything else is a retryable 'failed'
+LEDGER_OUTCOMES = {
+    "submitted": "applied",
+    "no_easy_apply": "no-easy-apply",
+    "validation_failed": "failed-after-retries",
+}
+_ledger_conn: Optional[sqlite3.Connection] = None
+
+
+def job_id_from_url(url: str) -> Optional[str]:
+    """Canonical LinkedIn job id from any job URL (currentJobId or /jobs/view/...-<id>)."""
+    m = re.search(r"[?&]currentJobId=(\d+)", url or "") or re.search(r"/jobs/view/(?:[^/?#]*?-)?(\d+)", url or "")
+    return m.group(1) if m else None
+
+
+def canonical_job_url(job_id: str) -> str:
+    return f"https://www.linkedin.com/jobs/view/{job_id}/"
+
+
+def _get_ledger() -> Optional[sqlite3.Connection]:
+    global _ledger_conn
+    if _ledger_conn is None and LEDGER_PATH:
+        try:
+            conn = sqlite3.connect(LEDGER_PATH)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " url TEXT NOT NULL,"
+                " outcome TEXT NOT NULL,"
+                " detail TEXT NOT NULL DEFAULT '',"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " first_seen REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            # rows an older run left retryable although they used up every attempt
+            conn.execute(
+                "UPDATE jobs SET outcome = 'failed-after-retries' "
+                "WHERE outcome IN ('failed', 'in_progress') AND attempts >= ?",
+                (LEDGER_MAX_ATTEMPTS,),
+            )
+            conn.commit()
+            _ledger_conn = conn
+        except Exception as e:
+            print(f"Applied-jobs ledger disabled: {e}")
+    return _ledger_conn
+
+
+def ledger_done_ids() -> Set[str]:
+    """Job ids that must not be visited again."""
+    conn = _get_ledger()
+    if conn is None:
+        return set()
+    rows = conn.execute(
+        f"SELECT job_id FROM jobs WHERE outcome IN ({','.join('?' * len(LEDGER_FINAL))}) OR attempts >= ?",
+        (*LEDGER_FINAL, LEDGER_MAX_ATTEMPTS),
+    ).fetchall()
+    return {r[0] for r in rows}
+
+
+def ledger_pending() -> List[str]:
+    """Canonical URLs queued (or interrupted) by an earlier run, oldest first."""
+    conn = _get_ledger()
+    if conn is None:
+        return []
+    rows = conn.execute(
+        "SELECT job_id FROM jobs WHERE outcome IN ('queued', 'in_progress', 'failed') AND attempts < ? "
+        "ORDER BY first_seen",
+        (LEDGER_MAX_ATTEMPTS,),
+    ).fetchall()
+    return [canonical_job_url(r[0]) for r in rows]
+
+
+def ledger_enqueue(job_ids: List[str]) -> None:
+    conn = _get_ledger()
+    if conn is None or not job_ids:
+        return
+    now = time.time()
+    conn.executemany(
+        "INSERT OR IGNORE INTO jobs (job_id, url, outcome, first_seen, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+        [(j, canonical_job_url(j), now, now) for j in job_ids],
+    )
+    conn.commit()
+
+
+def ledger_record(job_id: str, outcome: str, detail: str = "", attempt: bool = False) -> None:
+    """Upsert a job's latest outcome (raw easy_apply_on_job outcomes are mapped).
+    A 'failed' job that has used LEDGER_MAX_ATTEMPTS attempts becomes 'failed-after-retries'."""
+    conn = _get_ledger()
+    if conn is None or not (job_id or "").isdigit():
+        return
+    if outcome not in ("queued", "in_progress") and outcome not in LEDGER_FINAL:
+        detail = f"{outcome}: {detail}" if detail else outcome
+        outcome = LEDGER_OUTCOMES.get(outcome, "failed")
+    now = time.time()
+    try:
+        conn.execute(
+            "INSERT INTO jobs (job_id, url, outcome, detail, attempts, first_seen, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(job_id) DO UPDATE SET "
+            "outcome = CASE WHEN excluded.outcome = 'failed' AND attempts + excluded.attempts >= ? "
+            "THEN 'failed-after-retries' ELSE excluded.outcome END, detail = excluded.detail, "
+            "attempts = attempts + excluded.attempts, updated_at = excluded.updated_at",
+            (job_id, canonical_job_url(job_id), outcome, detail[:300], 1 if attempt else 0, now, now,
+             LEDGER_MAX_ATTEMPTS),
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Failed to update ledger for job {job_id}: {e}")
+
+
 # ---------------------------------
 # Jobs search scraping
 # ---------------------------------
 
+# Per-card metadata for every job card on the results page, in one script call
+_JOB_CARDS_JS = r"""
+const out = [];
+for (const card of document.querySelectorAll('div[data-view-name="job-card"]')) {
+  const a = card.querySelector('a[href*="/jobs/search-results"], a[href*="/jobs/view/"]');
+  const holder = card.closest('[data-job-id], [data-occludable-job-id]')
+    || card.querySelector('[data-job-id], [data-occludable-job-id]');
+  const lines = (card.innerText || '').split('\n').map(t => t.trim()).filter(Boolean);
+  const title = a ? ((a.querySelector('[aria-hidden="true"]') || a).innerText || '').trim() : (lines[0] || '');
+  const rest = lines.filter(l => l !== title && !(title && l.startsWith(title)) && !/^\(?verified/i.test(l));
+  out.push({
+    href: a ? a.href : '',
+    job_id: holder ? (holder.getAttribute('data-job-id') || holder.getAttribute('data-occludable-job-id') || '') : '',
+    title,
+    company: rest[0] || '',
+    location: rest[1] || '',
+    easy_apply: lines.some(l => /^easy apply$/i.test(l)) || !!card.querySelector('[aria-label*="Easy Apply" i]'),
+    applied: lines.some(l => /^applied\b/i.test(l)),
+    // occluded cards are empty placeholders until scrolled into view
+    rendered: !!title && lines.length > 1,
+  });
+}
+return out;
+"""
+
+# Card metadata of queued jobs by job id (title/company for progress output)
+JOB_CARDS: Dict[str, dict] = {}
+
+
 def collect_job_links_from_page(seen: Set[str]) -> List[str]:
+    """Canonical job URLs on the current results page; `seen` holds job ids.
+    Cards already marked Applied, or without the Easy Apply badge, are recorded in
+    the ledger and dropped here so they never cost a page load. Cards that are not
+    rendered yet (occluded, no text) are queued unfiltered; the job page decides."""
     links: List[str] = []
     try:
         # Ensure job cards present
         wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[data-view-name="job-card"]')))
-        cards = driver.find_elements(By.CSS_SELECTOR, 'div[data-view-name="job-card"]')
-        print(f"Found {len(cards)} job cards on page.")
-        for card in cards:
-            try:
-                a = card.find_element(By.CSS_SELECTOR, 'a[href*="/jobs/search-results"]')
-                print(f"Found job link: {a.get_attribute('href')}")
-                href = a.get_attribute("href")
-                if not href:
-                    continue
-                if href not in seen:
-                    seen.add(href)
-                    links.append(href)
-            except Exception:
-                continue
+        cards = driver.execute_script(_JOB_CARDS_JS) or []
     except Exception:
-        pass
+        return links
+    print(f"Found {len(cards)} job cards on page.")
+    # Without a single badge the card markup probably changed; don't filter on it
+    badges_present = any(c.get("easy_apply") for c in cards)
+    unrendered = sum(1 for c in cards if not c.get("rendered"))
+    if cards and not badges_present:
+        print("No Easy Apply badges found on cards; not filtering by badge.")
+    applied = no_easy_apply = 0
+    for c in cards:
+        job_id = c.get("job_id") if str(c.get("job_id") or "").isdigit() else job_id_from_url(c.get("href") or "")
+        if not job_id or job_id in seen:
+            continue
+        seen.add(job_id)
+        if c.get("applied"):
+            ledger_record(job_id, "skipped", "already applied (card badge)")
+            applied += 1
+            continue
+        if badges_present and c.get("rendered") and not c.get("easy_apply"):
+            ledger_record(job_id, "no-easy-apply", "no Easy Apply badge on card")
+            no_easy_apply += 1
+            continue
+        JOB_CARDS[job_id] = c
+        links.append(canonical_job_url(job_id))
+    print(f"Queued {len(links)} jobs (dropped {applied} already applied, {no_easy_apply} without Easy Apply; "
+          f"{unrendered} cards not rendered, queued unfiltered).")
     return links
 
 
@@ -195,779 +404,1009 @@ def save_dataset(data: dict) -> None:
     except Exception:
         pass
 
-def _first_non_placeholder_option(select_el):
-    try:
-        options = select_el.find_elements(By.TAG_NAME, "option")
-        for opt in options:
-            val = (opt.get_attribute("value") or "").strip()
-            if val:
-                return opt
-    except Exception:
-        pass
+# Dataset-first resolver: answer questions from data_set.json before asking the LLM.
+# Keys are matched through an inverted token index; a match is accepted when the
+# Dice overlap between question and key tokens reaches DATASET_MATCH_THRESHOLD.
+DATASET_MATCH_THRESHOLD = float(os.getenv("DATASET_MATCH_THRESHOLD", "0.75"))
+_STOPWORDS = {
+    "a", "an", "the", "do", "does", "you", "your", "yours", "have", "has", "of", "in", "on",
+    "with", "to", "for", "is", "are", "be", "what", "which", "how", "please", "and", "or",
+    "i", "me", "my", "we", "this", "that", "if", "any", "enter", "select", "required",
+}
+_dataset_cache: Optional[dict] = None
+_dataset_index: Dict[str, Set[str]] = {}  # token -> dataset keys containing it
+_dataset_key_tokens: Dict[str, Set[str]] = {}
+
+
+def _tokens(text: str) -> Set[str]:
+    toks = (t.strip(".") for t in re.findall(r"[a-z0-9+#.]+", (text or "").lower()))
+    return {t for t in toks if t and t not in _STOPWORDS}
+
+
+def _build_dataset_index() -> None:
+    global _dataset_cache
+    _dataset_cache = load_dataset()
+    _dataset_index.clear()
+    _dataset_key_tokens.clear()
+    for key, val in _dataset_cache.items():
+        if not isinstance(val, (str, int, float)) or not str(val).strip():
+            continue
+        toks = _tokens(key)
+        if not toks:
+            continue
+        _dataset_key_tokens[key] = toks
+        for t in toks:
+            _dataset_index.setdefault(t, set()).add(key)
+
+
+def _match_choice(value: str, choices: List[str]) -> Optional[str]:
+    v = (value or "").strip().lower()
+    if not v:
+        return None
+    for c in choices:
+        if str(c).strip().lower() == v:
+            return c
+    for c in choices:
+        cl = str(c).strip().lower()
+        if cl and (v in cl or cl in v):
+            return c
     return None
 
-def fill_missing_dialog_fields():
-    """Fill required fields in the open dialog using an LLM for values.
-    - Map labels to their inputs by 'for' attribute or nearest following control.
-    - For text-like fields, ask LLM for a concise realistic value based on the label and type.
-    - For select/radio, collect visible choices and ask LLM to pick one.
+
+def resolve_from_dataset(question: str, kind: str, choices: Optional[List[str]] = None) -> Optional[str]:
+    """Return a dataset answer for the question when confident, else None."""
+    if _dataset_cache is None:
+        _build_dataset_index()
+    q_toks = _tokens(question)
+    if not q_toks:
+        return None
+    best_key, best_score = None, 0.0
+    for key in {k for t in q_toks for k in _dataset_index.get(t, ())}:
+        k_toks = _dataset_key_tokens[key]
+        score = 2.0 * len(q_toks & k_toks) / (len(q_toks) + len(k_toks))
+        if score > best_score:
+            best_key, best_score = key, score
+    if best_key is None or best_score < DATASET_MATCH_THRESHOLD:
+        return None
+    value = str(_dataset_cache[best_key]).strip()
+    if choices:
+        return _match_choice(value, choices)
+    if kind in ("number", "positive_number"):
+        m = re.search(r"\d+(?:\.\d+)?", value)
+        return m.group(0) if m else None
+    return value
+
+
+def remember_accepted_answers() -> None:
+    """Write the answers of a successfully submitted dialog back to data_set.json.
+    Existing keys are left untouched; the token index is rebuilt for later dialogs.
     """
-    tried = CURRENT_DIALOG_TRIED
-    dialog_xpath = '//div[@role="dialog"]'
+    if not CURRENT_DIALOG_ANSWERS:
+        return
+    data = load_dataset()
+    added = 0
+    for question, ans in CURRENT_DIALOG_ANSWERS.items():
+        if question and ans and question not in data:
+            data[question] = ans
+            added += 1
+    if added:
+        save_dataset(data)
+        _build_dataset_index()
+        print(f"Saved {added} new answers to {os.path.basename(DATASET_FILE)}")
+    CURRENT_DIALOG_ANSWERS.clear()
+
+
+def _mark_tried(key: Optional[str], val: str):
+    if not key:
+        return
+    s = CURRENT_DIALOG_TRIED.get(key)
+    if s is None:
+        s = set()
+        CURRENT_DIALOG_TRIED[key] = s
+    s.add(str(val))
+
+
+def _mark_answered(key: Optional[str], val: str, ans: Optional[str]):
+    """Mark val as tried and, when it is the dataset/LLM answer itself, keep it for
+    remember_accepted_answers. Fallback defaults ('NA', 'Yes', first option) are only noted
+    in CURRENT_DIALOG_FALLBACKS so capture_fill_plan can leave them out."""
+    _mark_tried(key, val)
+    if not key or ans is None:
+        return
+    if isinstance(ans, Fallback):
+        CURRENT_DIALOG_FALLBACKS[key] = str(val)
+        return
+    CURRENT_DIALOG_FALLBACKS.pop(key, None)
+    if str(val).strip().lower() == str(ans).strip().lower():
+        CURRENT_DIALOG_ANSWERS[key] = str(val)
 
-    def _find_control_for_error(err_el):
-        # Try aria-describedby/id linkage
-        try:
-            described_by = err_el.get_attribute("id")
-            if described_by:
-                try:
-                    ctrl = driver.find_element(By.XPATH, f"{dialog_xpath}//*[@aria-describedby='{described_by}']")
-                    return ctrl
-                except Exception:
-                    pass
-        except Exception:
-            pass
-        # Fallback: nearest form component container
-        try:
-            container = err_el.find_element(By.XPATH, './ancestor::*[@data-test-single-line-text-form-component or @data-test-form-builder-radio-button or @data-test-dropdown-select-component][1]')
-            try:
-                return container.find_element(By.XPATH, ".//input|.//textarea|.//select")
-            except Exception:
-                return None
-        except Exception:
-            return None
 
-    def _mark_tried(key: Optional[str], val: str):
-        if not key:
-            return
-        s = tried.get(key)
-        if s is None:
-            s = set()
-            tried[key] = s
-        s.add(str(val))
-
-    def _has_tried(key: Optional[str], val: str) -> bool:
-        if not key:
-            return False
-        return str(val) in tried.get(key, set())
+def _has_tried(key: Optional[str], val: str) -> bool:
+    if not key:
+        return False
+    return str(val) in CURRENT_DIALOG_TRIED.get(key, set())
+
 
-    # Remove error-based guessing; we will query the LLM directly.
+# Wall time spent waiting on the LLM and number of requests (read by apply traces/benchmarks)
+LLM_STATS: Dict[str, float] = {"seconds": 0.0, "requests": 0}
 
-    def _infer_type_from_context(ctrl, msg: str) -> str:
-        msg_l = (msg or "").lower()
-        tag = (ctrl.tag_name or "").lower() if ctrl else ""
-        typ = (ctrl.get_attribute("type") or "").lower() if ctrl and tag == 'input' else ""
-        # Checkbox group detection (LinkedIn multipleChoice fieldset)
+
+def _llm_answer_batch(items: List[dict]) -> List[str]:
+    if USE_SHARDED_LLM:
         try:
-            if ctrl is not None:
-                in_cb_group = False
-                try:
-                    ctrl.find_element(By.XPATH, "./ancestor::fieldset[@data-test-checkbox-form-component='true']")
-                    in_cb_group = True
-                except Exception:
-                    in_cb_group = False
-                if typ == 'checkbox' or in_cb_group:
-                    return 'checkbox'
-        except Exception:
-            pass
-        if tag == 'select':
-            return 'select'
-        if typ in ('number', 'range'): return 'number'
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(allm_answer_batch(items))
+        # already inside an event loop, where asyncio.run can't be used; don't create the coroutine
+    return llm_answer_batch(items)
+
+
+def answer_stream(items: List[dict]) -> Iterator[Tuple[int, str]]:
+    """Yield (index, answer) pairs: dataset matches first, then LLM answers for the misses,
+    streamed as each completes when LLM_STREAM=1, otherwise once the batch returns."""
+    miss: List[int] = []
+    for i, it in enumerate(items):
+        ans = resolve_from_dataset(it.get("question") or "", it.get("kind") or "text", it.get("choices") or [])
+        if ans is None:
+            miss.append(i)
+        else:
+            yield i, ans
+    if not miss:
+        return
+    pending = [items[i] for i in miss]
+    LLM_STATS["requests"] += 1
+    t0 = time.perf_counter()
+    if USE_STREAMING_LLM:
+        for j, ans in llm_answer_batch_stream(pending):
+            LLM_STATS["seconds"] += time.perf_counter() - t0
+            yield miss[j], ans
+            t0 = time.perf_counter()
+        LLM_STATS["seconds"] += time.perf_counter() - t0
+    else:
+        answers = _llm_answer_batch(pending)
+        LLM_STATS["seconds"] += time.perf_counter() - t0
+        for j, ans in enumerate(answers):
+            yield miss[j], ans
+
+
+# ---------------------------------
+# Dialog snapshot / bulk apply (one WebDriver round trip each)
+# ---------------------------------
+
+# Returns one record per control (radio/checkbox groups are one record) and tags
+# each with data-la-uid. Controls whose uid Python already knows (arguments[0])
+# only report their mutable state: value, error, visible.
+_DIALOG_SNAPSHOT_JS = r"""
+const dialog = document.querySelector('div[role="dialog"]');
+if (!dialog) return null;
+const known = new Set(arguments[0] || []);
+const text = el => el ? (el.innerText || el.textContent || '').replace(/\s+/g, ' ').trim() : '';
+const shown = el => { const a = el && el.querySelector('[aria-hidden="true"]'); return (a && text(a)) || text(el); };
+const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+const uidOf = el => {
+  let u = el.getAttribute('data-la-uid');
+  if (!u) { window.__laUid = (window.__laUid || 0) + 1; u = 'f' + window.__laUid; el.setAttribute('data-la-uid', u); }
+  return u;
+};
+const labelFor = el => {
+  if (el.id) { const l = dialog.querySelector('label[for="' + CSS.escape(el.id) + '"]'); if (l && shown(l)) return shown(l); }
+  const wrap = el.closest('label'); if (wrap && shown(wrap)) return shown(wrap);
+  const lb = el.getAttribute('aria-labelledby');
+  if (lb) { const t = lb.split(/\s+/).map(id => text(document.getElementById(id))).join(' ').trim(); if (t) return t; }
+  return (el.getAttribute('aria-label') || el.getAttribute('placeholder') || '').trim();
+};
+const CONTAINER = '[data-test-form-element], [data-test-single-line-text-form-component], '
+  + '[data-test-form-builder-radio-button-form-component], [data-test-dropdown-select-component], '
+  + '[data-test-checkbox-form-component], fieldset';
+const errorFor = el => {
+  for (const id of (el.getAttribute('aria-describedby') || '').split(/\s+/).filter(Boolean)) {
+    const e = document.getElementById(id);
+    if (e && e.matches('[data-test-form-element-error-messages], [data-test-form-element-error-messages] *')) {
+      const t = text(e); if (t) return t;
+    }
+  }
+  const box = el.closest(CONTAINER) || el.parentElement;
+  const e = box && box.querySelector('[data-test-form-element-error-messages]');
+  return text(e);
+};
+const optLabel = (m, root) => {
+  if (m.id) { const l = (root || dialog).querySelector('label[for="' + CSS.escape(m.id) + '"]'); if (l && shown(l)) return shown(l); }
+  return shown(m.closest('label')) || (m.getAttribute('data-test-text-selectable-option__input') || m.value || '').trim();
+};
+const out = [];
+const groups = new Set();
+for (const el of dialog.querySelectorAll('input, textarea, select')) {
+  const tag = el.tagName.toLowerCase();
+  const type = tag === 'input' ? (el.getAttribute('type') || 'text').toLowerCase() : '';
+  if (['hidden', 'submit', 'button', 'file', 'image', 'reset'].includes(type)) continue;
+  if (type === 'radio' || type === 'checkbox') {
+    const root = el.closest('fieldset') || el.closest('[role="radiogroup"]');
+    const gkey = root || (el.name ? type + ':' + el.name : el);
+    if (groups.has(gkey)) continue;
+    groups.add(gkey);
+    const members = root ? [...root.querySelectorAll('input[type="' + type + '"]')]
+      : el.name ? [...dialog.querySelectorAll('input[type="' + type + '"][name="' + CSS.escape(el.name) + '"]')] : [el];
+    const target = root || el;
+    const uid = uidOf(target);
+    const rec = {uid, value: members.filter(m => m.checked).map(m => optLabel(m, root)).join('|'),
+                 error: errorFor(target === el ? el : members[0]), visible: members.some(visible)};
+    if (!known.has(uid)) {
+      const legend = root && root.querySelector('legend');
+      Object.assign(rec, {
+        tag: 'input', type, id: target.id || '', name: root ? '' : (el.name || ''),
+        label: shown(legend) || (root && root.getAttribute('aria-label')) || labelFor(el),
+        required: members.some(m => m.required || m.getAttribute('aria-required') === 'true')
+          || !!(root && root.getAttribute('aria-required') === 'true'),
+        choices: members.map(m => optLabel(m, root)).filter(Boolean),
+      });
+    }
+    out.push(rec);
+    continue;
+  }
+  const uid = uidOf(el);
+  let value = (el.value || '').trim();
+  if (tag === 'select' && /^select an option$/i.test(value)) value = '';
+  const rec = {uid, value, error: errorFor(el), visible: visible(el)};
+  if (!known.has(uid)) {
+    Object.assign(rec, {
+      tag, type, id: el.id || '', name: el.name || '', label: labelFor(el),
+      required: el.required || el.getAttribute('aria-required') === 'true',
+      choices: tag === 'select'
+        ? [...el.options].map(o => (o.value || text(o)).trim()).filter(v => v && !/^select an option$/i.test(v))
+        : [],
+    });
+  }
+  out.push(rec);
+}
+return out;
+"""
+
+# Applies [{uid, mode, value, name}] in one call; returns the value that took per op (null on failure).
+_DIALOG_APPLY_JS = r"""
+const dialog = document.querySelector('div[role="dialog"]');
+const ops = arguments[0] || [];
+if (!dialog) return ops.map(() => null);
+const text = el => el ? (el.innerText || el.textContent || '').replace(/\s+/g, ' ').trim() : '';
+const shown = el => { const a = el && el.querySelector('[aria-hidden="true"]'); return (a && text(a)) || text(el); };
+const optLabel = (m, root) => {
+  if (m.id) { const l = (root || dialog).querySelector('label[for="' + CSS.escape(m.id) + '"]'); if (l && shown(l)) return shown(l); }
+  return shown(m.closest('label')) || (m.getAttribute('data-test-text-selectable-option__input') || m.value || '').trim();
+};
+const fire = (el, names) => names.forEach(n => el.dispatchEvent(new Event(n, {bubbles: true})));
+const results = [];
+for (const op of ops) {
+  try {
+    const el = dialog.querySelector('[data-la-uid="' + op.uid + '"]');
+    if (!el) { results.push(null); continue; }
+    const want = String(op.value || '').trim().toLowerCase();
+    if (op.mode === 'text') {
+      const proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+      el.focus();
+      Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, String(op.value));
+      fire(el, ['input', 'change', 'blur']);
+      results.push(el.value);
+    } else if (op.mode === 'select') {
+      const opts = [...el.options];
+      let idx = opts.findIndex(o => (o.value || '').trim().toLowerCase() === want || text(o).toLowerCase() === want);
+      if (idx < 0) idx = opts.findIndex(o => (o.value || '').trim() && !/^select an option$/i.test(text(o)));
+      if (idx < 0) { results.push(null); continue; }
+      el.selectedIndex = idx;
+      fire(el, ['input', 'change']);
+      results.push((opts[idx].value || text(opts[idx])).trim());
+    } else {
+      const type = op.mode === 'checkbox' ? 'checkbox' : 'radio';
+      const root = el.tagName === 'INPUT' ? null : el;
+      const members = root ? [...root.querySelectorAll('input[type="' + type + '"]')]
+        : op.name ? [...dialog.querySelectorAll('input[type="' + type + '"][name="' + CSS.escape(op.name) + '"]')] : [el];
+      const m = members.find(x => optLabel(x, root).toLowerCase() === want) || members[0];
+      if (!m) { results.push(null); continue; }
+      if (!m.checked) {
+        m.scrollIntoView({block: 'center'});
+        const lbl = m.id && (root || dialog).querySelector('label[for="' + CSS.escape(m.id) + '"]');
+        (lbl || m).click();
+        if (!m.checked) m.click();
+      }
+      results.push(m.checked ? optLabel(m, root) : null);
+    }
+  } catch (e) {
+    results.push(null);
+  }
+}
+return results;
+"""
+
+
+class DialogField:
+    """One control (or radio/checkbox group) of the open dialog, parsed from a snapshot."""
+
+    __slots__ = ("uid", "label", "tag", "type", "id", "name", "required", "choices", "value", "error", "visible")
+
+    def __init__(self, rec: dict):
+        self.uid = rec["uid"]
+        self.label = (rec.get("label") or "").strip()
+        self.tag = rec.get("tag") or ""
+        self.type = rec.get("type") or ""
+        self.id = rec.get("id") or ""
+        self.name = rec.get("name") or ""
+        self.required = bool(rec.get("required"))
+        self.choices = tuple(rec.get("choices") or ())
+        self.update(rec)
+
+    def update(self, rec: dict) -> None:
+        self.value = rec.get("value") or ""
+        self.error = rec.get("error") or ""
+        self.visible = bool(rec.get("visible"))
+
+    @property
+    def mode(self) -> str:
+        if self.tag == "select":
+            return "select"
+        if self.type in ("radio", "checkbox"):
+            return self.type
+        return "text"
+
+    def kind(self) -> str:
+        """LLM answer kind, from the control type and its error message."""
+        msg_l = self.error.lower()
+        if self.type == "checkbox":
+            return "checkbox"
+        if self.tag == "select":
+            return "select"
+        if self.type == "radio":
+            return "radio"
+        if self.type in ("number", "range"):
+            return "number"
         if 'decimal' in msg_l and ('larger than 0' in msg_l or 'greater than 0' in msg_l):
-            return 'positive_number'
-        if typ == 'email' or 'email' in msg_l: return 'email'
-        if typ == 'tel' or 'phone' in msg_l or 'mobile' in msg_l: return 'phone'
+            return "positive_number"
+        if self.type == "email" or "email" in msg_l:
+            return "email"
+        if self.type == "tel" or "phone" in msg_l or "mobile" in msg_l:
+            return "phone"
         if 'url' in msg_l or 'link' in msg_l or 'portfolio' in msg_l or 'github' in msg_l or 'linkedin' in msg_l:
-            return 'url'
+            return "url"
         if 'year' in msg_l or 'experience' in msg_l or 'ctc' in msg_l or 'salary' in msg_l or 'notice' in msg_l or 'day' in msg_l:
-            return 'number'
-        if typ == 'file': return 'file'
-        if typ == 'radio': return 'radio'
-        return 'text'
+            return "number"
+        return "text"
 
-    # No default guessing; values come from LLM.
 
-    # First, address visible error messages by batching only those fields
+# Parsed fields of the open dialog by uid; reused across submit/next retries, holds only the
+# controls of the latest snapshot and is cleared per dialog
+DIALOG_FIELD_CACHE: Dict[str, DialogField] = {}
+
+
+def snapshot_dialog() -> Optional[List[DialogField]]:
+    """All controls of the open dialog in one execute_script call (None if unavailable)."""
     try:
-        error_blocks = driver.find_elements(By.CSS_SELECTOR, '[data-test-form-element-error-messages]')
+        records = driver.execute_script(_DIALOG_SNAPSHOT_JS, list(DIALOG_FIELD_CACHE))
     except Exception:
-        error_blocks = []
-
-    if error_blocks:
-        batch_items = []
-        targets = []  # list of tuples (ctrl, key, kind)
-        for err in error_blocks:
-            try:
-                msg = err.text or ""
-                ctrl = _find_control_for_error(err)
-                if ctrl is None:
-                    continue
-                key = None
-                try:
-                    lbl = ctrl.find_element(By.XPATH, "./ancestor::div[1]//label")
-                    key = (lbl.text or '').strip()
-                except Exception:
-                    pass
-                kind = _infer_type_from_context(ctrl, msg)
-                if kind == 'file':
-                    continue
-                tag = (ctrl.tag_name or '').lower()
-                typ = (ctrl.get_attribute('type') or '').lower() if tag == 'input' else ''
-                item = {"question": key or "", "kind": kind}
-                if tag == 'select' or (tag == 'input' and typ == 'radio') or kind == 'checkbox':
-                    # collect choices
-                    choices = []
-                    try:
-                        if tag == 'select':
-                            opts = ctrl.find_elements(By.TAG_NAME, 'option')
-                            for opt in opts:
-                                v = (opt.get_attribute('value') or opt.text or '').strip()
-                                if v:
-                                    choices.append(v)
-                        elif tag == 'input' and typ == 'radio':
-                            # radio
-                            fieldset = None
-                            try:
-                                fieldset = ctrl.find_element(By.XPATH, "./ancestor::fieldset[@data-test-form-builder-radio-button-form-component='true']")
-                            except Exception:
-                                fieldset = driver.find_element(By.XPATH, dialog_xpath)
-                            radios = fieldset.find_elements(By.XPATH, ".//input[@type='radio']")
-                            for r in radios:
-                                t = ''
-                                try:
-                                    rid = r.get_attribute('id')
-                                    if rid:
-                                        lbl = fieldset.find_element(By.XPATH, f".//label[@for='{rid}']")
-                                        t = (lbl.text or '').strip()
-                                except Exception:
-                                    pass
-                                if not t:
-                                    try:
-                                        t = r.find_element(By.XPATH, "./following-sibling::label").text.strip()
-                                    except Exception:
-                                        pass
-                                if not t:
-                                    t = (r.get_attribute('value') or '').strip()
-                                if t:
-                                    choices.append(t)
-                        else:
-                            # checkbox group: prefer data-test-text-selectable-option containers
-                            try:
-                                fs = ctrl.find_element(By.XPATH, "./ancestor::fieldset[@data-test-checkbox-form-component='true']")
-                            except Exception:
-                                fs = None
-                            if fs is not None:
-                                try:
-                                    items = fs.find_elements(By.CSS_SELECTOR, '[data-test-text-selectable-option]')
-                                except Exception:
-                                    items = []
-                                for it in items:
-                                    txt = ''
-                                    try:
-                                        lbl = it.find_element(By.TAG_NAME, 'label')
-                                        txt = (lbl.text or '').strip()
-                                    except Exception:
-                                        pass
-                                    if not txt:
-                                        try:
-                                            inp = it.find_element(By.TAG_NAME, 'input')
-                                            txt = (inp.get_attribute('data-test-text-selectable-option__input') or inp.get_attribute('value') or '').strip()
-                                        except Exception:
-                                            pass
-                                    if txt:
-                                        choices.append(txt)
-                    except Exception:
-                        pass
-                    item["choices"] = choices
-                batch_items.append(item)
-                targets.append((ctrl, key, kind))
-            except Exception:
+        return None
+    if records is None:
+        return None
+    fields: List[DialogField] = []
+    for rec in records:
+        f = DIALOG_FIELD_CACHE.get(rec.get("uid"))
+        if f is None:
+            if "label" not in rec:
                 continue
-
-        if batch_items:
-            answers = llm_answer_batch(batch_items)
-            for (ctrl, key, kind), ans in zip(targets, answers):
-                try:
-                    tag = (ctrl.tag_name or '').lower()
-                    typ = (ctrl.get_attribute('type') or '').lower() if tag == 'input' else ''
-                    if tag in ('input', 'textarea') and typ not in ('radio', 'checkbox'):
-                        try:
-                            ctrl.clear()
-                        except Exception:
-                            pass
-                        ctrl.send_keys(ans)
-                        try:
-                            ctrl.send_keys(Keys.TAB)
-                        except Exception:
-                            pass
-                        _mark_tried(key, ans)
-                    elif tag == 'select':
-                        opts = ctrl.find_elements(By.TAG_NAME, 'option')
-                        matched = False
-                        for opt in opts:
-                            if ((opt.get_attribute('value') or '').strip().lower() == ans.lower()) or ((opt.text or '').strip().lower() == ans.lower()):
-                                opt.click(); matched = True; _mark_tried(key, ans); break
-                        if not matched:
-                            first = _first_non_placeholder_option(ctrl)
-                            if first:
-                                first.click(); _mark_tried(key, first.get_attribute('value') or first.text or '')
-                    elif tag == 'input' and typ == 'radio':
-                        _click_radio(ctrl, key, ans)
-                except Exception:
-                    continue
-
-        # After handling errors specifically, return to let caller retry submit/next
+            f = DialogField(rec)
+            DIALOG_FIELD_CACHE[f.uid] = f
+        else:
+            f.update(rec)
+        fields.append(f)
+    # controls of earlier steps are gone from the DOM; drop them so counts reflect this step
+    current = {f.uid for f in fields}
+    for uid in [u for u in DIALOG_FIELD_CACHE if u not in current]:
+        del DIALOG_FIELD_CACHE[uid]
+    return fields
+
+
+def _pick_choice(f: DialogField, ans: str) -> str:
+    """Choice to apply for a select/radio/checkbox. Radios prefer answer -> 'Yes' ->
+    first not tried, so a value the form rejected is not applied again."""
+    if not f.choices:
+        return ans
+    preferred = _match_choice(ans, list(f.choices))
+    if f.mode != "radio":
+        return preferred or f.choices[0]
+    for c in ([preferred] if preferred else []) + [c for c in f.choices if c.strip().lower() == "yes"] + list(f.choices):
+        if not _has_tried(f.label, c):
+            return c
+    return preferred or f.choices[0]
+
+
+def apply_answers(pairs: List[Tuple[DialogField, str]], remember: bool = True) -> None:
+    """Write answers into their controls with a single execute_script call.
+    remember=False only marks the values as tried (replayed plans aren't new answers)."""
+    if not pairs:
         return
+    ops = []
+    for f, ans in pairs:
+        value = str(ans) if f.mode == "text" else _pick_choice(f, str(ans))
+        ops.append({"uid": f.uid, "mode": f.mode, "value": value, "name": f.name})
     try:
-        labels = driver.find_elements(By.XPATH, f"{dialog_xpath}//label")
+        applied = driver.execute_script(_DIALOG_APPLY_JS, ops) or []
     except Exception:
-        labels = []
-
-    # No visible errors: batch-fill only empty/unset fields in the dialog
-    batch_items = []
-    targets = []
-    for lbl in labels:
-        try:
-            question = (lbl.text or "").strip()
-            if not question:
-                continue
-            # try to find associated control via 'for'
-            ctrl = None
-            for_attr = lbl.get_attribute("for")
-            if for_attr:
-                try:
-                    ctrl = driver.find_element(By.XPATH, f"{dialog_xpath}//*[@id='{for_attr}']")
-                except Exception:
-                    ctrl = None
-            if ctrl is None:
-                # fallback: nearest following input/textarea/select within dialog
-                try:
-                    ctrl = lbl.find_element(By.XPATH, ".//following::input[1]")
-                except Exception:
-                    ctrl = None
-                if ctrl is None:
-                    try:
-                        ctrl = lbl.find_element(By.XPATH, ".//following::textarea[1]")
-                    except Exception:
-                        ctrl = None
-                if ctrl is None:
-                    try:
-                        ctrl = lbl.find_element(By.XPATH, ".//following::select[1]")
-                    except Exception:
-                        ctrl = None
-
-            if ctrl is None:
+        applied = []
+    for (f, ans), val in zip(pairs, applied):
+        if val is not None:
+            f.value = str(val)
+            if not remember:
+                _mark_tried(f.label, str(val))
                 continue
+            if f.mode != "text" and f.choices and not isinstance(ans, Fallback):
+                ans = _match_choice(str(ans), list(f.choices))
+            _mark_answered(f.label, str(val), ans)
 
-            tag = (ctrl.tag_name or "").lower()
-            typ = (ctrl.get_attribute("type") or "").lower() if tag == "input" else ""
-            # Determine emptiness and prepare batch items
-            kind_here = _infer_type_from_context(ctrl, '')
-            if tag in ("input", "textarea") and typ not in ("radio", "checkbox"):
-                curr = (ctrl.get_attribute('value') or '').strip()
-                if curr:
-                    continue
-                batch_items.append({"question": question, "kind": kind_here})
-                targets.append((ctrl, question, 'textlike'))
-            elif tag == 'select':
-                try:
-                    selected = ctrl.get_attribute('value') or ''
-                except Exception:
-                    selected = ''
-                if selected:
-                    continue
-                choices = []
-                try:
-                    opts = ctrl.find_elements(By.TAG_NAME, 'option')
-                    for opt in opts:
-                        v = (opt.get_attribute('value') or opt.text or '').strip()
-                        if v:
-                            choices.append(v)
-                except Exception:
-                    pass
-                batch_items.append({"question": question, "kind": 'select', "choices": choices})
-                targets.append((ctrl, question, 'select'))
-            elif tag == 'input' and typ == 'radio':
-                # if any checked, skip
-                try:
-                    name = ctrl.get_attribute('name') or ''
-                    if name:
-                        any_checked = driver.find_elements(By.XPATH, f"//input[@type='radio' and @name='{name}' and @checked]")
-                        if any_checked:
-                            continue
-                except Exception:
-                    pass
-                # collect choices
-                choices = []
-                try:
-                    fieldset = None
-                    try:
-                        fieldset = ctrl.find_element(By.XPATH, "./ancestor::fieldset[@data-test-form-builder-radio-button-form-component='true']")
-                    except Exception:
-                        fieldset = driver.find_element(By.XPATH, dialog_xpath)
-                    radios = fieldset.find_elements(By.XPATH, ".//input[@type='radio']")
-                    for r in radios:
-                        t = ''
-                        try:
-                            rid = r.get_attribute('id')
-                            if rid:
-                                lbl = fieldset.find_element(By.XPATH, f".//label[@for='{rid}']")
-                                t = (lbl.text or '').strip()
-                        except Exception:
-                            pass
-                        if not t:
-                            try:
-                                t = r.find_element(By.XPATH, "./following-sibling::label").text.strip()
-                            except Exception:
-                                pass
-                        if not t:
-                            t = (r.get_attribute('value') or '').strip()
-                        if t:
-                            choices.append(t)
-                except Exception:
-                    pass
-                batch_items.append({"question": question, "kind": 'radio', "choices": choices})
-                targets.append((ctrl, question, 'radio'))
-            else:
-                # Checkbox group: if none checked in the group, ask LLM to pick one.
-                try:
-                    fs = ctrl.find_element(By.XPATH, "./ancestor::fieldset[@data-test-checkbox-form-component='true']")
-                except Exception:
-                    fs = None
-                if fs is not None:
-                    try:
-                        any_checked = fs.find_elements(By.XPATH, ".//input[@type='checkbox' and @checked]")
-                    except Exception:
-                        any_checked = []
-                    if any_checked:
-                        continue
-                    choices = []
-                    try:
-                        items = fs.find_elements(By.CSS_SELECTOR, '[data-test-text-selectable-option]')
-                    except Exception:
-                        items = []
-                    for it in items:
-                        txt = ''
-                        try:
-                            lbl = it.find_element(By.TAG_NAME, 'label')
-                            txt = (lbl.text or '').strip()
-                        except Exception:
-                            pass
-                        if not txt:
-                            try:
-                                inp = it.find_element(By.TAG_NAME, 'input')
-                                txt = (inp.get_attribute('data-test-text-selectable-option__input') or inp.get_attribute('value') or '').strip()
-                            except Exception:
-                                pass
-                        if txt:
-                            choices.append(txt)
-                    batch_items.append({"question": question, "kind": 'checkbox', "choices": choices})
-                    targets.append((ctrl, question, 'checkbox'))
-        except Exception:
-            continue
-
-    if batch_items:
-        answers = llm_answer_batch(batch_items)
-        for (ctrl, question, kind_tag), ans in zip(targets, answers):
-            try:
-                tag = (ctrl.tag_name or '').lower()
-                typ = (ctrl.get_attribute('type') or '').lower() if tag == 'input' else ''
-                if kind_tag == 'textlike':
-                    try:
-                        ctrl.clear()
-                    except Exception:
-                        pass
-                    ctrl.send_keys(ans)
-                    _mark_tried(question, ans)
-                elif kind_tag == 'select':
-                    opts = ctrl.find_elements(By.TAG_NAME, 'option')
-                    matched = False
-                    for opt in opts:
-                        if ((opt.get_attribute('value') or '').strip().lower() == ans.lower()) or ((opt.text or '').strip().lower() == ans.lower()):
-                            opt.click(); matched = True; _mark_tried(question, ans); break
-                    if not matched:
-                        first = _first_non_placeholder_option(ctrl)
-                        if first:
-                            first.click(); _mark_tried(question, first.get_attribute('value') or first.text or '')
-                elif kind_tag == 'radio':
-                    _click_radio(ctrl, question, ans)
-                elif kind_tag == 'checkbox':
-                    # Click matching checkbox option within the same fieldset using data-test-text-selectable-option
-                    try:
-                        fs = ctrl.find_element(By.XPATH, "./ancestor::fieldset[@data-test-checkbox-form-component='true']")
-                    except Exception:
-                        fs = None
-                    candidates = []
-                    if fs is not None:
-                        try:
-                            items = fs.find_elements(By.CSS_SELECTOR, '[data-test-text-selectable-option]')
-                        except Exception:
-                            items = []
-                        for it in items:
-                            label_text = ''
-                            label_el = None
-                            try:
-                                label_el = it.find_element(By.TAG_NAME, 'label')
-                                label_text = (label_el.text or '').strip()
-                            except Exception:
-                                label_el = None
-                            if not label_text:
-                                try:
-                                    inp = it.find_element(By.TAG_NAME, 'input')
-                                    label_text = (inp.get_attribute('data-test-text-selectable-option__input') or inp.get_attribute('value') or '').strip()
-                                except Exception:
-                                    pass
-                            candidates.append((it, label_el, label_text))
-                    # try exact match first
-                    picked = False
-                    for it, lbl_el, txt in candidates:
-                        if (txt or '').strip().lower() == (ans or '').strip().lower():
-                            try:
-                                try:
-                                    driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", it)
-                                except Exception:
-                                    pass
-                                try:
-                                    if lbl_el is not None:
-                                        lbl_el.click()
-                                    else:
-                                        it.click()
-                                except Exception:
-                                    # fallback to clicking input
-                                    try:
-                                        it.find_element(By.TAG_NAME, 'input').click()
-                                    except Exception:
-                                        pass
-                                _mark_tried(question, ans)
-                                picked = True
-                                break
-                            except Exception:
-                                pass
-                    # if not matched, click first available option
-                    if not picked and candidates:
-                        it, lbl_el, txt = candidates[0]
-                        try:
-                            if lbl_el is not None:
-                                lbl_el.click()
-                            else:
-                                it.click()
-                        except Exception:
-                            try:
-                                it.find_element(By.TAG_NAME, 'input').click()
-                            except Exception:
-                                pass
-                        _mark_tried(question, txt)
-            except Exception:
-                continue
 
-
-def _click_radio(ctrl_el, question_key: Optional[str], preferred: Optional[str]) -> bool:
-    """Click a radio in the same fieldset as ctrl_el.
-    - Searches within fieldset[data-test-form-builder-radio-button-form-component]
-    - Falls back to dialog scope when fieldset not found
-    Preference: preferred -> 'Yes' -> first not tried.
+def fill_missing_dialog_fields():
+    """Fill the open dialog using dataset/LLM answers.
+    - One script call snapshots every control (label, type, value, error, choices).
+    - Fields showing errors are answered first; otherwise every empty field is.
+    - Answers are written back with one batched script call (or one per answer when streaming).
+    - Checkboxes are only ticked for required groups (or ones showing an error); optional
+      ones such as "Follow company" are left alone.
     """
-    candidates = []  # list of tuples (input_or_radio_el, label_text, label_el_or_None)
+    fields = snapshot_dialog()
+    if fields is None:
+        print("Could not read the dialog fields; leaving them as they are.")
+        return
+    fields = [f for f in fields if f.visible and f.label and (f.mode != "checkbox" or f.required or f.error)]
+    targets = [f for f in fields if f.error] or [f for f in fields if not f.value]
+    if not targets:
+        return
+    items = [{"question": f.label, "kind": f.kind(), "choices": list(f.choices)} for f in targets]
+    if USE_STREAMING_LLM:
+        for idx, ans in answer_stream(items):
+            apply_answers([(targets[idx], ans)])
+    else:
+        apply_answers([(targets[idx], ans) for idx, ans in answer_stream(items)])
 
-    # Try to scope to the same fieldset
-    fs = None
+
+# ---------------------------------
+# Dialog transition waits (MutationObserver instead of fixed sleeps)
+# ---------------------------------
+# How long the dialog must stay quiet before a content change counts as settled
+# (the overall bound is DIALOG_WAIT_TIMEOUT in the config section).
+DIALOG_QUIET_MS = int(os.getenv("DIALOG_QUIET_MS", "120"))
+# A click that has not touched the dialog at all within this window is treated as a no-op
+DIALOG_RESPONSE_MS = int(os.getenv("DIALOG_RESPONSE_MS", "1500"))
+
+# Installs an observer that counts mutations touching the open dialog (or its removal)
+# and remembers the dialog element and error text at arm time as the baseline.
+_DIALOG_WATCH_ARM_JS = r"""
+if (window.__laWatch) window.__laWatch.observer.disconnect();
+const errText = d => d ? [...d.querySelectorAll('[data-test-form-element-error-messages]')]
+  .map(e => (e.innerText || '').trim()).filter(Boolean).join('|') : '';
+const dialog = document.querySelector('div[role="dialog"]');
+const w = {dialog, errors: errText(dialog), changed: 0, last: 0, notify: null, errText};
+w.observer = new MutationObserver(muts => {
+  const d = w.dialog;
+  if (!d || !d.isConnected || muts.some(m => d.contains(m.target))) {
+    w.changed += 1;
+    w.last = performance.now();
+    if (w.notify) w.notify();
+  }
+});
+w.observer.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+window.__laWatch = w;
+"""
+
+# Resolves with 'closed', 'errors', 'changed' or 'timeout' once the dialog has been
+# quiet for quietMs after the last observed mutation (arming first if needed).
+# With idleOk a dialog that stays untouched for quietMs resolves as 'idle'; otherwise
+# no mutation at all within responseMs resolves early as 'timeout'.
+_DIALOG_WATCH_WAIT_JS = "if (!window.__laWatch) {" + _DIALOG_WATCH_ARM_JS + "}" + r"""
+const timeoutMs = arguments[0], quietMs = arguments[1], idleOk = arguments[2], responseMs = arguments[3];
+const done = arguments[arguments.length - 1];
+const watch = window.__laWatch;
+let quietTimer = null, hardTimer = null, responseTimer = null, finished = false;
+const classify = () => {
+  const d = document.querySelector('div[role="dialog"]');
+  if (!d) return 'closed';
+  const errs = watch.errText(d);
+  if (errs && errs !== watch.errors) return 'errors';
+  if (d !== watch.dialog || watch.changed) return 'changed';
+  return null;
+};
+const finish = result => {
+  if (finished) return;
+  finished = true;
+  clearTimeout(quietTimer);
+  clearTimeout(hardTimer);
+  clearTimeout(responseTimer);
+  watch.notify = null;
+  watch.observer.disconnect();
+  window.__laWatch = null;
+  done(result);
+};
+const settle = () => {
+  clearTimeout(quietTimer);
+  quietTimer = setTimeout(() => { const r = classify() || (idleOk ? 'idle' : null); if (r) finish(r); }, quietMs);
+};
+watch.notify = settle;
+hardTimer = setTimeout(() => finish(classify() || 'timeout'), timeoutMs);
+responseTimer = setTimeout(() => { if (!watch.changed && !classify()) finish('timeout'); }, responseMs);
+if (idleOk || watch.changed || classify()) settle();
+"""
+
+
+def arm_dialog_watch() -> None:
+    """Start observing the dialog; call right before the action whose effect you wait for."""
     try:
-        fs = ctrl_el.find_element(By.XPATH, "./ancestor::fieldset[@data-test-form-builder-radio-button-form-component='true']")
+        driver.execute_script(_DIALOG_WATCH_ARM_JS)
     except Exception:
-        fs = None
+        pass
 
-    def gather_within(root):
-        items = []
-        try:
-            inputs = root.find_elements(By.XPATH, ".//input[@type='radio']")
-        except Exception:
-            inputs = []
-        for inp in inputs:
-            lbl_txt = ''
-            lbl_el = None
-            try:
-                # label by for=ID
-                rid = inp.get_attribute('id')
-                if rid:
-                    try:
-                        lbl_el = root.find_element(By.XPATH, f".//label[@for='{rid}']")
-                        lbl_txt = (lbl_el.text or '').strip()
-                    except Exception:
-                        lbl_el = None
-                if not lbl_txt:
-                    # following-sibling label
-                    try:
-                        lbl_el2 = inp.find_element(By.XPATH, "./following-sibling::label")
-                        lbl_txt = (lbl_el2.text or '').strip() or lbl_txt
-                        if lbl_el is None:
-                            lbl_el = lbl_el2
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-            if not lbl_txt:
-                lbl_txt = (inp.get_attribute('value') or '').strip()
-            items.append((inp, lbl_txt, lbl_el))
-
-        # role radios
-        try:
-            role_radios = root.find_elements(By.XPATH, ".//*[@role='radiogroup']//*[@role='radio']")
-        except Exception:
-            role_radios = []
-        for rr in role_radios:
-            txt = (rr.text or rr.get_attribute('aria-label') or '').strip()
-            items.append((rr, txt, None))
-        return items
-
-    if fs is not None:
-        candidates = gather_within(fs)
-    else:
-        # Fallback to whole dialog
-        try:
-            dialog = driver.find_element(By.XPATH, dialog_xpath)
-            candidates = gather_within(dialog)
-        except Exception:
-            candidates = []
 
-    def try_click(elem, lbl_el) -> bool:
-        try:
-            try:
-                driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", elem)
-            except Exception:
-                pass
-            if elem.is_displayed() and elem.is_enabled():
-                elem.click()
-                return True
-        except Exception:
-            pass
-        # try clicking associated label
+def wait_dialog_transition(timeout: Optional[float] = None, quiet_ms: Optional[int] = None,
+                           idle_ok: bool = False) -> str:
+    """Block until the dialog changes and settles, closes, or shows new errors.
+    Returns 'changed', 'closed', 'errors' or 'timeout' ('idle' when idle_ok and nothing changed)."""
+    timeout = DIALOG_WAIT_TIMEOUT if timeout is None else timeout
+    quiet_ms = DIALOG_QUIET_MS if quiet_ms is None else quiet_ms
+    try:
+        return driver.execute_async_script(
+            _DIALOG_WATCH_WAIT_JS, int(timeout * 1000), quiet_ms, idle_ok, DIALOG_RESPONSE_MS
+        ) or "timeout"
+    except Exception:
+        # Script support unavailable: fall back to the old fixed delay and inspect the DOM
+        time.sleep(0.8)
         try:
-            if lbl_el is not None and lbl_el.is_displayed():
-                try:
-                    driver.execute_script("arguments[0].scrollIntoView({block: 'center', inline: 'center'});", lbl_el)
-                except Exception:
-                    pass
-                lbl_el.click()
-                return True
+            if not driver.find_elements(By.XPATH, DIALOG_XPATH):
+                return "closed"
+            if driver.find_elements(By.CSS_SELECTOR, '[data-test-form-element-error-messages]'):
+                return "errors"
         except Exception:
             pass
-        # last resort JS click
-        try:
-            driver.execute_script("arguments[0].click();", elem)
-            return True
-        except Exception:
-            return False
+        return "changed"
 
-    def matches(txt: str, target: Optional[str]) -> bool:
-        if not target:
-            return False
-        return (txt or '').strip().lower() == str(target).strip().lower()
-
-    # 1) Preferred
-    for el, txt, lbl_el in candidates:
-        if matches(txt, preferred) and not _has_tried(question_key, txt):
-            if try_click(el, lbl_el):
-                _mark_tried(question_key, txt)
-                return True
-
-    # 2) Yes
-    for el, txt, lbl_el in candidates:
-        if (txt or '').strip().lower() == 'yes' and not _has_tried(question_key, txt):
-            if try_click(el, lbl_el):
-                _mark_tried(question_key, txt)
-                return True
-
-    # 3) First not tried
-    for el, txt, lbl_el in candidates:
-        if txt and not _has_tried(question_key, txt):
-            if try_click(el, lbl_el):
-                _mark_tried(question_key, txt)
-                return True
 
-    return False
+def click_and_wait(el, timeout: Optional[float] = None) -> str:
+    """Click an element inside the dialog and wait for the resulting transition."""
+    arm_dialog_watch()
+    el.click()
+    return wait_dialog_transition(timeout)
 
-def easy_apply_on_job(job_url: str):
-    try:
-        driver.get(job_url)
-        # Wait page body
-        try:
-            wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        except Exception:
-            pass
 
-        # Click Easy Apply button
+# ---------------------------------
+# Fill-plan cache for recurring forms
+# ---------------------------------
+# A dialog step is fingerprinted by its ordered (label, type, choices) list and the
+# profile hash the answer cache uses, so plans never outlive a profile change. Values
+# of every step of a successfully submitted application are stored per fingerprint
+# and replayed (one snapshot + one apply script call, no LLM) when the step shows up again.
+FILL_PLAN_ENABLED = os.getenv("FILL_PLAN_CACHE", "1") != "0"
+FILL_PLAN_PATH = os.getenv("FILL_PLAN_PATH", os.path.join(os.getcwd(), "fill_plans.sqlite3"))
+FILL_PLAN_STATS: Dict[str, int] = {"hits": 0, "misses": 0, "fields_replayed": 0, "saved": 0}
+
+# Values seen right before each Next/Review/Submit click of the current dialog: {fingerprint: plan}
+CURRENT_DIALOG_PLANS: Dict[str, List[list]] = {}
+_current_step_fp: Optional[str] = None
+_fill_plan_conn: Optional[sqlite3.Connection] = None
+
+
+def _get_fill_plans() -> Optional[sqlite3.Connection]:
+    global _fill_plan_conn, FILL_PLAN_ENABLED
+    if not FILL_PLAN_ENABLED:
+        return None
+    if _fill_plan_conn is None:
         try:
-            apply_btn = WebDriverWait(driver, 2).until(
-                EC.element_to_be_clickable((By.ID, "jobs-apply-button-id"))
+            conn = sqlite3.connect(FILL_PLAN_PATH)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS plans ("
+                " fingerprint TEXT PRIMARY KEY,"
+                " plan TEXT NOT NULL,"
+                " profile TEXT NOT NULL DEFAULT '',"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " updated_at REAL NOT NULL)"
             )
-            apply_btn.click()
-        except Exception:
-            pass
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(plans)")}
+            if "profile" not in cols:
+                conn.execute("ALTER TABLE plans ADD COLUMN profile TEXT NOT NULL DEFAULT ''")
+            # plans of an older profile can't be hit any more (see form_fingerprint)
+            conn.execute("DELETE FROM plans WHERE profile != ?", (_PROFILE_HASH,))
+            conn.commit()
+            _fill_plan_conn = conn
+        except Exception as e:
+            print(f"Fill-plan cache disabled: {e}")
+            FILL_PLAN_ENABLED = False
+    return _fill_plan_conn
+
+
+def form_fingerprint(fields: List[DialogField]) -> str:
+    shape = [[f.label.lower(), f.mode, [c.lower() for c in f.choices]] for f in fields]
+    return hashlib.sha1((_PROFILE_HASH + json.dumps(shape, ensure_ascii=False)).encode("utf-8")).hexdigest()
+
+
+def _plan_fields(fields: List[DialogField]) -> List[DialogField]:
+    return [f for f in fields if f.visible and f.label]
+
+
+def _replay_plan(plan: List[list], fields: List[DialogField], done: Set[Tuple[str, str]]) -> int:
+    by_key = {(f.label, f.mode): f for f in fields}
+    pairs: List[Tuple[DialogField, str]] = []
+    for label, mode, value in plan:
+        f = by_key.get((label, mode))
+        if f is None or (label, mode) in done:
+            continue
+        done.add((label, mode))
+        if f.value != value:
+            pairs.append((f, value))
+    apply_answers(pairs, remember=False)
+    return len(pairs)
+
+
+def replay_fill_plan() -> bool:
+    """Fingerprint the current step and fill it from a stored plan if one exists.
+    Returns True when a plan was replayed."""
+    global _current_step_fp
+    _current_step_fp = None
+    conn = _get_fill_plans()
+    if conn is None:
+        return False
+    fields = snapshot_dialog()
+    if fields is None:
+        return False
+    fields = _plan_fields(fields)
+    if not fields:
+        return False
+    fp = _current_step_fp = form_fingerprint(fields)
+    try:
+        row = conn.execute("SELECT plan FROM plans WHERE fingerprint = ?", (fp,)).fetchone()
+    except Exception:
+        row = None
+    if row is None:
+        FILL_PLAN_STATS["misses"] += 1
+        count_event("fill_plan_miss")
+        return False
+    plan = json.loads(row[0])
+    done: Set[Tuple[str, str]] = set()
+    replayed = _replay_plan(plan, fields, done)
+    # Answers can reveal follow-up questions; fill those from the same plan
+    if len(done) < len(plan):
+        more = snapshot_dialog()
+        if more:
+            replayed += _replay_plan(plan, _plan_fields(more), done)
+    FILL_PLAN_STATS["hits"] += 1
+    FILL_PLAN_STATS["fields_replayed"] += replayed
+    count_event("fill_plan_hit")
+    try:
+        conn.execute("UPDATE plans SET hits = hits + 1 WHERE fingerprint = ?", (fp,))
+        conn.commit()
+    except Exception:
+        pass
+    return True
+
 
-    # Wait for dialog
+def capture_fill_plan() -> None:
+    """Remember the current step's values (call right before Next/Review/Submit).
+    Fields still holding a fallback default are left out, so a plan never replays them."""
+    if _current_step_fp is None:
+        return
+    fields = snapshot_dialog()
+    if not fields:
+        return
+    CURRENT_DIALOG_PLANS[_current_step_fp] = [
+        [f.label, f.mode, f.value] for f in _plan_fields(fields)
+        if f.value and CURRENT_DIALOG_FALLBACKS.get(f.label) != f.value
+    ]
+
+
+def save_fill_plans() -> None:
+    """Persist the captured plans of a dialog that was submitted successfully."""
+    conn = _get_fill_plans()
+    if conn is not None and CURRENT_DIALOG_PLANS:
+        now = time.time()
         try:
-            WebDriverWait(driver, 2).until(
-                EC.presence_of_element_located((By.XPATH, '//div[@role="dialog"]'))
+            conn.executemany(
+                "INSERT INTO plans (fingerprint, plan, profile, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(fingerprint) DO UPDATE SET plan = excluded.plan, updated_at = excluded.updated_at",
+                [(fp, json.dumps(plan, ensure_ascii=False), _PROFILE_HASH, now)
+                 for fp, plan in CURRENT_DIALOG_PLANS.items() if plan],
             )
-            # Reset per-dialog tried cache
-            try:
-                CURRENT_DIALOG_TRIED.clear()
-            except Exception:
-                pass
+            conn.commit()
+            FILL_PLAN_STATS["saved"] += len(CURRENT_DIALOG_PLANS)
+        except Exception as e:
+            print(f"Failed to save fill plans: {e}")
+    CURRENT_DIALOG_PLANS.clear()
+
+
+def print_fill_plan_stats() -> None:
+    total = FILL_PLAN_STATS["hits"] + FILL_PLAN_STATS["misses"]
+    if not total:
+        return
+    print(
+        f"Fill-plan cache: {FILL_PLAN_STATS['hits']}/{total} steps served from cache "
+        f"({100.0 * FILL_PLAN_STATS['hits'] / total:.0f}%), {FILL_PLAN_STATS['fields_replayed']} fields replayed, "
+        f"{FILL_PLAN_STATS['saved']} step plans saved"
+    )
+
+
+# ---------------------------------
+# Easy Apply state machine
+# ---------------------------------
+# OPEN -> FILL -> NEXT/REVIEW -> FILL ... -> SUBMIT -> DONE, with ERROR_RETRY
+# re-filling after validation errors and DISMISS closing dialogs we give up on.
+# Every transition is appended to APPLY_TRACE_FILE as one JSON line, followed by a
+# per-job summary line (see apply_trace_report.py to aggregate runs).
+OPEN, FILL, NEXT, REVIEW, SUBMIT, ERROR_RETRY, DISMISS, DONE = (
+    "OPEN", "FILL", "NEXT", "REVIEW", "SUBMIT", "ERROR_RETRY", "DISMISS", "DONE"
+)
+# Outcomes: submitted, no_easy_apply, validation_failed, stuck, closed, max_steps, error
+APPLY_TRACE_FILE = os.getenv("APPLY_TRACE_FILE", os.path.join(os.getcwd(), "apply_trace.jsonl"))
+DIALOG_MAX_RETRIES = int(os.getenv("DIALOG_MAX_RETRIES", "3"))  # per step, after validation errors
+DIALOG_MAX_STEPS = int(os.getenv("DIALOG_MAX_STEPS", "15"))
+
+_NEXT_LABEL = "Continue to next step"
+_REVIEW_LABEL = "Review your application"
+_SUBMIT_LABEL = "Submit application"
+_DIALOG_BUTTONS_XPATH = (
+    f'{DIALOG_XPATH}//button[@aria-label="{_SUBMIT_LABEL}" or @aria-label="{_REVIEW_LABEL}" '
+    f'or @aria-label="{_NEXT_LABEL}"]'
+)
+
+APPLY_OUTCOMES: Dict[str, int] = {}
+
+
+class ApplyRun:
+    """State of one easy_apply_on_job call."""
+
+    __slots__ = ("job_url", "job_id", "step", "retries", "retry_state", "outcome", "error",
+                 "event", "fields", "t_start", "by_state", "llm_s", "dom_s")
+
+    def __init__(self, job_url: str):
+        self.job_url = job_url
+        self.job_id = job_id_from_url(job_url) or job_url
+        self.step = 0  # dialog page index
+        self.retries = 0  # ERROR_RETRY rounds on the current step
+        self.retry_state = SUBMIT  # button to click again after a retry
+        self.outcome: Optional[str] = None
+        self.error = ""
+        self.event = ""  # last dialog transition event
+        self.fields = 0
+        self.t_start = time.perf_counter()
+        self.by_state: Dict[str, float] = {}
+        self.llm_s = 0.0
+        self.dom_s = 0.0
+
+
+def _write_trace(rec: dict) -> None:
+    if not APPLY_TRACE_FILE:
+        return
+    try:
+        with open(APPLY_TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    except Exception as e:
+        print(f"Failed to write apply trace: {e}")
+
+
+def _visible_field_count() -> int:
+    return sum(1 for f in DIALOG_FIELD_CACHE.values() if f.visible)
+
+
+def _dialog_buttons() -> Dict[str, object]:
+    """Enabled Next/Review/Submit buttons of the open dialog by aria-label."""
+    out = {}
+    for b in driver.find_elements(By.XPATH, _DIALOG_BUTTONS_XPATH):
+        try:
+            if b.is_enabled():
+                out.setdefault(b.get_attribute("aria-label"), b)
         except Exception:
-            return  # No dialog opened, skip
+            continue
+    return out
 
-    # Loop through steps
-        while True:
-            time.sleep(0.5)
-            # If submit present and enabled -> try submit; if errors appear, retry up to 3 times
-            submit = None
-            try:
-                submit = driver.find_element(By.XPATH, '//button[@aria-label="Submit application"]')
-                if submit.is_enabled():
-                    submit.click()
-                    time.sleep(0.8)
-                    # Check if dialog closed; if still open and errors present, retry filling
-                    dialog_still_open = False
-                    try:
-                        driver.find_element(By.XPATH, '//div[@role="dialog"]')
-                        dialog_still_open = True
-                    except Exception:
-                        dialog_still_open = False
-                    if not dialog_still_open:
-                        print('Submitted...')
-                        break
-                    # Retry up to 3 times to resolve errors on submit
-                    for _ in range(3):
-                        try:
-                            errs = driver.find_elements(By.CSS_SELECTOR, '[data-test-form-element-error-messages]')
-                        except Exception:
-                            errs = []
-                        if not errs:
-                            # Try submit again
-                            try:
-                                submit = driver.find_element(By.XPATH, '//button[@aria-label="Submit application"]')
-                                if submit.is_enabled():
-                                    submit.click()
-                                    time.sleep(0.8)
-                            except Exception:
-                                pass
-                            # Check if closed now
-                            try:
-                                driver.find_element(By.XPATH, '//div[@role="dialog"]')
-                                dialog_still_open = True
-                            except Exception:
-                                dialog_still_open = False
-                            if not dialog_still_open:
-                                print('Submitted...')
-                                break
-                        else:
-                            fill_missing_dialog_fields()
-                            time.sleep(0.5)
-                            # Try submit again after filling
-                            try:
-                                submit = driver.find_element(By.XPATH, '//button[@aria-label="Submit application"]')
-                                if submit.is_enabled():
-                                    submit.click()
-                                    time.sleep(0.8)
-                            except Exception:
-                                pass
-                            # If dialog closes, success
-                            try:
-                                driver.find_element(By.XPATH, '//div[@role="dialog"]')
-                                dialog_still_open = True
-                            except Exception:
-                                dialog_still_open = False
-                            if not dialog_still_open:
-                                print('Submitted...')
-                                break
-                    else:
-                        # After retries, still open -> close and skip this job
-                        try:
-                            close_btn = driver.find_element(By.XPATH, '//button[@aria-label="Dismiss"]')
-                            if close_btn.is_displayed():
-                                close_btn.click()
-                        except Exception:
-                            pass
-                        return
-            except Exception:
-                pass
-
-                # Otherwise try Continue or Review
-                next_btn = None
-                try:
-                    # Prefer enabled ones
-                    cands = driver.find_elements(By.XPATH,
-                        '//button[@aria-label="Continue to next step" or @aria-label="Review your application"]')
-                    for b in cands:
-                        if b.is_enabled():
-                            next_btn = b
-                            break
-                except Exception:
-                    pass
 
-                if next_btn is not None:
-                    try:
-                        next_btn.click()
-                        time.sleep(0.5)
-                        # If errors appear after clicking Next/Review, attempt to fix and retry up to 3 times
-                        for _ in range(3):
-                            try:
-                                text_inputs = driver.find_elements(By.CSS_SELECTOR, 'div[data-test-single-line-text-form-component]')
-                            except Exception:
-                                text_inputs = []
-                            try:
-                                error_elems = driver.find_elements(By.CSS_SELECTOR, '[data-test-form-element-error-messages]')
-                            except Exception:
-                                error_elems = []
-                            if not text_inputs and not error_elems:
-                                break
-                            # Fill only fields with errors first (handled inside helper), then retry Next/Review
-                            fill_missing_dialog_fields()
-                            time.sleep(0.5)
-                            # Try clicking an enabled Next/Review again
-                            retried = False
-                            try:
-                                cands = driver.find_elements(By.XPATH,
-                                    '//button[@aria-label="Continue to next step" or @aria-label="Review your application"]')
-                                for b in cands:
-                                    if b.is_enabled():
-                                        b.click()
-                                        retried = True
-                                        break
-                            except Exception:
-                                pass
-                            time.sleep(0.5)
-                            if retried:
-                                # Re-evaluate; if cleaned up, we move on; else loop will try again
-                                continue
-                        else:
-                            # After retries, still errors -> close and skip this job
-                            try:
-                                close_btn = driver.find_element(By.XPATH, '//button[@aria-label="Dismiss"]')
-                                if close_btn.is_displayed():
-                                    close_btn.click()
-                            except Exception:
-                                pass
-                            return
-                    except Exception:
-                        # If can't click, treat as blocked, stop for this job
-                        break
-                    continue
-
-                # If we reached here, either no next/review visible or all disabled => stop
-                break
-
-            # Try closing dialog if still open (best-effort)
-            try:
-                close_btn = driver.find_element(By.XPATH, '//button[@aria-label="Dismiss"]')
-                if close_btn.is_displayed():
-                    close_btn.click()
-                CURRENT_DIALOG_TRIED.clear()
-            except Exception:
-                pass
+# Set DIALOG_RECORD_DIR to save every dialog step as a replayable fixture
+# (<dir>/<job id>/step_<n>.html + manifest.json, see dialog_fixture_server.py).
+# Recorded markup can contain prefilled profile data such as your email address.
+DIALOG_RECORD_DIR = os.getenv("DIALOG_RECORD_DIR", "")
+_DIALOG_HTML_JS = 'const d = document.querySelector(\'div[role="dialog"]\'); return d ? d.outerHTML : null;'
+
+
+def record_dialog_step(run: "ApplyRun") -> None:
+    if not DIALOG_RECORD_DIR:
+        return
+    try:
+        html = driver.execute_script(_DIALOG_HTML_JS)
+        if not html:
+            return
+        html = re.sub(r'\sdata-la-uid="[^"]*"', "", html)
+        folder = os.path.join(DIALOG_RECORD_DIR, re.sub(r"[^\w.-]+", "_", run.job_id))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"step_{run.step}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        with open(os.path.join(folder, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"job_id": run.job_id, "url": run.job_url, "steps": run.step + 1,
+                       "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+    except Exception as e:
+        print(f"Failed to record dialog step: {e}")
+
+
+def _reset_dialog_state() -> None:
+    CURRENT_DIALOG_TRIED.clear()
+    DIALOG_FIELD_CACHE.clear()
+    CURRENT_DIALOG_ANSWERS.clear()
+    CURRENT_DIALOG_FALLBACKS.clear()
+    CURRENT_DIALOG_PLANS.clear()
+
+
+def _state_open(run: ApplyRun) -> str:
+    driver.get(run.job_url)
+    try:
+        wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
     except Exception:
         pass
+    try:
+        WebDriverWait(driver, 2).until(EC.element_to_be_clickable((By.ID, "jobs-apply-button-id"))).click()
+        WebDriverWait(driver, 2).until(EC.presence_of_element_located((By.XPATH, DIALOG_XPATH)))
+    except Exception:
+        run.outcome = "no_easy_apply"
+        return DONE
+    _reset_dialog_state()
+    run.event = wait_dialog_transition(idle_ok=True)
+    return FILL
+
+
+def _state_fill(run: ApplyRun) -> str:
+    if run.step >= DIALOG_MAX_STEPS:
+        run.outcome = "max_steps"
+        return DISMISS
+    run.retries = 0
+    record_dialog_step(run)
+    # Known form step: replay the stored plan, otherwise fill empty fields
+    if not replay_fill_plan():
+        fill_missing_dialog_fields()
+    run.fields = _visible_field_count()
+    buttons = _dialog_buttons()
+    if _SUBMIT_LABEL in buttons:
+        return SUBMIT
+    if _REVIEW_LABEL in buttons:
+        return REVIEW
+    if _NEXT_LABEL in buttons:
+        return NEXT
+    run.outcome = "stuck"
+    return DISMISS
+
+
+def _click_step_button(run: ApplyRun, label: str, state: str) -> str:
+    btn = _dialog_buttons().get(label)
+    if btn is None:
+        run.outcome = "stuck"
+        return DISMISS
+    capture_fill_plan()
+    run.retry_state = state
+    run.event = click_and_wait(btn)
+    if run.event == "closed":
+        run.outcome = "closed"
+        return DONE
+    if run.event == "errors":
+        return ERROR_RETRY
+    run.step += 1
+    return FILL
+
+
+def _state_next(run: ApplyRun) -> str:
+    return _click_step_button(run, _NEXT_LABEL, NEXT)
+
+
+def _state_review(run: ApplyRun) -> str:
+    return _click_step_button(run, _REVIEW_LABEL, REVIEW)
+
+
+def _state_submit(run: ApplyRun) -> str:
+    btn = _dialog_buttons().get(_SUBMIT_LABEL)
+    if btn is None:
+        run.outcome = "stuck"
+        return DISMISS
+    capture_fill_plan()
+    run.retry_state = SUBMIT
+    run.event = click_and_wait(btn)
+    if run.event == "errors":
+        return ERROR_RETRY
+    # Closed, or replaced by the "application sent" confirmation
+    if run.event == "closed" or not driver.find_elements(By.XPATH, _DIALOG_BUTTONS_XPATH):
+        print('Submitted...')
+        save_fill_plans()
+        remember_accepted_answers()
+        run.outcome = "submitted"
+        return DONE if run.event == "closed" else DISMISS
+    return ERROR_RETRY
+
+
+def _state_error_retry(run: ApplyRun) -> str:
+    if run.retries >= DIALOG_MAX_RETRIES:
+        run.outcome = "validation_failed"
+        return DISMISS
+    run.retries += 1
+    # Fill only fields with errors first (handled inside helper), then click the same button again
+    fill_missing_dialog_fields()
+    run.fields = _visible_field_count()
+    if run.retry_state == SUBMIT:
+        return _state_submit(run)
+    label = _REVIEW_LABEL if run.retry_state == REVIEW else _NEXT_LABEL
+    btn = _dialog_buttons().get(label)
+    if btn is None:
+        # The step may have advanced on its own (e.g. Next became Review)
+        run.step += 1
+        return FILL
+    capture_fill_plan()
+    run.event = click_and_wait(btn)
+    if run.event == "closed":
+        run.outcome = "closed"
+        return DONE
+    if run.event == "errors":
+        return ERROR_RETRY
+    run.step += 1
+    return FILL
+
+
+def _state_dismiss(run: ApplyRun) -> str:
+    try:
+        close_btn = driver.find_element(By.XPATH, '//button[@aria-label="Dismiss"]')
+        if close_btn.is_displayed():
+            close_btn.click()
+    except Exception:
+        pass
+    CURRENT_DIALOG_TRIED.clear()
+    DIALOG_FIELD_CACHE.clear()
+    return DONE
+
+
+_STATE_HANDLERS = {
+    OPEN: _state_open,
+    FILL: _state_fill,
+    NEXT: _state_next,
+    REVIEW: _state_review,
+    SUBMIT: _state_submit,
+    ERROR_RETRY: _state_error_retry,
+    DISMISS: _state_dismiss,
+}
+
+
+def easy_apply_on_job(job_url: str) -> str:
+    """Run the Easy Apply dialog for one job and return its outcome."""
+    run = ApplyRun(job_url)
+    ledger_record(run.job_id, "in_progress", attempt=True)
+    state = OPEN
+    while state != DONE:
+        t0 = time.perf_counter()
+        llm0 = LLM_STATS["seconds"]
+        try:
+            nxt = _STATE_HANDLERS[state](run)
+        except Exception as e:
+            run.error = f"{state}: {type(e).__name__}: {e}"[:300]
+            if run.outcome is None:
+                run.outcome = "error"
+            nxt = DISMISS if state not in (OPEN, DISMISS) else DONE
+        elapsed = time.perf_counter() - t0
+        llm_s = LLM_STATS["seconds"] - llm0
+        run.llm_s += llm_s
+        run.dom_s += elapsed - llm_s
+        run.by_state[state] = run.by_state.get(state, 0.0) + elapsed
+        _write_trace({
+            "type": "transition", "ts": round(time.time(), 3), "job_id": run.job_id, "step": run.step,
+            "state": state, "next": nxt, "event": run.event, "fields": run.fields,
+            "llm_s": round(llm_s, 4), "dom_s": round(elapsed - llm_s, 4), "total_s": round(elapsed, 4),
+        })
+        state = nxt
+    outcome = run.outcome or "stuck"
+    APPLY_OUTCOMES[outcome] = APPLY_OUTCOMES.get(outcome, 0) + 1
+    _write_trace({
+        "type": "job", "ts": round(time.time(), 3), "job_id": run.job_id, "url": run.job_url,
+        "outcome": outcome, "steps": run.step + (1 if run.outcome != "no_easy_apply" else 0),
+        "total_s": round(time.perf_counter() - run.t_start, 4), "llm_s": round(run.llm_s, 4),
+        "dom_s": round(run.dom_s, 4), "by_state": {k: round(v, 4) for k, v in run.by_state.items()},
+        "error": run.error,
+    })
+    ledger_record(run.job_id, outcome, run.error)
+    if run.error:
+        print(f"Job {run.job_id}: {outcome} ({run.error})")
+    return outcome
+
+
+def print_apply_summary() -> None:
+    if APPLY_OUTCOMES:
+        print("Apply outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(APPLY_OUTCOMES.items())))
 
 
 # ---------------------------------
@@ -976,20 +1415,29 @@ def easy_apply_on_job(job_url: str):
 
 def main():
     try:
+        # Open the LLM connection while the browser logs in
+        warm_up_llm()
         ensure_logged_in_once()
-        # Navigate to search URL
+        # Navigate to search URL (doubles as the session check when cookies looked valid)
         driver.get(JOBS_SEARCH_URL)
+        if not is_logged_in():
+            login_with_credentials()
+            driver.get(JOBS_SEARCH_URL)
         try:
             wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'div[data-view-name="job-card"]')))
         except Exception:
             pass
 
-        all_links: List[str] = []
-        seen: Set[str] = set()
+        # Resume jobs left queued by an interrupted run; never revisit finished ones
+        all_links: List[str] = ledger_pending()
+        seen: Set[str] = ledger_done_ids() | {job_id_from_url(u) for u in all_links}
+        if all_links:
+            print(f"Resuming {len(all_links)} queued jobs from the ledger.")
 
         while True:
             # Collect links on current page
             page_links = collect_job_links_from_page(seen)
+            ledger_enqueue([job_id_from_url(u) for u in page_links])
             all_links.extend(page_links)
 
             # Try go next page
@@ -1000,14 +1448,16 @@ def main():
         # Process collected job URLs
         print(f"Collected {len(all_links)} job links. Starting Easy Apply...")
         for i, url in enumerate(all_links, start=1):
+            card = JOB_CARDS.get(job_id_from_url(url) or "")
+            if card:
+                print(f"[{i}/{len(all_links)}] {card.get('title')} - {card.get('company')} ({card.get('location')})")
             easy_apply_on_job(url)
             # small jitter
             time.sleep(0.7)
+        print_apply_summary()
+        print_fill_plan_stats()
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        browser_daemon.release_driver(driver)
 
 
 if __name__ == "__main__":
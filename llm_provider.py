@@ -1,8 +1,16 @@
 import os
 import json
-from typing import List, Optional, Dict, Any
+import atexit
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Set
 from openai import OpenAI
 from emailcred import open_ai_key, user_context
+from llm_telemetry import record_call, count as count_event, usage_tokens
 
 # API configuration
 # Option 1 (preferred if set): OpenRouter
@@ -52,6 +60,237 @@ except Exception:
     _USER_PROFILE_TEXT = ""
 
 
+# ---------------------------------
+# Persistent answer cache (SQLite)
+# ---------------------------------
+# Answers are keyed on (profile hash, normalized question, kind, sorted choices).
+# The profile hash covers user_context and _USER_PROFILE_TEXT, so editing either
+# one makes previously cached answers unreachable; stale rows are purged on open.
+ANSWER_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+ANSWER_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_answer_cache.sqlite3")
+)
+ANSWER_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600)))  # seconds
+ANSWER_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "5000"))  # LRU bound
+ANSWER_CACHE_TOUCH_INTERVAL = float(os.getenv("LLM_CACHE_TOUCH_INTERVAL", "300"))  # LRU timestamp granularity, seconds
+
+_PROFILE_HASH = hashlib.sha1(
+    f"{user_context}\x1f{_USER_PROFILE_TEXT}".encode("utf-8", "ignore")
+).hexdigest()
+
+_cache_conn: Optional[sqlite3.Connection] = None
+_cache_lock = threading.Lock()
+# last_used updates of cache hits, written in one transaction by cache_flush/cache_put_many
+_cache_touched: Dict[str, float] = {}
+
+
+def _normalize_question(question: str) -> str:
+    import re
+    q = re.sub(r"\s+", " ", str(question or "")).strip().lower()
+    return q.rstrip(" *:?")
+
+
+def _cache_key(question: str, kind: str, choices: Optional[List[str]] = None) -> str:
+    ch = sorted(str(c).strip().lower() for c in (choices or []))
+    raw = "\x1f".join([
+        _PROFILE_HASH,
+        _normalize_question(question),
+        str(kind or "text").strip().lower(),
+        "\x1e".join(ch),
+    ])
+    return hashlib.sha1(raw.encode("utf-8", "ignore")).hexdigest()
+
+
+def _get_cache() -> Optional[sqlite3.Connection]:
+    """Open (once) the answer cache and drop rows belonging to an older profile."""
+    global _cache_conn
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache_conn is not None:
+        return _cache_conn
+    try:
+        conn = sqlite3.connect(ANSWER_CACHE_PATH, check_same_thread=False)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " key TEXT PRIMARY KEY,"
+            " profile TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers(last_used)")
+        conn.execute("DELETE FROM answers WHERE profile != ?", (_PROFILE_HASH,))
+        conn.commit()
+        _cache_conn = conn
+    except Exception as e:
+        print(f"LLM answer cache disabled: {e}")
+        _cache_conn = None
+    return _cache_conn
+
+
+def cache_get(key: str) -> Optional[str]:
+    """Cached answer for key. The hit's last_used is only queued (and skipped when it was
+    refreshed within ANSWER_CACHE_TOUCH_INTERVAL); cache_flush writes the queue."""
+    conn = _get_cache()
+    if conn is None:
+        return None
+    now = time.time()
+    try:
+        with _cache_lock:
+            row = conn.execute("SELECT answer, created_at, last_used FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if ANSWER_CACHE_TTL > 0 and now - row[1] > ANSWER_CACHE_TTL:
+                conn.execute("DELETE FROM answers WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            if now - row[2] >= ANSWER_CACHE_TOUCH_INTERVAL:
+                _cache_touched[key] = now
+            return row[0]
+    except Exception:
+        return None
+
+
+def _write_touched(conn: sqlite3.Connection) -> None:
+    # caller holds _cache_lock and commits
+    if _cache_touched:
+        conn.executemany("UPDATE answers SET last_used = ? WHERE key = ?",
+                         [(t, k) for k, t in _cache_touched.items()])
+        _cache_touched.clear()
+
+
+def cache_flush() -> None:
+    """Write queued last_used updates of cache hits in one transaction."""
+    conn = _cache_conn
+    if conn is None or not _cache_touched:
+        return
+    try:
+        with _cache_lock:
+            _write_touched(conn)
+            conn.commit()
+    except Exception:
+        pass
+
+
+atexit.register(cache_flush)
+
+
+def cache_put_many(pairs: List[Tuple[str, str]]) -> None:
+    """Store (key, answer) pairs and evict least-recently-used rows beyond the bound."""
+    conn = _get_cache()
+    if conn is None or not pairs:
+        return
+    now = time.time()
+    try:
+        with _cache_lock:
+            _write_touched(conn)  # before the LRU eviction below
+            conn.executemany(
+                "INSERT OR REPLACE INTO answers(key, profile, answer, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(k, _PROFILE_HASH, a, now, now) for k, a in pairs],
+            )
+            if ANSWER_CACHE_MAX_ROWS > 0:
+                conn.execute(
+                    "DELETE FROM answers WHERE key IN ("
+                    " SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (ANSWER_CACHE_MAX_ROWS,),
+                )
+            conn.commit()
+    except Exception:
+        pass
+
+
+def cache_clear() -> None:
+    conn = _get_cache()
+    if conn is None:
+        return
+    try:
+        with _cache_lock:
+            conn.execute("DELETE FROM answers")
+            conn.commit()
+    except Exception:
+        pass
+
+
+# ---------------------------------
+# Similarity index over answered questions (paraphrase tolerant)
+# ---------------------------------
+# Consulted after an exact cache miss: reuses the answer of a previously asked,
+# similarly worded question with the same kind and choice set.
+SIMILARITY_ENABLED = os.getenv("LLM_SIMILARITY", "1") != "0"
+SIMILARITY_THRESHOLD = float(os.getenv("LLM_SIMILARITY_THRESHOLD", "0.35"))  # see calibrate_similarity.py
+SIMILARITY_INDEX_PATH = os.getenv(
+    "LLM_SIMILARITY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_answer_index")
+)
+
+_answer_index = None
+_answer_index_failed = False
+
+
+def _signature(kind: str, choices: Optional[List[str]] = None) -> str:
+    ch = sorted(str(c).strip().lower() for c in (choices or []))
+    raw = "\x1f".join([_PROFILE_HASH, str(kind or "text").strip().lower(), "\x1e".join(ch)])
+    return hashlib.sha1(raw.encode("utf-8", "ignore")).hexdigest()[:16]
+
+
+def _get_answer_index():
+    global _answer_index, _answer_index_failed
+    if not SIMILARITY_ENABLED or _answer_index_failed:
+        return None
+    if _answer_index is None:
+        try:
+            from answer_index import AnswerIndex  # needs numpy
+            _answer_index = AnswerIndex(SIMILARITY_INDEX_PATH, profile=_PROFILE_HASH)
+        except Exception as e:
+            print(f"LLM similarity index disabled: {e}")
+            _answer_index_failed = True
+    return _answer_index
+
+
+def similar_get(question: str, kind: str, choices: Optional[List[str]] = None) -> Optional[str]:
+    index = _get_answer_index()
+    if index is None:
+        return None
+    try:
+        hit = index.lookup(question, _signature(kind, choices), SIMILARITY_THRESHOLD)
+    except Exception:
+        return None
+    return hit[0] if hit else None
+
+
+def similar_put_many(entries: List[Tuple[str, str, Optional[List[str]], str]]) -> None:
+    """Add (question, kind, choices, answer) entries to the similarity index."""
+    index = _get_answer_index()
+    if index is None or not entries:
+        return
+    try:
+        index.add_many([(q, _signature(k, ch), a) for q, k, ch, a in entries])
+    except Exception:
+        pass
+
+
+def _lookup_answer(key: str, question: str, kind: str, choices: Optional[List[str]] = None) -> Optional[str]:
+    """Exact cache first, then the similarity index (promoting hits into the cache)."""
+    ans = cache_get(key)
+    if ans is not None:
+        count_event("cache_hit")
+        return ans
+    ans = similar_get(question, kind, choices)
+    if ans is not None:
+        count_event("similar_hit")
+        cache_put_many([(key, ans)])
+    else:
+        count_event("cache_miss")
+    return ans
+
+
+def _store_answers(entries: List[Tuple[str, str, str, Optional[List[str]], str]]) -> None:
+    """Persist (key, question, kind, choices, answer) model answers to the cache and index."""
+    if not entries:
+        return
+    cache_put_many([(key, ans) for key, _, _, _, ans in entries])
+    similar_put_many([(q, k, ch, ans) for _, q, k, ch, ans in entries])
+
+
 def _sanitize(text: str) -> str:
     """Remove framework tokens like <|start|>assistant<|channel|>final<|message|> and trim."""
     try:
@@ -62,30 +301,314 @@ def _sanitize(text: str) -> str:
     return (text or "").strip()
 
 
-def _get_client_and_model():
-    use_openrouter = bool(OPENROUTER_API_KEY)
-    if use_openrouter:
-        client = OpenAI(base_url=OPENROUTER_BASE_URL, api_key=OPENROUTER_API_KEY)
-        model = OPENROUTER_MODEL
-    elif OPENAI_API_KEY:
-        client = OpenAI(base_url=OPENAI_BASE_URL, api_key=OPENAI_API_KEY)
-        model = OPENAI_MODEL
-    else:
-        return None, None, False
-    extra_headers = {}
-    if use_openrouter:
+# ---------------------------------
+# Pooled clients (one per provider, reused for the whole process)
+# ---------------------------------
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "10"))  # max connections per provider
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "120"))  # seconds an idle connection is kept
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))  # per request, seconds
+LLM_SDK_RETRIES = int(os.getenv("LLM_SDK_RETRIES", "1"))  # SDK-level retries; hedging covers the rest
+LLM_WARMUP = os.getenv("LLM_WARMUP", "1") != "0"
+
+_clients: Dict[str, Any] = {}
+_clients_lock = threading.Lock()
+
+
+def _provider_config(provider: str) -> Optional[Dict[str, Any]]:
+    if provider == "openrouter" and OPENROUTER_API_KEY:
+        headers = {}
         if OPENROUTER_SITE_URL:
-            extra_headers["HTTP-Referer"] = OPENROUTER_SITE_URL
+            headers["HTTP-Referer"] = OPENROUTER_SITE_URL
         if OPENROUTER_SITE_TITLE:
-            extra_headers["X-Title"] = OPENROUTER_SITE_TITLE
-    return client, model, use_openrouter
+            headers["X-Title"] = OPENROUTER_SITE_TITLE
+        return {"base_url": OPENROUTER_BASE_URL, "api_key": OPENROUTER_API_KEY,
+                "model": OPENROUTER_MODEL, "headers": headers}
+    if provider == "openai" and OPENAI_API_KEY:
+        return {"base_url": OPENAI_BASE_URL, "api_key": OPENAI_API_KEY,
+                "model": OPENAI_MODEL, "headers": {}}
+    return None
+
+
+def _get_client(provider: str):
+    """Return the process-wide client for a provider, creating it on first use.
+    The underlying HTTP pool keeps connections alive so later calls skip TCP/TLS setup.
+    """
+    client = _clients.get(provider)
+    if client is not None:
+        return client
+    cfg = _provider_config(provider)
+    if cfg is None:
+        return None
+    with _clients_lock:
+        client = _clients.get(provider)
+        if client is None:
+            kwargs: Dict[str, Any] = {
+                "base_url": cfg["base_url"],
+                "api_key": cfg["api_key"],
+                "default_headers": cfg["headers"] or None,
+                "timeout": LLM_TIMEOUT,
+                "max_retries": LLM_SDK_RETRIES,
+            }
+            try:
+                import httpx
+                kwargs["http_client"] = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=LLM_POOL_SIZE,
+                        max_keepalive_connections=LLM_POOL_SIZE,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                    ),
+                )
+            except Exception:
+                pass  # SDK default pool
+            client = OpenAI(**kwargs)
+            _clients[provider] = client
+    return client
+
+
+# ---------------------------------
+# Provider routing: latency-aware order, hedging, deadlines, circuit breaker
+# ---------------------------------
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "20"))  # seconds per call before answering locally
+LLM_HEDGE = os.getenv("LLM_HEDGE", "1") != "0"
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))  # never hedge sooner than this
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4.0"))  # until a provider has samples
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "3"))  # consecutive failures that open it
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "60"))  # seconds before a trial call
+_EWMA_ALPHA = 0.2
+_PROVIDER_PREFERENCE = ("openrouter", "openai")
+
+
+class NoProviderAvailable(RuntimeError):
+    """No provider is configured, or every configured one has an open circuit."""
+
+
+def _tag_failure(err: BaseException, provider: str, model: str) -> BaseException:
+    """Attach the provider/model whose call failed, so error telemetry is split per provider."""
+    try:
+        err.llm_provider, err.llm_model = provider, model
+    except Exception:
+        pass
+    return err
+
+
+def _failed_call(err: BaseException) -> Tuple[str, str]:
+    """(provider, model) a _chat_completion error came from; 'routed' when no call was made."""
+    return getattr(err, "llm_provider", "routed"), getattr(err, "llm_model", "")
+
+
+class _ProviderHealth:
+    """EWMA latency/error rate, recent latencies for p95, and circuit-breaker state.
+
+    Closed: every call goes through. Open: none until the cooldown ends. Half-open:
+    exactly one trial call (claimed with begin()) until it succeeds or fails.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.recent: deque = deque(maxlen=200)
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def ok(self, latency: Optional[float] = None) -> None:
+        with self.lock:
+            if latency is not None:
+                self.recent.append(latency)
+                self.latency_ewma = latency if self.latency_ewma is None else (
+                    _EWMA_ALPHA * latency + (1 - _EWMA_ALPHA) * self.latency_ewma)
+            self.error_ewma *= (1 - _EWMA_ALPHA)
+            self.failures = 0
+            self.open_until = 0.0
+            self.probing = False
+
+    def fail(self) -> None:
+        with self.lock:
+            self.error_ewma = _EWMA_ALPHA + (1 - _EWMA_ALPHA) * self.error_ewma
+            self.failures += 1
+            self.probing = False
+            # also re-opens straight away when a half-open trial call fails
+            if self.failures >= LLM_BREAKER_FAILURES:
+                self.open_until = time.monotonic() + LLM_BREAKER_COOLDOWN
+
+    def available(self) -> bool:
+        with self.lock:
+            if self.failures < LLM_BREAKER_FAILURES:
+                return True
+            return time.monotonic() >= self.open_until and not self.probing
+
+    def begin(self) -> bool:
+        """Claim a call. Always granted while closed; in half-open only the first caller
+        gets through, and ok()/fail() on its result release the slot."""
+        with self.lock:
+            if self.failures < LLM_BREAKER_FAILURES:
+                return True
+            if time.monotonic() < self.open_until or self.probing:
+                return False
+            self.probing = True
+            return True
+
+    def release(self) -> None:
+        """Give back a trial call that ended without a verdict (abandoned stream)."""
+        with self.lock:
+            self.probing = False
+
+    def hedge_delay(self) -> float:
+        with self.lock:
+            if len(self.recent) < 5:
+                return LLM_HEDGE_DEFAULT_DELAY
+            vals = sorted(self.recent)
+        return max(LLM_HEDGE_MIN_DELAY, vals[int(0.95 * (len(vals) - 1))])
+
+    def score(self) -> float:
+        base = self.latency_ewma if self.latency_ewma is not None else LLM_HEDGE_DEFAULT_DELAY
+        return base * (1.0 + 4.0 * self.error_ewma)
+
+
+_health: Dict[str, _ProviderHealth] = {p: _ProviderHealth() for p in _PROVIDER_PREFERENCE}
+_hedge_executor = ThreadPoolExecutor(max_workers=max(4, 2 * LLM_POOL_SIZE), thread_name_prefix="llm-call")
+
+
+def _provider_order() -> List[str]:
+    """Configured providers with a closed circuit, fastest (error-weighted EWMA) first."""
+    avail = [p for p in _PROVIDER_PREFERENCE if _provider_config(p) and _health[p].available()]
+    return sorted(avail, key=lambda p: _health[p].score())  # stable: preference breaks ties
+
+
+def _active_provider() -> Optional[str]:
+    order = _provider_order()
+    return order[0] if order else None
+
+
+def _get_client_and_model():
+    provider = _active_provider()
+    if provider is None or not _health[provider].begin():
+        return None, None, False
+    return _get_client(provider), _provider_config(provider)["model"], provider == "openrouter"
+
+
+def _rejects_response_format(err: Exception) -> bool:
+    status = getattr(err, "status_code", None)
+    text = str(err).lower()
+    return status in (400, 422) and any(t in text for t in ("response_format", "json_schema", "structured"))
+
+
+def _attempt(provider: str, messages: List[Dict[str, str]], kwargs: Dict[str, Any],
+             plain_messages: Optional[List[Dict[str, str]]] = None):
+    """One call to one provider. plain_messages is the prompt to send when the provider
+    can't do structured output (response_format is dropped then)."""
+    if not _health[provider].begin():
+        raise NoProviderAvailable(f"{provider}: circuit half-open, trial call already in flight")
+    client = _get_client(provider)
+    model = _provider_config(provider)["model"]
+    if "response_format" in kwargs and provider in _NO_STRUCTURED:
+        kwargs = {k: v for k, v in kwargs.items() if k != "response_format"}
+        messages = plain_messages or messages
+    t0 = time.perf_counter()
+    try:
+        try:
+            completion = client.chat.completions.create(model=model, messages=messages, **kwargs)
+        except Exception as e:
+            if "response_format" not in kwargs or not _rejects_response_format(e):
+                raise
+            # provider/model has no structured outputs: remember and re-ask with the prompt alone
+            _NO_STRUCTURED.add(provider)
+            count_event("structured_unsupported")
+            kwargs = {k: v for k, v in kwargs.items() if k != "response_format"}
+            completion = client.chat.completions.create(model=model, messages=plain_messages or messages, **kwargs)
+    except Exception as e:
+        _health[provider].fail()
+        raise _tag_failure(e, provider, model)
+    _health[provider].ok(time.perf_counter() - t0)
+    return completion, provider, model
+
+
+def _chat_completion(messages: List[Dict[str, str]], plain_messages: Optional[List[Dict[str, str]]] = None,
+                     **kwargs):
+    """Run one chat completion and return (completion, provider, model).
+    With a response_format, plain_messages is the prompt for providers without structured output.
+
+    Starts on the best provider. If it is still running past its own p95
+    latency, the same request is also sent to the next provider, and the
+    first success wins; a failure switches over immediately. Raises
+    TimeoutError after LLM_DEADLINE seconds so callers can answer locally, and
+    NoProviderAvailable when nothing can be called. Losing or abandoned calls
+    are cancelled if not started yet; running ones end at the deadline through
+    the per-request timeout.
+    """
+    order = _provider_order()
+    if not order:
+        raise NoProviderAvailable("no LLM provider configured or all circuits open")
+    deadline = time.monotonic() + LLM_DEADLINE
+    backups = order[1:]
+    pending: Dict[Any, str] = {}
+
+    def launch(provider: str) -> float:
+        call_kwargs = dict(kwargs, timeout=max(1.0, deadline - time.monotonic()))
+        pending[_hedge_executor.submit(_attempt, provider, messages, call_kwargs, plain_messages)] = provider
+        return time.monotonic() + _health[provider].hedge_delay()
+
+    def abandon() -> None:
+        for fut in pending:
+            fut.cancel()
+
+    hedge_at = launch(order[0])
+    last_error: Optional[BaseException] = None
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            abandon()
+            # charged to the provider waited on longest
+            slow = next(iter(pending.values()))
+            raise _tag_failure(TimeoutError(f"LLM call exceeded {LLM_DEADLINE:.1f}s deadline"),
+                               slow, _provider_config(slow)["model"])
+        timeout = deadline - now
+        if backups and LLM_HEDGE:
+            timeout = min(timeout, max(0.0, hedge_at - now))
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        for fut in done:
+            pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                last_error = e
+                continue
+            abandon()
+            return result
+        if backups and (not pending or (LLM_HEDGE and time.monotonic() >= hedge_at)):
+            if pending:
+                count_event("hedged_request")
+            hedge_at = launch(backups.pop(0))
+    raise last_error or RuntimeError("LLM call failed")
 
 
-def llm_answer(question: str, kind: str, choices: Optional[List[str]] = None) -> str:
+def warm_up_llm(background: bool = True) -> None:
+    """Open pooled connections to every usable provider before the first dialog needs them.
+    Issues a cheap models listing; failures are only reported. No-op when LLM_WARMUP=0.
+    """
+    if not LLM_WARMUP:
+        return
+
+    def _run():
+        for provider in _provider_order():
+            try:
+                _get_client(provider).models.list()
+            except Exception as e:
+                print(f"LLM warm-up failed for {provider}: {e}")
+
+    if background:
+        threading.Thread(target=_run, name="llm-warmup", daemon=True).start()
+    else:
+        _run()
+
+
+def llm_answer(question: str, kind: str, choices: Optional[List[str]] = None, use_cache: bool = True) -> str:
     """
     Ask an LLM for an appropriate value for a form question.
     - kind: text | number | email | phone | url | radio | select | textarea
     - choices: when provided (radio/select), model should select one value exactly.
+    - use_cache: consult/store the persistent answer cache (disable for liveness checks).
 
     Returns a plain string answer. For choices, it will try to return exactly
     one of the provided values (case-insensitive match will be normalized).
@@ -93,7 +616,11 @@ def llm_answer(question: str, kind: str, choices: Optional[List[str]] = None) ->
     question = (question or "").strip()
     kind = (kind or "text").strip().lower()
 
-    
+    key = _cache_key(question, kind, choices) if use_cache else None
+    if key:
+        cached = _lookup_answer(key, question, kind, choices)
+        if cached is not None:
+            return cached
 
     sys = (
         f"User Context: --- {user_context}\n ---"
@@ -118,83 +645,120 @@ def llm_answer(question: str, kind: str, choices: Optional[List[str]] = None) ->
 
     # Fallback helper
     def _fallback() -> str:
-        if choices:
-            for c in choices:
-                if c and c.strip().lower() == "yes":
-                    return c
-            return choices[0]
-        return "NA"
+        return _fb({"choices": choices})
 
     # Build system prompt with user profile context
     profile_line = f" User Profile: {_USER_PROFILE_TEXT}." if _USER_PROFILE_TEXT else ""
     system_prompt = sys + profile_line
 
-    # Choose client: OpenRouter if key present, else OpenAI
-    client = None
-    use_openrouter = bool(OPENROUTER_API_KEY)
+    t0 = time.perf_counter()
     try:
-        client, model, use_openrouter = _get_client_and_model()
-        if client is None:
-            return _fallback()
-
-        extra_headers = {}
-        if use_openrouter:
-            if OPENROUTER_SITE_URL:
-                extra_headers["HTTP-Referer"] = OPENROUTER_SITE_URL
-            if OPENROUTER_SITE_TITLE:
-                extra_headers["X-Title"] = OPENROUTER_SITE_TITLE
-
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
+        completion, provider, model = _chat_completion(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user},
             ],
             temperature=0.1,
-            extra_headers=extra_headers or None,
         )
+        latency = time.perf_counter() - t0
+        prompt_tokens, completion_tokens = usage_tokens(getattr(completion, "usage", None))
         content = _sanitize(completion.choices[0].message.content or "")
-        if not content:
-            return _fallback()
+        answer: Optional[str] = content or None
         # Normalize to one of the choices for radio/select
-        if choices:
+        if choices and answer:
             lc_map = {c.lower(): c for c in choices}
             pick = content.strip().strip('\"\'').lower()
-            if pick in lc_map:
-                return lc_map[pick]
-            for k, v in lc_map.items():
-                if pick in k or k in pick:
-                    return v
-            return choices[0]
-        return content
+            answer = lc_map.get(pick)
+            if answer is None:
+                for k, v in lc_map.items():
+                    if pick in k or k in pick:
+                        answer = v
+                        break
+        record_call("single", provider, model, latency, prompt_tokens, completion_tokens,
+                    fallbacks=0 if answer else 1)
+        if not answer:
+            return Fallback(choices[0]) if choices and content else _fallback()
+        if key:
+            _store_answers([(key, question, kind, choices, answer)])
+        return answer
+    except NoProviderAvailable:
+        count_event("no_client_fallback")
+        return _fallback()
     except Exception as e:
         print(e)
+        if isinstance(e, TimeoutError):
+            count_event("deadline_fallback")
+        record_call("single", *_failed_call(e), time.perf_counter() - t0, fallbacks=1, error=True)
         return _fallback()
 
 
-def llm_answer_batch(items: List[Dict[str, Any]]) -> List[str]:
-    """
-    Batch version of llm_answer. Each item is a dict with keys:
-      - question: str
-      - kind: str (text | number | email | phone | url | radio | select | textarea)
-      - choices: Optional[List[str]] (for radio/select)
+# ---------------------------------
+# Batch answering
+# ---------------------------------
+LLM_SHARD_SIZE = int(os.getenv("LLM_SHARD_SIZE", "5"))  # questions per sub-batch (async path)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # sub-batches in flight
+LLM_SHARD_RETRIES = int(os.getenv("LLM_SHARD_RETRIES", "1"))  # re-asks for a shard whose reply didn't parse
 
-    Returns a list of strings, same order as items. Falls back per-item when needed.
-    """
-    # Per-item fallback
-    def _fb(it: Dict[str, Any]) -> str:
-        ch = it.get("choices") or []
+
+class Fallback(str):
+    """A default filled in when the model gave no usable answer.
+    Behaves like the plain string; callers check isinstance to avoid remembering it as an answer."""
+
+
+def _fb(it: Dict[str, Any]) -> str:
+    """Per-item fallback: 'Yes' when offered, else the first choice, else 'NA'."""
+    ch = it.get("choices") or []
+    if ch:
+        for c in ch:
+            if c and str(c).strip().lower() == "yes":
+                return Fallback(c)
+        return Fallback(ch[0])
+    return Fallback("NA")
+
+
+def _item_key(it: Dict[str, Any]) -> str:
+    return _cache_key(str(it.get("question") or ""), str(it.get("kind") or "text"), it.get("choices") or [])
+
+
+def _lookup_item(it: Dict[str, Any], key: str) -> Optional[str]:
+    return _lookup_answer(key, str(it.get("question") or ""), str(it.get("kind") or "text"), it.get("choices") or [])
+
+
+# Structured outputs: "auto" sends a JSON schema (per-item choice enums) and
+# remembers providers that reject it; "0" keeps the plain JSON-array prompt.
+LLM_STRUCTURED = os.getenv("LLM_STRUCTURED", "auto").strip().lower()
+_NO_STRUCTURED: Set[str] = set()
+
+
+def _use_structured() -> bool:
+    return LLM_STRUCTURED not in ("0", "off", "false", "no")
+
+
+def _answer_schema(pending: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """response_format for a batch: an object with keys a1..aN, choice items constrained by enum."""
+    props: Dict[str, Any] = {}
+    for idx, it in enumerate(pending):
+        prop: Dict[str, Any] = {"type": "string"}
+        ch = [str(c) for c in dict.fromkeys(it.get("choices") or []) if str(c)]
         if ch:
-            for c in ch:
-                if c and str(c).strip().lower() == "yes":
-                    return c
-            return ch[0]
-        return "NA"
+            prop["enum"] = ch
+        props[f"a{idx+1}"] = prop
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "form_answers",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": props,
+                "required": list(props),
+                "additionalProperties": False,
+            },
+        },
+    }
 
-    if not items:
-        return []
 
-    # Build messages
+def _batch_messages(pending: List[Dict[str, Any]], structured: bool = False) -> List[Dict[str, str]]:
     profile_line = f"User Profile: {_USER_PROFILE_TEXT}." if _USER_PROFILE_TEXT else ""
     sys = (
         f"User Context: --- {user_context}\n ---"
@@ -203,13 +767,20 @@ def llm_answer_batch(items: List[Dict[str, Any]]) -> List[str]:
     )
     system_prompt = sys + (" " + profile_line if profile_line else "")
 
-    # Compose a single user prompt listing all items, requiring JSON array of answers
-    lines = [
-        "Answer the following questions strictly as a JSON array of strings, same order as listed.",
-        "Do not include any keys or explanations. For radio/select, answer must be exactly one of the provided choices.",
-        "Questions:",
-    ]
-    for idx, it in enumerate(items):
+    # Compose a single user prompt listing all items, requiring JSON array (or a1..aN object) of answers
+    if structured:
+        lines = [
+            "Answer the following questions as a JSON object whose keys are a1, a2, ... matching the question numbers.",
+            "Each value is a string. For radio/select, the value must be exactly one of the provided choices.",
+            "Questions:",
+        ]
+    else:
+        lines = [
+            "Answer the following questions strictly as a JSON array of strings, same order as listed.",
+            "Do not include any keys or explanations. For radio/select, answer must be exactly one of the provided choices.",
+            "Questions:",
+        ]
+    for idx, it in enumerate(pending):
         q = str(it.get("question") or "").strip()
         k = str(it.get("kind") or "text").strip().lower()
         ch = it.get("choices") or []
@@ -217,63 +788,333 @@ def llm_answer_batch(items: List[Dict[str, Any]]) -> List[str]:
         if ch:
             joined = " | ".join(str(c) for c in ch)
             lines.append(f"   choices=[{joined}]")
-    lines.append("Respond with only the JSON array, e.g., [\"A\", \"B\"].")
-    user_content = "\n".join(lines)
+    if structured:
+        lines.append("Respond with only the JSON object, e.g., {\"a1\": \"A\", \"a2\": \"B\"}.")
+    else:
+        lines.append("Respond with only the JSON array, e.g., [\"A\", \"B\"].")
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": "\n".join(lines)},
+    ]
+
 
+def _parse_answer_array(raw: str, n: Optional[int] = None) -> Tuple[Optional[list], str]:
+    """Parse the model's answers: a JSON array, or an {"a1": ...} object from structured output.
+    Returns (answers or None, parse path: structured | direct | regex | failed).
+    """
+    def _from_object(obj: Any) -> Optional[list]:
+        if not isinstance(obj, dict):
+            return None
+        count = n if n is not None else len(obj)
+        answers = [obj.get(f"a{i+1}") for i in range(count)]
+        return answers if any(a is not None for a in answers) else None
+
+    path = "direct"
     try:
-        client, model, use_openrouter = _get_client_and_model()
-        if client is None:
-            return [_fb(it) for it in items]
-        extra_headers = {}
-        if use_openrouter:
-            if OPENROUTER_SITE_URL:
-                extra_headers["HTTP-Referer"] = OPENROUTER_SITE_URL
-            if OPENROUTER_SITE_TITLE:
-                extra_headers["X-Title"] = OPENROUTER_SITE_TITLE
-        completion = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_content},
-            ],
-            temperature=0.1,
-            extra_headers=extra_headers or None,
-        )
+        answers = json.loads(raw)
+    except Exception:
+        # try to extract JSON array (or object) substring
+        import re
+        path = "regex"
+        answers = None
+        m = re.search(r"\[(.*)\]", raw, re.DOTALL)
+        if m:
+            try:
+                answers = json.loads("[" + m.group(1) + "]")
+            except Exception:
+                answers = None
+        if answers is None:
+            m = re.search(r"\{.*\}", raw, re.DOTALL)
+            if not m:
+                return None, "failed"
+            try:
+                answers = _from_object(json.loads(m.group(0)))
+            except Exception:
+                return None, "failed"
+            return (answers, "regex") if answers is not None else (None, "failed")
+    if isinstance(answers, dict):
+        answers = _from_object(answers)
+        return (answers, "structured") if answers is not None else (None, "failed")
+    return (answers, path) if isinstance(answers, list) else (None, "failed")
+
+
+def _map_answer(it: Dict[str, Any], raw: Any) -> Optional[str]:
+    """Normalize one raw answer and map it onto the item's choices. None when unusable."""
+    ans = _sanitize(str(raw).strip() if raw is not None else "")
+    ch = it.get("choices") or []
+    if ch:
+        lc_map = {str(c).lower(): str(c) for c in ch}
+        pick = ans.strip().strip('\"\'').lower()
+        chosen = lc_map.get(pick) if pick else None
+        if chosen is None and pick:
+            for k, v in lc_map.items():
+                if pick in k or k in pick:
+                    chosen = v; break
+        return chosen
+    return ans or None
+
+
+def _map_batch_answers(pending: List[Dict[str, Any]], answers: list) -> List[Optional[str]]:
+    """Normalize raw answers and map them onto choices. None marks items the model didn't answer usably."""
+    return [_map_answer(it, answers[i] if i < len(answers) else None) for i, it in enumerate(pending)]
+
+
+def _request_batch(pending: List[Dict[str, Any]]) -> Optional[List[Optional[str]]]:
+    """One completion for a list of items.
+    Returns mapped answers (None per unusable item), or None when the call or parse failed.
+    """
+    t0 = time.perf_counter()
+    try:
+        structured = _use_structured()
+        kwargs: Dict[str, Any] = {"temperature": 0.1}
+        if structured:
+            # providers without structured output get the JSON-array prompt instead
+            kwargs["response_format"] = _answer_schema(pending)
+            kwargs["plain_messages"] = _batch_messages(pending)
+        completion, provider, model = _chat_completion(_batch_messages(pending, structured), **kwargs)
+        latency = time.perf_counter() - t0
+        prompt_tokens, completion_tokens = usage_tokens(getattr(completion, "usage", None))
         raw = _sanitize(completion.choices[0].message.content or "")
-        import json as _json
-        answers = []
-        try:
-            answers = _json.loads(raw)
-        except Exception:
-            # try to extract JSON array substring
+        answers, path = _parse_answer_array(raw, len(pending))
+        mapped = _map_batch_answers(pending, answers) if answers is not None else None
+        fallbacks = len(pending) if mapped is None else sum(1 for a in mapped if a is None)
+        record_call("batch", provider, model, latency, prompt_tokens, completion_tokens,
+                    batch_size=len(pending), parse=path, fallbacks=fallbacks)
+        return mapped
+    except NoProviderAvailable:
+        count_event("no_client_fallback", len(pending))
+        return [None] * len(pending)
+    except Exception as e:
+        print(e)
+        record_call("batch", *_failed_call(e), time.perf_counter() - t0,
+                    batch_size=len(pending), fallbacks=len(pending), error=True)
+        if isinstance(e, TimeoutError):
+            count_event("deadline_fallback", len(pending))
+            return [None] * len(pending)  # no time left to re-ask; answer locally
+        return None
+
+
+def _finish_batch(items: List[Dict[str, Any]], keys: List[str], results: List[Optional[str]],
+                  miss_idx: List[int], mapped: List[Optional[str]]) -> List[str]:
+    """Cache model answers, fall back per item, and merge back in original order."""
+    fresh: List[Tuple[str, str, str, Optional[List[str]], str]] = []
+    for i, ans in zip(miss_idx, mapped):
+        if ans:
+            it = items[i]
+            fresh.append((keys[i], str(it.get("question") or ""), str(it.get("kind") or "text"),
+                          it.get("choices") or [], ans))
+            results[i] = ans
+        else:
+            results[i] = _fb(items[i])
+    _store_answers(fresh)
+    return [r if isinstance(r, Fallback) else str(r) for r in results]
+
+
+def llm_answer_batch(items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Batch version of llm_answer. Each item is a dict with keys:
+      - question: str
+      - kind: str (text | number | email | phone | url | radio | select | textarea)
+      - choices: Optional[List[str]] (for radio/select)
+
+    Returns a list of strings, same order as items. Falls back per-item when needed.
+    Items already present in the answer cache are not sent to the model.
+    """
+    if not items:
+        return []
+
+    # Serve cache hits first; only the misses go into the prompt
+    keys = [_item_key(it) for it in items]
+    results: List[Optional[str]] = [_lookup_item(it, k) for it, k in zip(items, keys)]
+    cache_flush()
+    miss_idx = [i for i, r in enumerate(results) if r is None]
+    if not miss_idx:
+        return [str(r) for r in results]
+    pending = [items[i] for i in miss_idx]
+
+    mapped = _request_batch(pending) or [None] * len(pending)
+    return _finish_batch(items, keys, results, miss_idx, mapped)
+
+
+async def allm_answer_batch(items: List[Dict[str, Any]], shard_size: Optional[int] = None,
+                            max_concurrency: Optional[int] = None) -> List[str]:
+    """
+    Async, sharded llm_answer_batch. Cache misses are split into sub-batches of
+    shard_size questions that run concurrently (at most max_concurrency at once).
+    A shard whose reply fails to parse is re-asked up to LLM_SHARD_RETRIES times;
+    only that shard falls back to defaults if it keeps failing.
+
+    Shards run the pooled sync client in worker threads, so the keep-alive pool
+    is shared with llm_answer regardless of which event loop awaits this.
+    """
+    import asyncio
+
+    if not items:
+        return []
+
+    keys = [_item_key(it) for it in items]
+    results: List[Optional[str]] = [_lookup_item(it, k) for it, k in zip(items, keys)]
+    cache_flush()
+    miss_idx = [i for i, r in enumerate(results) if r is None]
+    if not miss_idx:
+        return [str(r) for r in results]
+
+    size = max(1, shard_size or LLM_SHARD_SIZE)
+    sem = asyncio.Semaphore(max(1, max_concurrency or LLM_MAX_CONCURRENCY))
+    shards = [miss_idx[i:i + size] for i in range(0, len(miss_idx), size)]
+
+    async def _run(shard: List[int]) -> List[Optional[str]]:
+        pending = [items[i] for i in shard]
+        for _ in range(1 + max(0, LLM_SHARD_RETRIES)):
+            async with sem:
+                mapped = await asyncio.to_thread(_request_batch, pending)
+            if mapped is not None:
+                return mapped
+        return [None] * len(pending)
+
+    shard_answers = await asyncio.gather(*(_run(sh) for sh in shards))
+    mapped = [ans for answers in shard_answers for ans in answers]
+    return _finish_batch(items, keys, results, miss_idx, mapped)
+
+
+# ---------------------------------
+# Streaming batch answers
+# ---------------------------------
+class JsonArrayStream:
+    """Incremental parser for a JSON array arriving in chunks.
+
+    feed() returns the elements completed by the new text, in order. Text before
+    the opening bracket (including <|...|> framework tokens) is ignored. Numbers
+    and literals are only emitted once a following ',' or ']' proves them whole.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._started = False
+        self.closed = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> List[Any]:
+        out: List[Any] = []
+        if self.closed or not chunk:
+            return out
+        self._buf += chunk
+        if not self._started:
             import re
-            m = re.search(r"\[(.*)\]", raw, re.DOTALL)
-            if m:
-                try:
-                    answers = _json.loads("[" + m.group(1) + "]")
-                except Exception:
-                    answers = []
-        if not isinstance(answers, list):
-            answers = []
-        # Normalize and map choices
-        out: List[str] = []
-        for i, it in enumerate(items):
-            ans = str(answers[i]).strip() if i < len(answers) else ""
-            ans = _sanitize(ans)
-            ch = it.get("choices") or []
-            if ch:
-                lc_map = {str(c).lower(): str(c) for c in ch}
-                pick = ans.strip().strip('\"\'').lower()
-                if pick in lc_map:
-                    out.append(lc_map[pick]); continue
-                chosen = None
-                for k, v in lc_map.items():
-                    if pick in k or k in pick:
-                        chosen = v; break
-                out.append(chosen if chosen else ch[0])
-            else:
-                out.append(ans if ans else _fb(it))
+            head = re.sub(r"<\|[^>]*\|>", "", self._buf)
+            start = head.find("[")
+            if start < 0:
+                return out
+            self._buf, self._pos, self._started = head[start + 1:], 0, True
+        buf = self._buf
+        while True:
+            pos = self._pos
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                self._pos = pos
+                break
+            if buf[pos] == "]":
+                self.closed = True
+                self._pos = pos + 1
+                break
+            try:
+                value, end = self._decoder.raw_decode(buf, pos)
+            except ValueError:
+                self._pos = pos
+                break  # element incomplete; wait for more text
+            if buf[pos] not in "\"[{" and (end >= len(buf) or buf[end] not in " \t\r\n,]"):
+                self._pos = pos
+                break  # scalar may continue in the next chunk
+            out.append(value)
+            self._pos = end
+        # drop consumed text so the buffer stays small
+        self._buf, self._pos = buf[self._pos:], 0
         return out
+
+
+def llm_answer_batch_stream(items: List[Dict[str, Any]]) -> Iterator[Tuple[int, str]]:
+    """
+    Streaming variant of llm_answer_batch. Yields (index, answer) pairs as soon
+    as each answer is known: cache/index hits first, then model answers while the
+    completion is still streaming. Items the stream never completes (malformed or
+    truncated tail) are yielded last with their fallback values.
+    """
+    if not items:
+        return
+    keys = [_item_key(it) for it in items]
+    miss_idx: List[int] = []
+    for i, (it, k) in enumerate(zip(items, keys)):
+        hit = _lookup_item(it, k)
+        if hit is None:
+            miss_idx.append(i)
+        else:
+            yield i, hit
+    cache_flush()
+    if not miss_idx:
+        return
+    pending = [items[i] for i in miss_idx]
+
+    done = [False] * len(pending)
+    fresh: List[Tuple[str, str, str, Optional[List[str]], str]] = []
+    client = None
+    provider, model = "", ""
+    usage = None
+    error = finished = False
+    parser = JsonArrayStream()
+    t0 = time.perf_counter()
+    try:
+        client, model, use_openrouter = _get_client_and_model()
+        if client is None:
+            count_event("no_client_fallback", len(pending))
+        else:
+            provider = "openrouter" if use_openrouter else "openai"
+            stream = client.chat.completions.create(
+                model=model,
+                messages=_batch_messages(pending),
+                temperature=0.1,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            produced = 0
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                for raw in parser.feed(delta):
+                    if produced >= len(pending):
+                        break
+                    j, produced = produced, produced + 1
+                    it = pending[j]
+                    ans = _map_answer(it, raw)
+                    if ans is None:
+                        continue  # fallback at the end
+                    done[j] = True
+                    fresh.append((keys[miss_idx[j]], str(it.get("question") or ""),
+                                  str(it.get("kind") or "text"), it.get("choices") or [], ans))
+                    yield miss_idx[j], ans
+                # keep draining after ']' so the usage chunk arrives and the connection stays reusable
+            finished = True
     except Exception as e:
         print(e)
-        return [_fb(it) for it in items]
+        error = True
+        if provider:
+            _health[provider].fail()
+    finally:
+        if provider and not error:
+            # success closes a half-open circuit; a consumer that stopped early leaves no verdict
+            if finished:
+                _health[provider].ok()
+            else:
+                _health[provider].release()
+        _store_answers(fresh)
+        if client is not None:
+            prompt_tokens, completion_tokens = usage_tokens(usage)
+            record_call("stream", provider, model, time.perf_counter() - t0, prompt_tokens, completion_tokens,
+                        batch_size=len(pending), parse="direct" if parser.closed else "failed",
+                        fallbacks=done.count(False), error=error)
+    for j, it in enumerate(pending):
+        if not done[j]:
+            yield miss_idx[j], _fb(it)
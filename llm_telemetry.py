@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+# ---------------------------------
+# LLM call telemetry (in-memory, dumped at exit)
+# ---------------------------------
+# One series per (call, provider, model). call is "single", "batch" or "stream".
+# Set LLM_METRICS_FILE to a *.json or *.prom path (empty disables the dump).
+METRICS_FILE = os.getenv("LLM_METRICS_FILE", "llm_metrics.json")
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+RECENT_WINDOW = 2048  # latencies kept per series for percentiles
+
+_lock = threading.Lock()
+_series: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+_counters: Dict[str, int] = {}
+_started = time.time()
+
+
+def _new_series() -> Dict[str, Any]:
+    return {
+        "calls": 0,
+        "errors": 0,
+        "latency_sum": 0.0,
+        "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "recent": deque(maxlen=RECENT_WINDOW),
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "items": 0,
+        "fallbacks": 0,
+        "parse": {"structured": 0, "direct": 0, "regex": 0, "failed": 0},
+    }
+
+
+def record_call(call: str, provider: str, model: str, latency: float, prompt_tokens: int = 0,
+                completion_tokens: int = 0, batch_size: int = 1, parse: Optional[str] = None,
+                fallbacks: int = 0, error: bool = False) -> None:
+    """Record one completion request (successful or not)."""
+    with _lock:
+        s = _series.get((call, provider, model))
+        if s is None:
+            s = _series[(call, provider, model)] = _new_series()
+        s["calls"] += 1
+        s["errors"] += 1 if error else 0
+        s["latency_sum"] += latency
+        s["recent"].append(latency)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                s["buckets"][i] += 1
+                break
+        else:
+            s["buckets"][-1] += 1
+        s["prompt_tokens"] += int(prompt_tokens or 0)
+        s["completion_tokens"] += int(completion_tokens or 0)
+        s["items"] += batch_size
+        s["fallbacks"] += fallbacks
+        if parse in s["parse"]:
+            s["parse"][parse] += 1
+
+
+def count(name: str, n: int = 1) -> None:
+    """Bump a free-form counter (e.g. cache hits)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def usage_tokens(usage: Any) -> Tuple[int, int]:
+    """(prompt, completion) token counts from an SDK usage object, zeros when absent."""
+    if usage is None:
+        return 0, 0
+    return int(getattr(usage, "prompt_tokens", 0) or 0), int(getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        series = []
+        for (call, provider, model), s in sorted(_series.items()):
+            recent = sorted(s["recent"])
+            series.append({
+                "call": call,
+                "provider": provider,
+                "model": model,
+                "calls": s["calls"],
+                "errors": s["errors"],
+                "latency_sum": round(s["latency_sum"], 4),
+                "latency_p50": round(_percentile(recent, 0.50), 4),
+                "latency_p95": round(_percentile(recent, 0.95), 4),
+                "latency_p99": round(_percentile(recent, 0.99), 4),
+                "latency_buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], s["buckets"])),
+                "prompt_tokens": s["prompt_tokens"],
+                "completion_tokens": s["completion_tokens"],
+                "items": s["items"],
+                "fallbacks": s["fallbacks"],
+                "fallback_rate": round(s["fallbacks"] / s["items"], 4) if s["items"] else 0.0,
+                "parse": dict(s["parse"]),
+            })
+        return {"uptime": round(time.time() - _started, 1), "series": series, "counters": dict(_counters)}
+
+
+def to_prometheus() -> str:
+    lines = []
+    with _lock:
+        items = sorted(_series.items())
+        counters = dict(_counters)
+    lines.append("# TYPE llm_request_latency_seconds histogram")
+    for (call, provider, model), s in items:
+        lbl = f'call="{call}",provider="{provider}",model="{model}"'
+        cum = 0
+        for bound, n in zip(LATENCY_BUCKETS, s["buckets"]):
+            cum += n
+            lines.append(f'llm_request_latency_seconds_bucket{{{lbl},le="{bound}"}} {cum}')
+        lines.append(f'llm_request_latency_seconds_bucket{{{lbl},le="+Inf"}} {s["calls"]}')
+        lines.append(f"llm_request_latency_seconds_sum{{{lbl}}} {s['latency_sum']:.6f}")
+        lines.append(f"llm_request_latency_seconds_count{{{lbl}}} {s['calls']}")
+    for name, key in (("llm_request_errors_total", "errors"), ("llm_prompt_tokens_total", "prompt_tokens"),
+                      ("llm_completion_tokens_total", "completion_tokens"), ("llm_items_total", "items"),
+                      ("llm_fallbacks_total", "fallbacks")):
+        lines.append(f"# TYPE {name} counter")
+        for (call, provider, model), s in items:
+            lines.append(f'{name}{{call="{call}",provider="{provider}",model="{model}"}} {s[key]}')
+    lines.append("# TYPE llm_parse_total counter")
+    for (call, provider, model), s in items:
+        for path, n in s["parse"].items():
+            lines.append(f'llm_parse_total{{call="{call}",provider="{provider}",model="{model}",path="{path}"}} {n}')
+    if counters:
+        lines.append("# TYPE llm_events_total counter")
+        for name, n in sorted(counters.items()):
+            lines.append(f'llm_events_total{{event="{name}"}} {n}')
+    return "\n".join(lines) + "\n"
+
+
+def dump(path: Optional[str] = None) -> None:
+    """Write metrics as Prometheus text (*.prom) or JSON; no-op when nothing was recorded."""
+    path = METRICS_FILE if path is None else path
+    if not path or (not _series and not _counters):
+        return
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith(".prom"):
+                f.write(to_prometheus())
+            else:
+                json.dump(snapshot(), f, indent=2)
+    except Exception as e:
+        print(f"Failed to write LLM metrics to {path}: {e}")
+
+
+atexit.register(dump)
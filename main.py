@@ -9,8 +9,13 @@ import random
 import config
 import json
 import os
-from typing import Optional
+import sqlite3
+from typing import List, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 from llm_provider import llm_answer
+import browser_profile
+import session_restore
+import page_extract
 
 # ----------------------------
 # Constants / Configuration
@@ -21,13 +26,21 @@ SEARCH_URL = (
 OUTPUT_FILE = "final-output.txt"
 MAX_PAGES = 200  # default safety cap, can be changed
 PAGE_BREAK_INTERVAL = 30  # take a break after this many pages
+PROFILE_LINK_SELECTOR = 'a[data-test-app-aware-link][href*="/in/"]'
 BATCH_SIZE = 10  # switch account after every 10 profile visits
+# Crawl frontier: discovered profiles, their search page and visit outcome (empty path disables it)
+FRONTIER_PATH = os.getenv("CRAWL_FRONTIER_PATH", "crawl_frontier.sqlite3")
+FRONTIER_MAX_ATTEMPTS = int(os.getenv("FRONTIER_MAX_ATTEMPTS", "2"))  # for failed visits
+NO_CONTACT_TTL_DAYS = float(os.getenv("NO_CONTACT_TTL_DAYS", "30"))  # revisit profiles without emails after this
+CRAWL_RESTART = os.getenv("CRAWL_RESTART", "0") == "1"  # collect SEARCH_URL from page 1 again
 
 service = Service()
 options = webdriver.ChromeOptions()
 options.add_argument("--start-maximized")
 options.add_argument("--disable-blink-features=AutomationControlled")
 # # options.add_argument("--headless=new")
+# eager page loads + blocked images/fonts/media/analytics (BROWSER_LITE=0 to disable)
+browser_profile.apply_options(options)
 # Defer driver creation until after LLM check passes
 driver = None
 
@@ -37,44 +50,41 @@ driver = None
 hrefs = []
 seen_hrefs = set()
 written_emails = set()
+active_account: Optional[int] = None  # account whose cookies are loaded
+relogin_tried = set()  # accounts re-logged in this run after a server-side logout
+_frontier_conn = None
 
 # ----------------------------
 # Functions
 # ----------------------------
 
-def get_user_url():
-    # Wait for profile links to be present and select stable anchors
+def get_user_url() -> dict:
+    """Collect the profile URLs on the current results page into hrefs/seen_hrefs.
+    One execute_script returns the normalized, deduplicated URLs and the Next
+    button state; the page state is returned for paginate_and_collect."""
     # LinkedIn profile links have data-test-app-aware-link and hrefs containing '/in/'
-    WebDriverWait(driver, 15).until(
-        EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]'))
-    )
-    a_tags = driver.find_elements(By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]')
-
-    # Extract hrefs, normalize, and deduplicate
-    urls = []
-    for a in a_tags:
-        href = a.get_attribute('href')
-        if not href:
-            continue
-        # Keep only real profile URLs
-        if '/in/' in href:
-            # Strip tracking query to avoid duplicates
-            base = href.split('?')[0]
-            urls.append(base)
-
-    # Deduplicate while preserving order
-    seen = set()
-    unique_urls = []
-    for u in urls:
-        if u not in seen:
-            seen.add(u)
-            unique_urls.append(u)
+    try:
+        WebDriverWait(driver, 15).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, PROFILE_LINK_SELECTOR))
+        )
+    except Exception:
+        pass
+    state = extract_results_page()
 
     # Add only new URLs globally
-    for u in unique_urls:
+    for u in state["urls"]:
         if u not in seen_hrefs:
             seen_hrefs.add(u)
             hrefs.append(u)
+    return state
+
+
+def extract_results_page() -> dict:
+    # Tracking query stripped to avoid duplicates
+    return page_extract.extract_page(
+        driver, PROFILE_LINK_SELECTOR, href_contains="/in/", strip_query=True,
+        next_selector="button", next_aria="Next",
+    )
 
 def cookies_path_for(account_index: int) -> str:
     return os.path.join(os.getcwd(), f"cookies_{account_index}.json")
@@ -82,15 +92,18 @@ def cookies_path_for(account_index: int) -> str:
 def has_cookies(account_index: int) -> bool:
     return os.path.isfile(cookies_path_for(account_index))
 
-def load_cookies(account_index: int):
-    """Load cookies for an account into the current driver session (does not navigate)."""
+def load_cookies(account_index: int) -> str:
+    """Load cookies for an account in one CDP call (does not navigate).
+    Returns the local session state: valid, expired (nothing loaded) or unknown."""
     try:
         with open(cookies_path_for(account_index), "r", encoding="utf-8") as read_file:
             cookies = json.load(read_file)
-            for cookie in cookies:
-                driver.add_cookie(cookie)
+        return session_restore.restore_session(
+            driver, cookies, origin="https://www.linkedin.com/",
+            auth_names=session_restore.LINKEDIN_AUTH_COOKIES,
+        )
     except Exception:
-        pass
+        return session_restore.EXPIRED
 
 def is_logged_in_current_page():
     # Heuristics: if login form present or URL contains '/login', we're logged out
@@ -113,23 +126,25 @@ def save_cookies_for(account_index: int):
         pass
 
 def ensure_logged_in_with_account(account_index: int):
-    """Ensure logged in as the specified account. Prefer cookies; only do form login once to mint cookies."""
+    """Ensure logged in as the specified account. Prefer cookies; only do form login once to mint cookies.
+    The feed is loaded only when the saved li_at cookie's expiry can't tell whether the session is alive."""
     # Try cookie-based session first
-    try:
-        driver.delete_all_cookies()
-    except Exception:
-        pass
-    driver.get("https://www.linkedin.com/")
+    session_restore.clear_cookies(driver, session_restore.LINKEDIN_SITE)
     if has_cookies(account_index):
-        load_cookies(account_index)
-        driver.get("https://www.linkedin.com/feed/")
-        try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-        except Exception:
-            pass
-        if is_logged_in_current_page():
+        state = load_cookies(account_index)
+        if state == session_restore.VALID:
             return
+        if state == session_restore.UNKNOWN:
+            driver.get("https://www.linkedin.com/feed/")
+            try:
+                WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+            except Exception:
+                pass
+            if is_logged_in_current_page():
+                return
+    login_with_account(account_index)
 
+def login_with_account(account_index: int):
     # Fallback: one-time credential login to mint cookies for this account
     creds = config.cred[account_index]
     driver.get("https://www.linkedin.com/login")
@@ -146,24 +161,24 @@ def ensure_logged_in_with_account(account_index: int):
         pass
 
 def switch_account(account_index: int):
-    """Switch to a different account by reloading its cookies or logging in once if needed."""
-    try:
-        driver.delete_all_cookies()
-    except Exception:
-        pass
-    driver.get("https://www.linkedin.com/")
-    if has_cookies(account_index):
-        load_cookies(account_index)
-        driver.get("https://www.linkedin.com/feed/")
-        try:
-            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-        except Exception:
-            pass
-        # If still not logged in (cookies expired), mint new cookies via one login
-        if not is_logged_in_current_page():
-            ensure_logged_in_with_account(account_index)
-    else:
-        ensure_logged_in_with_account(account_index)
+    """Switch to a different account by reloading its cookies or logging in once if needed.
+    Locally valid cookies aren't probed here; callers check the first page they open with recover_session."""
+    global active_account
+    ensure_logged_in_with_account(account_index)
+    active_account = account_index
+
+def recover_session(url: str) -> bool:
+    """Call right after navigating to url. Cookies that looked valid locally can still be revoked
+    server-side: on the login wall, log the active account in again (once per run) and reload url."""
+    if is_logged_in_current_page():
+        return True
+    if active_account is None or active_account in relogin_tried:
+        return False
+    relogin_tried.add(active_account)
+    print(f"Account #{active_account} is logged out; logging in again...")
+    login_with_account(active_account)
+    driver.get(url)
+    return is_logged_in_current_page()
 
 def scroll_to_bottom():
     # Scroll to the bottom of the page
@@ -171,36 +186,24 @@ def scroll_to_bottom():
     time.sleep(1)
 
 def load_all_results_on_page(max_scrolls: int = 1):
-    """Scrolls incrementally and stops when no new profile anchors appear or max_scrolls hit."""
-    try:
-        prev_count = len(driver.find_elements(By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]'))
-        for _ in range(max_scrolls):
-            driver.execute_script("window.scrollBy(0, document.body.scrollHeight);")
-            # time.sleep(0.8)
-            # Wait briefly for any new results to render
-            WebDriverWait(driver, 5).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]'))
-            )
-            curr_count = len(driver.find_elements(By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]'))
-            if curr_count <= prev_count:
-                break
-            prev_count = curr_count
-    except Exception:
-        # Fail-soft: do nothing if scrolling/waiting fails
-        pass
+    """Scrolls incrementally and stops when no new profile anchors appear or max_scrolls hit.
+    Each scroll is one async script that waits in the page for new anchors."""
+    for _ in range(max_scrolls):
+        counts = page_extract.scroll_for_more(driver, PROFILE_LINK_SELECTOR, timeout=2.0)
+        if counts["after"] <= counts["before"]:
+            break
 
-def click_next_button():
+def click_next_button(state: Optional[dict] = None):
+    """Click Next using the element found by the page extraction (looked up once if not given)."""
     try:
-        # Try to find the "Next" button with aria-label="Next"
-        next_button = driver.find_element(By.XPATH, '//button[@aria-label="Next"]')
-        if not next_button.is_enabled():
+        if state is None:
+            state = extract_results_page()
+        next_button = state["next"]
+        if next_button is None or not state["next_enabled"]:
             return False
 
-        # Capture a reference result element to wait for staleness
-        try:
-            first_result = driver.find_element(By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]')
-        except Exception:
-            first_result = None
+        # Reference result element to wait for staleness
+        first_result = state["first"]
 
         next_button.click()
 
@@ -212,11 +215,16 @@ def click_next_button():
             except Exception:
                 pass
         # Ensure new results are present
-        wait.until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]')))
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, PROFILE_LINK_SELECTOR)))
         return True
     except:
         return False
 
+CONTACT_INFO_READY_JS = (
+    "return !!document.querySelector('a[href^=\"mailto:\"]') || (document.readyState === 'complete'"
+    " && !!document.querySelector('section.pv-contact-info__contact-type, .pv-contact-info, .artdeco-modal__content'));"
+)
+
 def get_mailto_links_from_page(user_url):
     # Use the lightweight overlay contact info page instead of loading the full profile
     overlay_url = user_url.rstrip('/') + '/overlay/contact-info/'
@@ -224,15 +232,17 @@ def get_mailto_links_from_page(user_url):
 
     try:
         driver.get(overlay_url)
-        # If redirected to login, re-apply cookies of the current account and retry
-        if not is_logged_in_current_page():
-            # Attempt to recover session without repeated logins by reapplying current cookies
-            # We don't know which account index here; the caller ensures proper account is active.
-            driver.get("https://www.linkedin.com/feed/")
-            # proceed regardless; caller will ensure login before calling again if needed
-            driver.get(overlay_url)
-        # Wait for basic DOM readiness
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+        # If redirected to login, log the active account in again and retry
+        if not recover_session(overlay_url):
+            print(f"Not logged in; leaving {user_url} queued")
+            return None  # failed visit: nothing was inspected, so it isn't no-contact
+        # Eager page loads return before the overlay renders: wait for a mailto link or the
+        # finished contact-info modal, and treat a page that shows neither as a failed visit
+        try:
+            WebDriverWait(driver, 10).until(lambda d: d.execute_script(CONTACT_INFO_READY_JS))
+        except Exception:
+            print(f"Contact info overlay did not render for {user_url}")
+            return None
 
         # Extract mailto links directly
         mailto_tags = driver.find_elements(By.XPATH, '//a[starts-with(@href, "mailto:")]')
@@ -245,6 +255,8 @@ def get_mailto_links_from_page(user_url):
         if not mailto_links:
             driver.get(user_url)
             WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+            if not is_logged_in_current_page():
+                return None
             try:
                 contact_info_link = WebDriverWait(driver, 5).until(
                     EC.element_to_be_clickable((By.ID, 'top-card-text-details-contact-info'))
@@ -262,6 +274,7 @@ def get_mailto_links_from_page(user_url):
                 print(f"Contact info not found for {user_url}")
     except Exception:
         print(f"Failed to load overlay for {user_url}")
+        return None  # visit failed (vs. [] = no contact info)
 
     return list(mailto_links)
 
@@ -294,47 +307,167 @@ def append_unique_emails(path: str, emails: list, seen: set) -> None:
         pass
 
 
+# ----------------------------
+# Crawl frontier (resume after a crash or a stop)
+# ----------------------------
+# profiles: url, search page it was found on, outcome queued/emails/no-contact/failed
+# pages:    last fully collected page per search URL, and whether Next ran out
+def _get_frontier() -> Optional[sqlite3.Connection]:
+    global _frontier_conn
+    if _frontier_conn is None and FRONTIER_PATH:
+        try:
+            conn = sqlite3.connect(FRONTIER_PATH)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                " url TEXT PRIMARY KEY,"
+                " search_url TEXT NOT NULL,"
+                " search_page INTEGER NOT NULL,"
+                " outcome TEXT NOT NULL DEFAULT 'queued',"
+                " emails INTEGER NOT NULL DEFAULT 0,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " first_seen REAL NOT NULL,"
+                " visited_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " search_url TEXT NOT NULL,"
+                " page INTEGER NOT NULL,"
+                " profiles INTEGER NOT NULL,"
+                " last INTEGER NOT NULL DEFAULT 0,"
+                " done_at REAL NOT NULL,"
+                " PRIMARY KEY (search_url, page))"
+            )
+            conn.commit()
+            _frontier_conn = conn
+        except Exception as e:
+            print(f"Crawl frontier disabled: {e}")
+    return _frontier_conn
+
+
+def search_page_url(search_url: str, page: int) -> str:
+    """SEARCH_URL with its page parameter set, to open a results page directly."""
+    u = urlparse(search_url)
+    query = [(k, v) for k, v in parse_qsl(u.query, keep_blank_values=True) if k != "page"]
+    if page > 1:
+        query.append(("page", str(page)))
+    return urlunparse(u._replace(query=urlencode(query)))
+
+
+def frontier_resume_point(search_url: str) -> Tuple[int, bool]:
+    """(last fully collected page, whether that page had no Next) for search_url."""
+    conn = _get_frontier()
+    if conn is None:
+        return 0, False
+    row = conn.execute(
+        "SELECT page, last FROM pages WHERE search_url = ? ORDER BY page DESC LIMIT 1", (search_url,)
+    ).fetchone()
+    return (row[0], bool(row[1])) if row else (0, False)
+
+
+def frontier_reset_pages(search_url: str) -> None:
+    conn = _get_frontier()
+    if conn is not None:
+        conn.execute("DELETE FROM pages WHERE search_url = ?", (search_url,))
+        conn.commit()
+
+
+def frontier_record_page(search_url: str, page: int, urls: List[str], last: bool = False) -> None:
+    """Queue a page's profiles (already known ones keep their state) and mark the page collected."""
+    conn = _get_frontier()
+    if conn is None:
+        return
+    now = time.time()
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO profiles (url, search_url, search_page, first_seen) VALUES (?, ?, ?, ?)",
+            [(u, search_url, page, now) for u in urls],
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO pages (search_url, page, profiles, last, done_at) VALUES (?, ?, ?, ?, ?)",
+            (search_url, page, len(urls), 1 if last else 0, now),
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Failed to record search page {page} in the frontier: {e}")
+
+
+def frontier_pending() -> List[str]:
+    """Profiles to visit: never visited, failed with attempts left, or no contact info past the TTL."""
+    conn = _get_frontier()
+    if conn is None:
+        return []
+    stale = time.time() - NO_CONTACT_TTL_DAYS * 86400
+    rows = conn.execute(
+        "SELECT url FROM profiles WHERE outcome = 'queued'"
+        " OR (outcome = 'failed' AND attempts < ?)"
+        " OR (outcome = 'no-contact' AND visited_at < ?)"
+        " ORDER BY search_page, first_seen",
+        (FRONTIER_MAX_ATTEMPTS, stale),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def frontier_record_visit(url: str, outcome: str, emails: int = 0) -> None:
+    conn = _get_frontier()
+    if conn is None:
+        return
+    now = time.time()
+    try:
+        conn.execute(
+            "INSERT INTO profiles (url, search_url, search_page, outcome, emails, attempts, first_seen, visited_at) "
+            "VALUES (?, '', 0, ?, ?, 1, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET outcome = excluded.outcome, emails = excluded.emails, "
+            "attempts = CASE WHEN excluded.outcome = 'failed' THEN attempts + 1 ELSE 0 END, "
+            "visited_at = excluded.visited_at",
+            (url, outcome, emails, now, now),
+        )
+        conn.commit()
+    except Exception as e:
+        print(f"Failed to update frontier for {url}: {e}")
+
+
 # ----------------------------
 # Orchestration helpers
 # ----------------------------
 def wait_for_search_ready(timeout: int = 15):
     try:
         WebDriverWait(driver, timeout).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]'))
+            EC.presence_of_element_located((By.CSS_SELECTOR, PROFILE_LINK_SELECTOR))
         )
     except Exception:
         time.sleep(3)
 
 
-def paginate_and_collect(max_pages: int = MAX_PAGES, page_break_interval: int = PAGE_BREAK_INTERVAL):
+def paginate_and_collect(max_pages: int = MAX_PAGES, page_break_interval: int = PAGE_BREAK_INTERVAL,
+                         start_page: int = 1):
     """Pagination loop that avoids re-scrolling the same page repeatedly.
+    The browser must already show results page `start_page` (max_pages counts from page 1).
     For each page:
       1) Load all results via limited incremental scrolls
-      2) Extract URLs
+      2) Extract URLs and record the page in the crawl frontier
       3) Click Next and wait for change; break if no change or no Next
     """
-    page_counter = 0
+    page_counter = start_page - 1
     while True:
         page_counter += 1
         # 1) Load all results on current page with limited scrolls
         load_all_results_on_page(max_scrolls=4)
 
-        # 2) Extract URLs from the current page
-        get_user_url()
+        # 2) Extract URLs and the Next button state from the current page
+        state = get_user_url()
+        print(f"Page {page_counter}: {state['count']} profile links, {len(state['urls'])} unique, {len(hrefs)} total")
+        frontier_record_page(SEARCH_URL, page_counter, state["urls"], last=not state["next_enabled"])
 
         if page_counter >= max_pages:
             print(f"Reached max_pages={max_pages}, stopping pagination.")
             break
 
         # Before clicking Next, capture current URL and a reference anchor to verify change
-        current_url = driver.current_url
-        try:
-            ref_anchor = driver.find_element(By.CSS_SELECTOR, 'a[data-test-app-aware-link][href*="/in/"]')
-        except Exception:
-            ref_anchor = None
+        current_url = state["url"] or driver.current_url
+        ref_anchor = state["first"]
 
         # 3) Attempt to go to next page
-        if not click_next_button():
+        if not click_next_button(state):
             print("No more pages or the 'Next' button is disabled.")
             break
 
@@ -399,9 +532,18 @@ def process_profiles_and_write(urls: list, output_path: str, account_index: Opti
         # Small jitter between profile visits
         time.sleep(random.uniform(0.8, 2.2))
         emails = get_mailto_links_from_page(url)
+        if emails is None:
+            if not is_logged_in_current_page():
+                # A dead session would fail every visit; keep the rest queued for the next run
+                print("Session lost and re-login failed; stopping. Remaining profiles stay queued.")
+                break
+            frontier_record_visit(url, "failed")
+            continue
         if not emails:
+            frontier_record_visit(url, "no-contact")
             continue
         append_unique_emails(output_path, emails, written_emails)
+        frontier_record_visit(url, "emails", len(emails))
 
 
 # ----------------------------
@@ -414,7 +556,7 @@ def check_llm_ready() -> bool:
             print("No name provided; skipping LLM check.")
             return True
         prompt = f"My name is {expected_name}. What is my name? Answer only the name."
-        ans = (llm_answer(prompt, "text") or "").strip()
+        ans = (llm_answer(prompt, "text", use_cache=False) or "").strip()
         # Normalize for comparison
         if ans.lower() == expected_name.strip().lower():
             print("LLM check passed.")
@@ -430,6 +572,7 @@ def check_llm_ready() -> bool:
 # Main entry point
 # ----------------------------
 def main():
+    global driver
     # Pre-flight: verify LLM is responding before starting Selenium workflow
     if not check_llm_ready():
         try:
@@ -439,20 +582,34 @@ def main():
             pass
         return
     # Initialize driver only after LLM readiness is confirmed
-    global driver
     driver = webdriver.Chrome(service=service, options=options)
+    browser_profile.apply_driver(driver)
     # Step 1: Use account 0 to collect all profile URLs
     print("Activating account #0 to collect profile URLs...")
     switch_account(0)
-    driver.get(SEARCH_URL)
-    wait_for_search_ready()
+    # Resume from the page after the last fully collected one, opened through its page parameter
+    if CRAWL_RESTART:
+        frontier_reset_pages(SEARCH_URL)
+    last_page, exhausted = frontier_resume_point(SEARCH_URL)
+    start_page = last_page + 1
+    if exhausted or last_page >= MAX_PAGES:
+        print(f"Search already collected up to page {last_page}; set CRAWL_RESTART=1 to collect it again.")
+    else:
+        if last_page:
+            print(f"Resuming search collection at page {start_page}.")
+        start_url = search_page_url(SEARCH_URL, start_page)
+        driver.get(start_url)
+        recover_session(start_url)
+        wait_for_search_ready()
 
-    paginate_and_collect(max_pages=MAX_PAGES, page_break_interval=PAGE_BREAK_INTERVAL)
+        paginate_and_collect(max_pages=MAX_PAGES, page_break_interval=PAGE_BREAK_INTERVAL, start_page=start_page)
 
     # Step 2: Process collected URLs using only account #1 for contact info (fallback to #0 if not available)
+    # The frontier also holds profiles queued by earlier runs and no-contact profiles past their TTL
+    pending = frontier_pending() if _get_frontier() is not None else hrefs
     processing_account = 1 if len(getattr(config, 'cred', [])) > 1 else 0
-    print(f"Processing collected profiles using account #{processing_account} for contact info...")
-    process_profiles_and_write(hrefs, OUTPUT_FILE, account_index=processing_account)
+    print(f"Processing {len(pending)} profiles using account #{processing_account} for contact info...")
+    process_profiles_and_write(pending, OUTPUT_FILE, account_index=processing_account)
 
     driver.quit()
 
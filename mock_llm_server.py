@@ -0,0 +1,185 @@
+import os
+import re
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+# ---------------------------------
+# Local OpenAI-compatible stand-in for load testing llm_provider
+# ---------------------------------
+# Serves POST /v1/chat/completions (plain and SSE streaming) and GET /v1/models.
+# Point llm_provider at it with:
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock
+# (OpenRouter is preferred when its key is set, so leave open_ai_key empty.)
+
+DEFAULTS = {
+    "latency": float(os.getenv("MOCK_LLM_LATENCY", "0.3")),  # seconds before the first byte
+    "jitter": float(os.getenv("MOCK_LLM_JITTER", "0.1")),  # +/- uniform seconds
+    "per_item": float(os.getenv("MOCK_LLM_PER_ITEM", "0.05")),  # extra seconds per batch question
+    "failure_rate": float(os.getenv("MOCK_LLM_FAILURE_RATE", "0.0")),  # HTTP 500 probability
+    "malformed_rate": float(os.getenv("MOCK_LLM_MALFORMED_RATE", "0.0")),  # broken JSON array probability
+    "chunk_delay": float(os.getenv("MOCK_LLM_CHUNK_DELAY", "0.01")),  # seconds between stream chunks
+    "structured": float(os.getenv("MOCK_LLM_STRUCTURED", "1")),  # 0 rejects json_schema response_format
+}
+
+
+def _answer_for(question: str, choices: List[str]) -> str:
+    if choices:
+        for c in choices:
+            if c.strip().lower() == "yes":
+                return c
+        return choices[0]
+    q = question.lower()
+    if "year" in q or "experience" in q or "notice" in q or "salary" in q or "ctc" in q:
+        return "3"
+    return "Mock answer"
+
+
+def build_reply(user_content: str, structured: bool = False) -> str:
+    """Reply text for a prompt in llm_provider's single or batch format.
+    structured=True answers a batch as an {"a1": ...} object, as a json_schema response_format would.
+    """
+    batch = re.findall(r"^\d+\. question=(.*?) \| type=\S*[ \t]*(?:\n[ \t]+choices=\[(.*?)\])?",
+                       user_content, re.MULTILINE)
+    if batch:
+        answers = [_answer_for(q, [c.strip() for c in ch.split("|")] if ch else []) for q, ch in batch]
+        if structured:
+            return json.dumps({f"a{i+1}": a for i, a in enumerate(answers)})
+        return json.dumps(answers)
+    q = re.search(r"Question: (.*)", user_content)
+    choices = re.findall(r"^- (.*)$", user_content, re.MULTILINE)
+    return _answer_for(q.group(1) if q else user_content, choices)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    config = dict(DEFAULTS)
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoints
+
+    def setup(self):
+        super().setup()
+        # headers and body go out in separate writes; don't let Nagle delay the body
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "mock-model", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(length) or b"{}")
+        except Exception:
+            self._send_json(400, {"error": {"message": "invalid JSON body"}})
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        cfg = self.config
+        messages = req.get("messages") or []
+        user_content = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        structured = (req.get("response_format") or {}).get("type") == "json_schema"
+        if structured and not cfg["structured"]:
+            self._send_json(400, {"error": {"message": "response_format json_schema is not supported",
+                                            "type": "invalid_request_error"}})
+            return
+        reply = build_reply(user_content, structured)
+        n_items = max(1, user_content.count("question="))
+        time.sleep(max(0.0, cfg["latency"] + random.uniform(-cfg["jitter"], cfg["jitter"])
+                       + cfg["per_item"] * n_items))
+
+        if random.random() < cfg["failure_rate"]:
+            self._send_json(500, {"error": {"message": "mock failure", "type": "server_error"}})
+            return
+        if reply[:1] in "[{" and random.random() < cfg["malformed_rate"]:
+            reply = reply[: max(2, len(reply) // 2)]  # truncated array
+
+        model = req.get("model") or "mock-model"
+        usage = {"prompt_tokens": sum(len(str(m.get("content", ""))) for m in messages) // 4,
+                 "completion_tokens": max(1, len(reply) // 4)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if req.get("stream"):
+            self._stream(model, reply, usage, bool((req.get("stream_options") or {}).get("include_usage")))
+            return
+        self._send_json(200, {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, model: str, reply: str, usage: dict, include_usage: bool):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(payload: Optional[dict]):
+            data = "data: [DONE]\n\n" if payload is None else f"data: {json.dumps(payload)}\n\n"
+            raw = data.encode("utf-8")
+            self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+            self.wfile.flush()
+
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for i in range(0, len(reply), 8):
+            event({**base, "choices": [{"index": 0, "delta": {"content": reply[i:i + 8]}, "finish_reason": None}]})
+            time.sleep(self.config["chunk_delay"])
+        event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if include_usage:
+            event({**base, "choices": [], "usage": usage})
+        event(None)
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **overrides) -> ThreadingHTTPServer:
+    """Start the mock server on a daemon thread; port 0 picks a free one."""
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"config": {**DEFAULTS, **overrides}})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-llm", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible mock for llm_provider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    for name, val in DEFAULTS.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=val)
+    args = parser.parse_args()
+    overrides = {name: getattr(args, name) for name in DEFAULTS}
+    handler = type("ConfiguredMockLLMHandler", (MockLLMHandler,), {"config": overrides})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1  {overrides}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
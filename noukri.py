@@ -12,6 +12,11 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+import browser_profile
+import browser_daemon
+import session_restore
+import page_extract
+
 # ----------------------------
 # Config
 # ----------------------------
@@ -55,7 +60,11 @@ options.add_experimental_option(
     },
 )
 # options.add_argument("--headless=new")  # optional
-driver = webdriver.Chrome(service=service, options=options)
+# eager page loads + blocked images/fonts/media/analytics (BROWSER_LITE=0 to disable)
+browser_profile.apply_options(options)
+# Attaches to a running browser_daemon when available, launches Chrome otherwise
+driver = browser_daemon.get_driver(service, options)
+browser_profile.apply_driver(driver)
 
 # Hide webdriver flag early on every page
 try:
@@ -80,50 +89,21 @@ def load_snapshot(path: str) -> Dict[str, Any]:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def clear_web_state(drv):
-    drv.delete_all_cookies()
-    drv.execute_script("localStorage.clear(); sessionStorage.clear();")
-
-def apply_snapshot(drv, snapshot: Dict[str, Any], base_url: str):
-    # Must be on origin to set cookies/storage
-    drv.get(base_url)
-
-    # Cookies (JS cannot set HttpOnly, but Selenium can add most)
-    drv.delete_all_cookies()
-    for c in snapshot.get("cookies", []):
-        cookie = {k: v for k, v in c.items() if k in {
-            "name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite"
-        }}
-        try:
-            drv.add_cookie(cookie)
-        except Exception:
-            # Some cookies may fail based on domain/samesite/secure rules
-            pass
-
-    # localStorage
-    ls = snapshot.get("localStorage", {}) or {}
-    if ls:
-        drv.execute_script("""
-            const data = arguments[0];
-            window.localStorage.clear();
-            for (const [k, v] of Object.entries(data)) {
-              window.localStorage.setItem(k, v);
-            }
-        """, ls)
-
-    # sessionStorage
-    ss = snapshot.get("sessionStorage", {}) or {}
-    if ss:
-        drv.execute_script("""
-            const data = arguments[0];
-            window.sessionStorage.clear();
-            for (const [k, v] of Object.entries(data)) {
-              window.sessionStorage.setItem(k, v);
-            }
-        """, ss)
-
-    # Let app pick up new state
-    drv.refresh()
+def apply_snapshot(drv, snapshot: Dict[str, Any], base_url: str) -> str:
+    """Restore cookies + storage in bulk before the first page load.
+    Returns the local session state; the site is only probed when it is inconclusive."""
+    state = session_restore.restore_session(
+        drv,
+        snapshot.get("cookies", []) or [],
+        origin=base_url,
+        local_storage=snapshot.get("localStorage", {}) or {},
+        session_storage=snapshot.get("sessionStorage", {}) or {},
+        auth_names=session_restore.NAUKRI_AUTH_COOKIES,
+    )
+    if state == session_restore.UNKNOWN:
+        # Let app pick up new state
+        drv.get(base_url)
+    return state
 
 # ----------------------------
 # Scraping helpers
@@ -145,31 +125,18 @@ def collect_job_links(max_pages: int) -> List[str]:
         except Exception:
             pass
 
-        anchors = driver.find_elements(By.CSS_SELECTOR, "a.title")
-        for a in anchors:
-            try:
-                href = a.get_attribute("href")
-                if href:
-                    full = urljoin(BASE_URL, href)
-                    if full not in seen:
-                        seen.add(full)
-                        links.append(full)
-            except Exception:
-                continue
-
-        # Find and click Next button:
+        # Links plus the Next button in one script call:
         # <a class="styles_btn-secondary__2AsIP"><span>Next</span>...</a>
-        next_candidates = driver.find_elements(By.CSS_SELECTOR, "a.styles_btn-secondary__2AsIP")
-        next_link = None
-        for el in next_candidates:
-            try:
-                span = el.find_element(By.TAG_NAME, "span")
-                if span.text.strip().lower() == "next" and el.is_enabled():
-                    next_link = el
-                    break
-            except Exception:
-                continue
-
+        state = page_extract.extract_page(
+            driver, "a.title", next_selector="a.styles_btn-secondary__2AsIP", next_text="next",
+        )
+        for href in state["urls"]:
+            full = urljoin(BASE_URL, href)
+            if full not in seen:
+                seen.add(full)
+                links.append(full)
+
+        next_link = state["next"] if state["next_enabled"] else None
         if not next_link:
             break  # no more next
 
@@ -195,6 +162,13 @@ def extract_contacts_from_job(url: str) -> Dict[str, Any]:
         WebDriverWait(driver, 15).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
         # Look for the description container
         # class="styles_job-desc-container__txpYf"
+        # (eager page loads return before it renders, so wait for it before falling back to page_source)
+        try:
+            WebDriverWait(driver, 8).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, ".styles_job-desc-container__txpYf"))
+            )
+        except Exception:
+            pass
         desc_nodes = driver.find_elements(By.CSS_SELECTOR, ".styles_job-desc-container__txpYf")
         text_blob = " ".join([n.text for n in desc_nodes]) if desc_nodes else driver.page_source
 
@@ -257,13 +231,15 @@ def main():
     # Apply snapshot to log in without form
     if not os.path.isfile(SNAPSHOT_PATH):
         print(f"Snapshot file not found: {SNAPSHOT_PATH}")
-        driver.quit()
+        browser_daemon.release_driver(driver)
         return
 
     snap = load_snapshot(SNAPSHOT_PATH)
-    driver.get(BASE_URL)
-    clear_web_state(driver)
-    apply_snapshot(driver, snap, BASE_URL)
+    session_restore.clear_cookies(driver, session_restore.NAUKRI_SITE)
+    if apply_snapshot(driver, snap, BASE_URL) == session_restore.EXPIRED:
+        print(f"Session in {SNAPSHOT_PATH} has expired; export a fresh snapshot.")
+        browser_daemon.release_driver(driver)
+        return
 
     # Collect job links with page cap
     print(f"Collecting job links up to {MAX_PAGES} pages...")
@@ -282,7 +258,7 @@ def main():
 
     append_results(OUTPUT_FILE, results)
     print(f"Saved {len(results)} new entries to {OUTPUT_FILE}")
-    driver.quit()
+    browser_daemon.release_driver(driver)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,71 @@
+from typing import Any, Dict
+
+# ---------------------------------
+# Batched DOM extraction for search-result pages
+# ---------------------------------
+# One execute_script per page returns normalized, de-duplicated link URLs plus
+# the pagination state (Next element, whether it is enabled, anchor count), in
+# place of a get_attribute/find_element round trip per anchor.
+
+_EXTRACT_JS = r"""
+const [linkSel, hrefContains, stripQuery, nextSel, nextText, nextAria] = arguments;
+const anchors = [...document.querySelectorAll(linkSel)];
+const urls = [], seen = new Set();
+for (const a of anchors) {
+  let href = a.href || '';
+  if (!href || (hrefContains && !href.includes(hrefContains))) continue;
+  if (stripQuery) href = href.split('#')[0].split('?')[0];
+  if (seen.has(href)) continue;
+  seen.add(href);
+  urls.push(href);
+}
+let next = null;
+if (nextSel) {
+  for (const el of document.querySelectorAll(nextSel)) {
+    const text = (el.innerText || el.textContent || '').trim().toLowerCase();
+    if (nextText && text !== nextText.toLowerCase()) continue;
+    if (nextAria && el.getAttribute('aria-label') !== nextAria) continue;
+    next = el;
+    break;
+  }
+}
+const enabled = !!next && !next.disabled && next.getAttribute('aria-disabled') !== 'true'
+  && !next.classList.contains('disabled') && !next.classList.contains('artdeco-button--disabled');
+return {urls, count: anchors.length, first: anchors[0] || null, next, next_enabled: enabled, url: location.href};
+"""
+
+# Scroll to the bottom and resolve with the new anchor count once it grows (or after timeoutMs)
+_SCROLL_JS = r"""
+const [linkSel, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const before = document.querySelectorAll(linkSel).length;
+const t0 = Date.now();
+window.scrollBy(0, document.body.scrollHeight);
+const check = () => {
+  const n = document.querySelectorAll(linkSel).length;
+  if (n > before || Date.now() - t0 >= timeoutMs) done({before, after: n});
+  else setTimeout(check, 100);
+};
+setTimeout(check, 100);
+"""
+
+
+def extract_page(driver, link_selector: str, href_contains: str = "", strip_query: bool = False,
+                 next_selector: str = "", next_text: str = "", next_aria: str = "") -> Dict[str, Any]:
+    """Links and pagination state of the current page in one round trip.
+    Returns {"urls", "count", "first", "next", "next_enabled", "url"}; "first"/"next" are WebElements or None."""
+    empty = {"urls": [], "count": 0, "first": None, "next": None, "next_enabled": False, "url": ""}
+    try:
+        res = driver.execute_script(_EXTRACT_JS, link_selector, href_contains, strip_query,
+                                    next_selector, next_text, next_aria)
+    except Exception:
+        return empty
+    return {**empty, **(res or {})}
+
+
+def scroll_for_more(driver, link_selector: str, timeout: float = 2.0) -> Dict[str, int]:
+    """Scroll once and wait (in the page) for more anchors; returns {"before", "after"} counts."""
+    try:
+        return driver.execute_async_script(_SCROLL_JS, link_selector, int(timeout * 1000)) or {"before": 0, "after": 0}
+    except Exception:
+        return {"before": 0, "after": 0}
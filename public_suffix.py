@@ -0,0 +1,69 @@
+import os
+from typing import Dict, Optional, Set
+
+# ---------------------------------
+# Offline public-suffix lookup
+# ---------------------------------
+# Reads a list in publicsuffix.org format (normal, "*." wildcard and "!"
+# exception rules). The bundled data/public_suffix_list.dat is a subset of the
+# upstream list; PSL_PATH can point at a full copy. Rules are stored in
+# punycode, so lookups take the ASCII domains produced by canonical_domain.
+PSL_PATH = os.getenv("PSL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                              "data", "public_suffix_list.dat"))
+
+_rules: Optional[Set[str]] = None
+_cache: Dict[str, Optional[str]] = {}
+
+
+def _to_ascii(rule: str) -> str:
+    try:
+        return rule.encode("idna").decode("ascii") if not rule.isascii() else rule
+    except UnicodeError:
+        # Labels like "*" don't survive the codec; encode label by label
+        return ".".join(l if l.isascii() else l.encode("idna").decode("ascii") for l in rule.split("."))
+
+
+def load_rules(path: str = PSL_PATH) -> Set[str]:
+    rules: Set[str] = set()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                rule = line.split()[0] if line.strip() else ""
+                if not rule or rule.startswith("//"):
+                    continue
+                prefix = "!" if rule.startswith("!") else ""
+                rules.add(prefix + _to_ascii(rule.lstrip("!").casefold()))
+    except Exception as e:
+        print(f"Public suffix list unavailable ({e}); using the last label as the suffix")
+    return rules
+
+
+def public_suffix(domain: str) -> str:
+    """Public suffix of a lower-case ASCII domain (the prevailing rule, or its last label)."""
+    global _rules
+    if _rules is None:
+        _rules = load_rules()
+    labels = domain.split(".")
+    for i in range(len(labels)):
+        cand = ".".join(labels[i:])
+        if "!" + cand in _rules:
+            return ".".join(labels[i + 1:])
+        if cand in _rules or (i + 1 < len(labels) and "*." + ".".join(labels[i + 1:]) in _rules):
+            return cand
+    return labels[-1]
+
+
+def registrable_domain(domain: str) -> Optional[str]:
+    """Public suffix plus one label (e.g. mail.foo.co.uk -> foo.co.uk); None if domain is a suffix itself."""
+    cached = _cache.get(domain)
+    if cached is not None or domain in _cache:
+        return cached
+    suffix = public_suffix(domain)
+    if domain == suffix or not domain.endswith("." + suffix):
+        out = None
+    else:
+        head = domain[: -len(suffix) - 1]
+        out = head.rsplit(".", 1)[-1] + "." + suffix
+    if len(_cache) < 100_000:
+        _cache[domain] = out
+    return out
@@ -0,0 +1,155 @@
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+# ---------------------------------
+# Bulk, expiry-aware session restore
+# ---------------------------------
+# Cookies go in with one CDP Network.setCookies call (no page needs to be open),
+# storage with one Page.addScriptToEvaluateOnNewDocument script that fills
+# local/sessionStorage before the site's own scripts run on its first load.
+# Auth cookies are checked locally first:
+#   "valid"   - all present auth cookies unexpired: restore, no probe needed
+#   "expired" - all present auth cookies expired: skip the restore, log in instead
+#   "unknown" - mixed or no auth cookies: restore, then probe the site once
+VALID, EXPIRED, UNKNOWN = "valid", "expired", "unknown"
+
+LINKEDIN_SITE, LINKEDIN_AUTH_COOKIES = "linkedin.com", ("li_at",)
+NAUKRI_SITE, NAUKRI_AUTH_COOKIES = "naukri.com", ("nauk_at", "nauk_rt")
+
+_SAME_SITE = {"strict": "Strict", "lax": "Lax", "none": "None", "no_restriction": "None"}
+
+
+def cookie_expiry(c: Dict[str, Any]) -> Optional[float]:
+    """Expiry as epoch seconds (Selenium 'expiry' or extension-export 'expirationDate'), None for session cookies."""
+    exp = c.get("expiry", c.get("expirationDate", c.get("expires")))
+    try:
+        exp = float(exp)
+    except (TypeError, ValueError):
+        return None
+    return exp if exp > 0 else None
+
+
+def cookie_expired(c: Dict[str, Any], now: Optional[float] = None) -> bool:
+    exp = cookie_expiry(c)
+    return exp is not None and exp <= (time.time() if now is None else now)
+
+
+def local_session_state(cookies: List[Dict[str, Any]], auth_names: Iterable[str] = (),
+                        now: Optional[float] = None) -> str:
+    names = set(auth_names)
+    auth = [c for c in cookies if c.get("name") in names]
+    if not auth:
+        return UNKNOWN
+    expired = [cookie_expired(c, now) for c in auth]
+    if all(expired):
+        return EXPIRED
+    if not any(expired):
+        return VALID
+    return UNKNOWN
+
+
+def to_cdp_cookie(c: Dict[str, Any], default_url: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    if not c.get("name"):
+        return None
+    out: Dict[str, Any] = {"name": c["name"], "value": str(c.get("value", "")), "path": c.get("path") or "/"}
+    if c.get("domain"):
+        out["domain"] = c["domain"]
+    elif default_url:
+        out["url"] = default_url
+    else:
+        return None
+    if c.get("secure"):
+        out["secure"] = True
+    if c.get("httpOnly"):
+        out["httpOnly"] = True
+    same_site = _SAME_SITE.get(str(c.get("sameSite") or "").lower())
+    if same_site:
+        out["sameSite"] = same_site
+    exp = cookie_expiry(c)
+    if exp is not None:
+        out["expires"] = exp
+    return out
+
+
+def _on_site(cookie_domain: str, site: str) -> bool:
+    d = (cookie_domain or "").lstrip(".").lower()
+    return d == site or d.endswith("." + site)
+
+
+def clear_cookies(driver, site: str) -> None:
+    """Drop the cookies of one site (e.g. "linkedin.com" and its subdomains), without needing a page.
+    Other sites' sessions in a shared (daemon) browser are left alone."""
+    try:
+        try:
+            cookies = driver.execute_cdp_cmd("Storage.getCookies", {})["cookies"]
+        except Exception:
+            cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+        for c in cookies:
+            if _on_site(c.get("domain", ""), site):
+                driver.execute_cdp_cmd("Network.deleteCookies", {
+                    "name": c["name"], "domain": c["domain"], "path": c.get("path") or "/",
+                })
+    except Exception:
+        # Without CDP WebDriver can only delete the current page's cookies
+        try:
+            if _on_site(urlparse(driver.current_url).hostname or "", site):
+                driver.delete_all_cookies()
+        except Exception:
+            pass
+
+
+def _storage_script(origin: str, local_storage: Dict[str, str], session_storage: Dict[str, str]) -> str:
+    return (
+        "(() => {"
+        f" if (location.origin !== {json.dumps(origin)}) return;"
+        " try {"
+        "  if (sessionStorage.getItem('__la_restored')) return;"
+        + ("  localStorage.clear();" if local_storage else "")
+        + f"  for (const [k, v] of Object.entries({json.dumps(local_storage)})) localStorage.setItem(k, v);"
+        f"  for (const [k, v] of Object.entries({json.dumps(session_storage)})) sessionStorage.setItem(k, v);"
+        "  sessionStorage.setItem('__la_restored', '1');"
+        " } catch (e) {}"
+        "})();"
+    )
+
+
+def restore_session(driver, cookies: List[Dict[str, Any]], origin: Optional[str] = None,
+                    local_storage: Optional[Dict[str, str]] = None,
+                    session_storage: Optional[Dict[str, str]] = None,
+                    auth_names: Iterable[str] = ()) -> str:
+    """Inject cookies (and storage for `origin`) in bulk; returns the local session state.
+    Nothing is injected when the auth cookies are known to be expired."""
+    now = time.time()
+    state = local_session_state(cookies, auth_names, now)
+    if state == EXPIRED:
+        return state
+    live = [c for c in cookies if not cookie_expired(c, now)]
+    origin_url = None
+    if origin:
+        u = urlparse(origin)
+        origin_url = f"{u.scheme}://{u.netloc}"
+    params = [p for p in (to_cdp_cookie(c, origin_url) for c in live) if p]
+    try:
+        driver.execute_cdp_cmd("Network.setCookies", {"cookies": params})
+    except Exception:
+        # No CDP (or rejected batch): per-cookie WebDriver calls need the origin open
+        if origin:
+            driver.get(origin)
+        for c in live:
+            cookie = {k: v for k, v in c.items() if k in {
+                "name", "value", "path", "domain", "secure", "httpOnly", "expiry", "sameSite"
+            }}
+            try:
+                driver.add_cookie(cookie)
+            except Exception:
+                pass
+    if origin_url and (local_storage or session_storage):
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+                "source": _storage_script(origin_url, local_storage or {}, session_storage or {}),
+            })
+        except Exception:
+            pass
+    return state
@@ -0,0 +1,55 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from answer_index import AnswerIndex  # noqa: E402
+import calibrate_similarity  # noqa: E402
+
+THRESHOLD = float(os.getenv("LLM_SIMILARITY_THRESHOLD", "0.35"))
+EXAMPLE = ("How many years of Node.js experience do you have?", "Years of experience in Node")
+DISTRACTORS = [
+    f"How many years of {tech} experience do you have?"
+    for tech in ["Java", "Python", "Go", "Rust", "PHP", "Ruby", "Kotlin", "Swift", "Scala", "Elixir",
+                 "React", "Angular", "Vue", "Django", "Flask", "Spring", "Docker", "Kubernetes", "AWS", "Azure"]
+] + ["What is your notice period?", "What is your current CTC?", "Are you willing to relocate?"]
+
+
+@pytest.mark.parametrize("n_distractors", [0, 3, 10, len(DISTRACTORS)])
+def test_request_example_matches_at_any_index_size(tmp_path, n_distractors):
+    index = AnswerIndex(str(tmp_path / "idx"), profile="p1")
+    index.add_many([(q, "sig", f"answer {i}") for i, q in enumerate(DISTRACTORS[:n_distractors])])
+    index.add_many([(EXAMPLE[0], "sig", "4")])
+    hit = index.lookup(EXAMPLE[1], "sig", THRESHOLD)
+    assert hit is not None and hit[0] == "4"
+
+
+def test_other_technologies_do_not_match(tmp_path):
+    index = AnswerIndex(str(tmp_path / "idx"), profile="p1")
+    index.add_many([(EXAMPLE[0], "sig", "4")])
+    for q in DISTRACTORS:
+        assert index.lookup(q, "sig", THRESHOLD) is None, q
+
+
+def test_rows_of_other_profiles_are_dropped(tmp_path):
+    base = str(tmp_path / "idx")
+    old = AnswerIndex(base, profile="old")
+    old.add_many([("What is your notice period?", "sig-old", "30")])
+    AnswerIndex(base, profile="new").add_many([("What is your current CTC?", "sig-new", "10")])
+
+    reopened = AnswerIndex(base, profile="new")
+    assert len(reopened) == 1
+    assert os.path.getsize(base + ".f32") == reopened.dim * 4
+    assert reopened.lookup("Current CTC", "sig-new", THRESHOLD)[0] == "10"
+
+
+def test_calibrated_threshold_separates_labelled_pairs():
+    pairs = calibrate_similarity.load_pairs(calibrate_similarity.DEFAULT_PAIRS)
+    recommended, rows = calibrate_similarity.calibrate(pairs)
+    at_default = next(r for r in rows if abs(r["threshold"] - THRESHOLD) < 1e-9)
+    assert at_default["fp"] == 0
+    assert recommended >= THRESHOLD
@@ -0,0 +1,41 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+import findSameEmails  # noqa: E402
+import email_extsort  # noqa: E402
+
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1000, 1024, 4000, 1 << 20])
+@pytest.mark.parametrize("seed", range(8))
+def test_external_matches_stream_with_exclude(tmp_path, chunk_size, seed):
+    # Every excluded address is repeated in the input, so a key's exclude and
+    # input records often straddle merge block boundaries
+    r = random.Random(seed)
+    excluded = [f"u{r.randrange(10 ** 9)}@D{r.randrange(50)}.com" for _ in range(1500)]
+    fresh = [f"n{r.randrange(10 ** 9)}@d{r.randrange(50)}.com" for _ in range(200)]
+    lines = excluded + fresh + r.sample(fresh, 50) + ["garbage", ""]
+    r.shuffle(lines)
+    inp = _write(tmp_path / "in.txt", lines)
+    exc = _write(tmp_path / "exclude.txt", excluded)
+
+    a = findSameEmails.dedup_stream([inp], str(tmp_path / "a.txt"), None, False, [exc])
+    b = email_extsort.dedup_external([inp], str(tmp_path / "b.txt"), [exc], False, chunk_size)
+
+    out_a = (tmp_path / "a.txt").read_text(encoding="utf-8")
+    out_b = (tmp_path / "b.txt").read_text(encoding="utf-8")
+    assert out_b == out_a
+    for key in ("lines", "unique", "duplicates", "invalid", "excluded"):
+        assert b[key] == a[key], key
+    assert not {e.lower() for e in excluded} & set(out_b.lower().split())
@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# llm_provider needs the openai SDK and emailcred.py
+llm_provider = pytest.importorskip("llm_provider")
+
+from mock_llm_server import build_reply  # noqa: E402
+
+ITEMS = [
+    {"question": "Are you comfortable working onsite?", "kind": "radio", "choices": ["No", "Yes"]},
+    {"question": "Preferred work mode", "kind": "select", "choices": ["Remote", "Hybrid", "Onsite"]},
+    {"question": "How many years of React experience do you have?", "kind": "number"},
+    {"question": "Pick your stack", "kind": "checkbox", "choices": ["Node.js", "Go"]},
+]
+EXPECTED = ["Yes", "Remote", "3", "Node.js"]
+
+
+def _user_prompt(structured):
+    return llm_provider._batch_messages(ITEMS, structured=structured)[-1]["content"]
+
+
+def test_batch_prompt_choices_are_answered():
+    reply = build_reply(_user_prompt(False))
+    answers, _ = llm_provider._parse_answer_array(reply, len(ITEMS))
+    assert answers == EXPECTED
+    assert llm_provider._map_batch_answers(ITEMS, answers) == EXPECTED
+
+
+def test_structured_batch_prompt_choices_are_answered():
+    reply = json.loads(build_reply(_user_prompt(True), structured=True))
+    assert [reply[f"a{i + 1}"] for i in range(len(ITEMS))] == EXPECTED